@@ -0,0 +1,214 @@
+"""
+Deterministic synthetic data for the benchmarks.
+
+Generates lemmas with paradigm tables shaped like jezik's (nouns of three
+declensions, adjectives with short and long forms, verbs), and from them a
+word list, a frequency table and a form index. ``install_stub_jezik`` puts a
+stand-in ``lookup`` module (``lookup`` and ``random_key``) in ``sys.modules``,
+so the services run without the real jezik library or data files.
+
+Nothing from ``services`` is imported before the stub is installed:
+importing any of it runs ``services/__init__.py``, which imports the jezik
+service and binds whatever ``lookup`` module is on the path at that moment.
+"""
+import os
+import random
+import sys
+import types
+from typing import Dict, List
+
+CONSONANTS = 'бвгдђжзјклљмнњпрстћфхцчџш'
+VOWELS = 'аеиоу'
+
+# jezik accent marks: short rising, long rising, long falling, short falling
+ACCENTS = ('̀', '́', '̏', '̑')
+LENGTH = '̄'
+MARKS = frozenset(ACCENTS + (LENGTH,))
+
+CASES = ('nom', 'gen', 'dat', 'acc', 'voc', 'ins', 'loc')
+
+NOUN_ENDINGS = {
+    # declension: (singular endings, plural endings) in case order
+    'f': (('а', 'е', 'и', 'у', 'о', 'ом', 'и'), ('е', 'а' + LENGTH, 'ама', 'е', 'е', 'ама', 'ама')),
+    'm': (('', 'а', 'у', '', 'е', 'ом', 'у'), ('и', 'а' + LENGTH, 'има', 'е', 'и', 'има', 'има')),
+    'n': (('о', 'а', 'у', 'о', 'о', 'ом', 'у'), ('а', 'а' + LENGTH, 'има', 'а', 'а', 'има', 'има')),
+}
+
+ADJECTIVE_ENDINGS = {
+    'm': (('', 'ог', 'ом', '', 'и', 'им', 'ом'), ('и', 'их', 'им', 'е', 'и', 'им', 'им')),
+    'f': (('а', 'е', 'ој', 'у', 'а', 'ом', 'ој'), ('е', 'их', 'им', 'е', 'е', 'им', 'им')),
+    'n': (('о', 'ог', 'ом', 'о', 'о', 'им', 'ом'), ('а', 'их', 'им', 'а', 'а', 'им', 'им')),
+}
+
+VERB_FORMS = (
+    ('infinitive', 'ти'),
+    ('prs 1sg', 'м'), ('prs 2sg', 'ш'), ('prs 3sg', ''),
+    ('prs 1pl', 'мо'), ('prs 2pl', 'те'), ('prs 3pl', 'ју'),
+    ('aor 1sg', 'х'), ('aor 2sg', ''), ('aor 1pl', 'смо'), ('aor 2pl', 'сте'), ('aor 3pl', 'ше'),
+    ('imp 2sg', 'ј'), ('imp 1pl', 'јмо'), ('imp 2pl', 'јте'),
+    ('m sg pf', 'о'), ('f sg pf', 'ла'), ('n sg pf', 'ло'),
+    ('m pl pf', 'ли'), ('f pl pf', 'ле'), ('n pl pf', 'ла'),
+)
+
+
+class Table(list):
+    """Paradigm table like jezik's: (label, forms) rows plus a ``pos``."""
+
+    def __init__(self, pos: str, rows):
+        super().__init__(rows)
+        self.pos = pos
+
+
+def _accented(stem: str, rng: random.Random) -> str:
+    """Put an accent mark after the first vowel of the stem."""
+    for i, char in enumerate(stem):
+        if char in VOWELS:
+            return stem[:i + 1] + rng.choice(ACCENTS) + stem[i + 1:]
+    return stem
+
+
+def _stem(rng: random.Random, syllables: int) -> str:
+    return ''.join(rng.choice(CONSONANTS) + rng.choice(VOWELS) for _ in range(syllables)) + \
+        rng.choice(CONSONANTS)
+
+
+def _pattern(rng: random.Random, word: str) -> str:
+    """Crossword-style pattern for a word: some letters hidden, maybe a '*'."""
+    letters = ''.join(char if rng.random() < 0.5 else '?' for char in word)
+    if rng.random() < 0.3:
+        return '*' + letters[-3:]
+    return letters
+
+
+def _noun(stem: str, gender: str, rng: random.Random) -> Table:
+    accented = _accented(stem, rng)
+    singular, plural = NOUN_ENDINGS[gender]
+    rows = [(f'sg {case}', [accented + ending]) for case, ending in zip(CASES, singular)]
+    rows += [(f'pl {case}', [accented + ending]) for case, ending in zip(CASES, plural)]
+    return Table('noun', rows)
+
+
+def _adjective(stem: str, rng: random.Random) -> Table:
+    accented = _accented(stem, rng)
+    rows = []
+    for gender, (singular, plural) in ADJECTIVE_ENDINGS.items():
+        for number, endings in (('sg', singular), ('pl', plural)):
+            for case, ending in zip(CASES, endings):
+                rows.append((f'{gender} {number} {case} short', [accented + ending]))
+                rows.append((f'{gender} {number} {case} long', [accented + ending + LENGTH]))
+    return Table('adjective', rows)
+
+
+def _verb(stem: str, rng: random.Random) -> Table:
+    accented = _accented(stem + 'а', rng)
+    return Table('verb', [(label, [accented + ending]) for label, ending in VERB_FORMS])
+
+
+def _plain(form: str) -> str:
+    """A generated form without its accent and length marks."""
+    return ''.join(char for char in form if char not in MARKS)
+
+
+def lemma_of(table: Table) -> str:
+    """The dictionary form of a generated table (its first cell, unaccented)."""
+    return _plain(table[0][1][0])
+
+
+def generate_dictionary(lemma_count: int = 5000, seed: int = 1234) -> Dict[str, List[Table]]:
+    """``lemma_count`` lemmas -> paradigm tables, always the same for a seed."""
+    rng = random.Random(seed)
+    dictionary: Dict[str, List[Table]] = {}
+    while len(dictionary) < lemma_count:
+        stem = _stem(rng, rng.choice((1, 2, 2, 3)))
+        kind = rng.random()
+        if kind < 0.55:
+            table = _noun(stem, rng.choice('fmn'), rng)
+        elif kind < 0.8:
+            table = _adjective(stem, rng)
+        else:
+            table = _verb(stem, rng)
+        lemma = lemma_of(table)
+        if lemma not in dictionary:
+            dictionary[lemma] = [table]
+    return dictionary
+
+
+def install_stub_jezik(dictionary: Dict[str, List[Table]], seed: int = 1234) -> types.ModuleType:
+    """Register a ``lookup`` module backed by ``dictionary``.
+
+    Must run before anything under ``services`` is imported.
+    """
+    rng = random.Random(seed)
+    keys = sorted(dictionary)
+    module = types.ModuleType('lookup')
+    module.lookup = lambda key: dictionary.get(key, [])
+    module.random_key = lambda: (rng.choice(keys), 'e')
+    module.dictionary = dictionary
+    sys.modules['lookup'] = module
+    return module
+
+
+def all_forms(dictionary: Dict[str, List[Table]]) -> List[str]:
+    """Every distinct unaccented form of every paradigm, sorted."""
+    forms = set()
+    for tables in dictionary.values():
+        for table in tables:
+            for _, cell in table:
+                forms.update(_plain(form) for form in cell)
+    return sorted(forms)
+
+
+def write_fixture_files(directory: str, dictionary: Dict[str, List[Table]],
+                        extra_words: int = 20000, seed: int = 1234) -> Dict[str, str]:
+    """Write the word list, frequency table and form index; returns their paths."""
+    from services.form_index import build_entries, write_index
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+
+    words = all_forms(dictionary)
+    # Words outside jezik, as in the real word list
+    known = set(words)
+    while len(known) < len(words) + extra_words:
+        known.add(_stem(rng, rng.choice((1, 2, 3))) + rng.choice(VOWELS))
+    words = sorted(known)
+
+    paths = {
+        "wordlist": os.path.join(directory, 'serbian-words.txt'),
+        "frequency": os.path.join(directory, 'word_frequency_table.tsv'),
+        "form_index": os.path.join(directory, 'form_index.tsv'),
+    }
+    with open(paths["wordlist"], 'w', encoding='utf-8') as f:
+        f.write('\n'.join(words) + '\n')
+
+    # Zipf-like counts over a shuffled order; most frequent first, like the real table
+    ranked = words[:]
+    rng.shuffle(ranked)
+    with open(paths["frequency"], 'w', encoding='utf-8') as f:
+        for rank, word in enumerate(ranked, 1):
+            f.write(f"{10_000_000 // rank}\t{word}\t{word}, {word.upper()}\n")
+
+    entries = build_entries(sorted(dictionary), lambda key: dictionary.get(key, []))
+    write_index(entries, paths["form_index"])
+    return paths
+
+
+def sample_queries(dictionary: Dict[str, List[Table]], count: int,
+                   seed: int = 99) -> Dict[str, List[str]]:
+    """Query words per benchmark: lemmas, inflected forms, misses, prefixes, suffixes, patterns."""
+    rng = random.Random(seed)
+    lemmas = sorted(dictionary)
+    inflected: List[str] = []
+    while len(inflected) < count:
+        table = dictionary[rng.choice(lemmas)][0]
+        _, cell = rng.choice(table[1:])
+        inflected.append(_plain(cell[0]))
+    misses = [_stem(rng, 3) + 'ыы' for _ in range(count)]
+    return {
+        "lemmas": [rng.choice(lemmas) for _ in range(count)],
+        "inflected": inflected,
+        "misses": misses,
+        "prefixes": [rng.choice(lemmas)[:rng.choice((2, 3, 4))] for _ in range(count)],
+        "accented": [rng.choice(dictionary[rng.choice(lemmas)][0])[1][0] for _ in range(count)],
+        "suffixes": [rng.choice(inflected)[-rng.choice((2, 3, 4)):] for _ in range(count)],
+        "patterns": [_pattern(rng, rng.choice(inflected)) for _ in range(count)],
+    }
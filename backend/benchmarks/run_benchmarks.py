@@ -0,0 +1,267 @@
+"""
+Microbenchmarks of the backend service hot paths on synthetic data.
+
+Usage (from the backend directory):
+
+    python benchmarks/run_benchmarks.py [--filter jezik] [--iterations 2000]
+        [--baseline benchmarks/baseline.json] [--save-baseline] [--tolerance 0.2]
+
+The data (word list, frequency table, form index and a stub jezik ``lookup``
+module) is generated from a fixed seed by ``fixtures.py``, so runs are
+comparable without the real jezik library or data files. Every benchmark
+reports operations per second and p50/p90/p99 latencies. With a baseline
+file present the results are compared against it and the exit status is 1
+if any benchmark got slower than the tolerance allows; ``--save-baseline``
+records the current results as the new baseline.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Sequence
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(BENCHMARKS_DIR, '..')
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, BENCHMARKS_DIR)
+
+import fixtures  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(BENCHMARKS_DIR, 'baseline.json')
+
+
+class Benchmark(NamedTuple):
+    name: str
+    function: Callable[[Any], Any]
+    inputs: Sequence[Any]
+    # Fraction of --iterations to run (for slow paths)
+    scale: float = 1.0
+    # Call once per input before timing (to measure cache hits)
+    warm: bool = False
+
+
+class _NoEtymology:
+    """Etymology service stand-in: no Wiktionary data."""
+
+    def get_word_data(self, word):
+        return None
+
+
+def build_benchmarks(args) -> List[Benchmark]:
+    dictionary = fixtures.generate_dictionary(args.lemmas, args.seed)
+    # The stub must be in place before anything under services is imported
+    stub = fixtures.install_stub_jezik(dictionary, args.seed)
+
+    from services import jezik_service
+    if jezik_service.lookup is not stub.lookup:
+        raise RuntimeError("services.jezik_service was imported before the stub jezik, "
+                           "the benchmarks would not time the generated paradigms")
+    from services.form_index import FormIndex
+    from services.frequency_service import FrequencyService
+    from services.fuzzy_service import FuzzyService
+    from services.ipa_service import IPAService
+    from services.jezik_service import JezikService
+    from services.paradigm_store import ParadigmStore, ParadigmStoreWriter
+    from services.pattern_service import PatternService
+    from services.random_service import RandomService
+    from services.suffix_service import SuffixService
+    from services.suggest_service import SuggestService
+    from services.word_info import WordInfoBuilder
+    from services.wordlist_service import WordlistService
+
+    data_dir = tempfile.mkdtemp(prefix='recnik-bench-')
+    paths = fixtures.write_fixture_files(data_dir, dictionary, seed=args.seed)
+    queries = fixtures.sample_queries(dictionary, args.iterations, seed=args.seed)
+
+    form_index = FormIndex(paths["form_index"])
+    # Paradigms are generated by the stub unless a benchmark says otherwise
+    no_store = ParadigmStore(os.path.join(data_dir, 'no_paradigms.bin'))
+    store_writer = ParadigmStoreWriter()
+    for lemma in sorted(dictionary):
+        store_writer.add(lemma, dictionary[lemma])
+    store_writer.write(os.path.join(data_dir, 'paradigms.bin'))
+    store = ParadigmStore(os.path.join(data_dir, 'paradigms.bin'))
+
+    jezik = JezikService(form_index, paradigm_store=no_store)
+    jezik_uncached = JezikService(form_index, cache_size=0, paradigm_store=no_store)
+    jezik_store = JezikService(form_index, cache_size=0, paradigm_store=store)
+    jezik_heuristic = JezikService(FormIndex(os.path.join(data_dir, 'no_form_index.tsv')),
+                                   paradigm_store=no_store)
+    wordlist = WordlistService(use_snapshot=False, wordlist_file=paths["wordlist"])
+    frequency = FrequencyService(use_snapshot=False, freq_file=paths["frequency"])
+    ipa = IPAService()
+    suggest = SuggestService(wordlist, frequency, jezik, use_snapshot=False)
+    fuzzy = FuzzyService(wordlist, frequency, jezik, use_snapshot=False)
+    suffix = SuffixService(wordlist, frequency, jezik, use_snapshot=False)
+    pattern = PatternService(wordlist, frequency, jezik, use_snapshot=False)
+    random_words = RandomService(jezik, frequency)
+    builder = WordInfoBuilder(jezik, frequency, wordlist, ipa, _NoEtymology())
+
+    paradigms = [
+        [form for _, cell in dictionary[lemma][0] for form in cell]
+        for lemma in queries["lemmas"]
+    ]
+
+    def build_word(word):
+        return builder.build(word)
+
+    return [
+        Benchmark("jezik.lookup_word.uncached", jezik_uncached.lookup_word, queries["lemmas"]),
+        Benchmark("jezik.lookup_word.store", jezik_store.lookup_word, queries["lemmas"]),
+        Benchmark("jezik.lookup_word.cached", jezik.lookup_word, queries["lemmas"], warm=True),
+        Benchmark("jezik.find_all_lemmas_by_form.hit", jezik.find_all_lemmas_by_form,
+                  queries["inflected"]),
+        Benchmark("jezik.find_all_lemmas_by_form.miss", jezik.find_all_lemmas_by_form,
+                  queries["misses"]),
+        Benchmark("jezik.find_all_lemmas_by_form.heuristic_hit",
+                  jezik_heuristic.find_all_lemmas_by_form, queries["inflected"], scale=0.1),
+        Benchmark("jezik.find_all_lemmas_by_form.heuristic_miss",
+                  jezik_heuristic.find_all_lemmas_by_form, queries["misses"], scale=0.1),
+        Benchmark("jezik.find_matching_forms", lambda word: jezik.find_matching_forms(
+            word, word), queries["lemmas"], warm=True),
+        Benchmark("wordlist.word_exists", wordlist.word_exists, queries["inflected"]),
+        Benchmark("wordlist.find_related_forms", wordlist.find_related_forms, queries["prefixes"]),
+        Benchmark("wordlist.find_possible_lemmas", wordlist.find_possible_lemmas,
+                  queries["inflected"]),
+        Benchmark("suggest.suggest", suggest.suggest, queries["prefixes"]),
+        Benchmark("fuzzy.did_you_mean", fuzzy.did_you_mean, queries["misses"]),
+        Benchmark("suffix.search", suffix.search, queries["suffixes"]),
+        Benchmark("pattern.search", pattern.search, queries["patterns"]),
+        Benchmark("random.sample.filtered", lambda seed: random_words.sample(
+            "noun", None, "top100k", 10, seed), queries["lemmas"]),
+        Benchmark("frequency.get_frequency", frequency.get_frequency, queries["inflected"]),
+        Benchmark("ipa.to_ipa", ipa.to_ipa, queries["accented"]),
+        Benchmark("ipa.extract_stress_pattern", ipa.extract_stress_pattern, queries["accented"]),
+        Benchmark("ipa.to_ipa_many.paradigm", ipa.to_ipa_many, paradigms),
+        Benchmark("word_info.build.lemma", build_word, queries["lemmas"], warm=True),
+        Benchmark("word_info.build.inflected", build_word, queries["inflected"]),
+    ]
+
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_benchmark(benchmark: Benchmark, iterations: int) -> Dict[str, float]:
+    count = max(1, int(iterations * benchmark.scale))
+    inputs = [benchmark.inputs[i % len(benchmark.inputs)] for i in range(count)]
+    function = benchmark.function
+    if benchmark.warm:
+        for item in inputs:
+            function(item)
+
+    timer = time.perf_counter_ns
+    timings = []
+    for item in inputs:
+        start = timer()
+        function(item)
+        timings.append(timer() - start)
+
+    total_ns = sum(timings)
+    timings.sort()
+    return {
+        "n": count,
+        "ops_per_sec": round(count / (total_ns / 1e9), 1) if total_ns else 0.0,
+        "mean_us": round(total_ns / count / 1000, 3),
+        "p50_us": round(percentile(timings, 0.50) / 1000, 3),
+        "p90_us": round(percentile(timings, 0.90) / 1000, 3),
+        "p99_us": round(percentile(timings, 0.99) / 1000, 3),
+    }
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Any],
+            tolerance: float) -> List[str]:
+    """Print the comparison table; returns the names of regressed benchmarks."""
+    regressions = []
+    base_results = baseline.get("results", {})
+    print(f"\n{'benchmark':<46} {'ops/s':>12} {'baseline':>12} {'change':>8}")
+    for name, result in results.items():
+        base = base_results.get(name)
+        if not base or not base.get("ops_per_sec"):
+            print(f"{name:<46} {result['ops_per_sec']:>12,.0f} {'-':>12} {'new':>8}")
+            continue
+        change = result["ops_per_sec"] / base["ops_per_sec"] - 1
+        flag = ''
+        if change < -tolerance:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"{name:<46} {result['ops_per_sec']:>12,.0f} {base['ops_per_sec']:>12,.0f} "
+              f"{change:>+7.0%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--filter', default='', help='only run benchmarks whose name contains this')
+    parser.add_argument('--iterations', type=int, default=2000, help='calls per benchmark')
+    parser.add_argument('--lemmas', type=int, default=5000, help='size of the synthetic dictionary')
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline JSON file')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='write the results to the baseline file')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed ops/s drop against the baseline (0.2 = 20%%)')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    start = time.time()
+    benchmarks = [b for b in build_benchmarks(args) if args.filter in b.name]
+    print(f"Generated fixtures in {time.time() - start:.1f}s\n")
+
+    results: Dict[str, Dict[str, float]] = {}
+    print(f"{'benchmark':<46} {'ops/s':>12} {'p50 us':>9} {'p90 us':>9} {'p99 us':>9}")
+    for benchmark in benchmarks:
+        result = run_benchmark(benchmark, args.iterations)
+        results[benchmark.name] = result
+        print(f"{benchmark.name:<46} {result['ops_per_sec']:>12,.0f} {result['p50_us']:>9.1f} "
+              f"{result['p90_us']:>9.1f} {result['p99_us']:>9.1f}")
+        sys.stdout.flush()
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "lemmas": args.lemmas,
+            "iterations": args.iterations,
+            "seed": args.seed,
+            "created": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    regressions = []
+    if args.save_baseline:
+        baseline = {"meta": report["meta"], "results": results}
+        if os.path.exists(args.baseline) and args.filter:
+            # Only replace the benchmarks that were run
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+            baseline["results"] = {**previous.get("results", {}), **results}
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\nSaved baseline to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        meta = baseline.get("meta", {})
+        if any(meta.get(key) != report["meta"][key] for key in ("lemmas", "seed")):
+            print("\nWarning: baseline was recorded with different fixture settings")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) slower than the baseline "
+                  f"by more than {args.tolerance:.0%}")
+    else:
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to record one")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,12 @@
 import sys
 import os
-from fastapi import FastAPI, HTTPException
+import json
+import hmac
+import tempfile
+import threading
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional, Dict, List, Any
@@ -14,13 +20,69 @@ else:
     JEZIK_PATH = os.path.join(os.path.dirname(__file__), '../../jezik')
 sys.path.insert(0, JEZIK_PATH)
 
-from services.jezik_service import JezikService
+from services.jezik_service import JezikService, reload_library
 from services.frequency_service import FrequencyService
 from services.wordlist_service import WordlistService
 from services.ipa_service import IPAService
 from services.etymology_service import EtymologyService
+from services.response_cache import DataVersion, ResponseCache, CachedResponse, etag_matches
+from services.suggest_service import SuggestService
+from services.fuzzy_service import FuzzyService
+from services.suffix_service import SuffixService
+from services.pattern_service import PatternService
+from services.random_service import RandomService
+from services.prefork import in_worker, memory_usage, request_reload, run_prefork
+from services.startup import ServiceLoader, ServiceSet, watch
+from services import metrics
+from services.text_analyzer import TextAnalyzer
+from services.word_info import (
+    WordInfoBuilder, WordNotFoundError, WordLookupBusy, WordLookupUnavailable, WORD_FIELDS,
+    normalize_word
+)
+
+API_VERSION = "0.1.0"
+
+# Browsers and the nginx proxy may reuse responses this long before
+# revalidating them with If-None-Match (0 = revalidate every time). Kept
+# short so that new data reaches clients soon after it is loaded.
+CACHE_MAX_AGE = int(os.environ.get('RECNIK_RESPONSE_MAX_AGE', 60))
+
+# Lifetime of "word not found" answers, which have no validator
+NOT_FOUND_MAX_AGE = int(os.environ.get('RECNIK_NOT_FOUND_MAX_AGE', 30))
+
+# Maximum number of words accepted by POST /api/words
+MAX_BATCH_WORDS = int(os.environ.get('RECNIK_MAX_BATCH_WORDS', 500))
+
+# Maximum request body of POST /api/analyze, in bytes
+MAX_ANALYZE_BYTES = int(os.environ.get('RECNIK_MAX_ANALYZE_BYTES', 16 * 1024 * 1024))
+
+# Number of forked worker processes when run as a script (1 = single process)
+WORKERS = int(os.environ.get('RECNIK_WORKERS', 1))
+
+# Accept requests at once and load the data in the background (see /ready)
+LAZY_START = os.environ.get('RECNIK_LAZY_START', '0') == '1'
 
-app = FastAPI(title="Serbian Word Explorer API")
+# Seconds between checks of the data files for changes, which are then
+# reloaded in the background (0 = only reload on POST /admin/reload)
+RELOAD_INTERVAL = float(os.environ.get('RECNIK_RELOAD_INTERVAL', 0))
+
+# Token required by the /admin endpoints (without one they only accept
+# requests from localhost)
+ADMIN_TOKEN = os.environ.get('RECNIK_ADMIN_TOKEN')
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Starts the background loading in lazy mode; otherwise (or in a forked
+    # worker) everything is loaded already and this does nothing
+    loader.start(data, _loaded)
+    # Forked workers leave watching and reloading to the pre-fork parent
+    if RELOAD_INTERVAL > 0 and not in_worker():
+        watch(RELOAD_INTERVAL, _data_changed, reload_data)
+    yield
+
+
+app = FastAPI(title="Serbian Word Explorer API", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -29,14 +91,152 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
-# Initialize services
-jezik_service = JezikService()
-frequency_service = FrequencyService()
-wordlist_service = WordlistService()
-ipa_service = IPAService()
-etymology_service = EtymologyService()
+# Server-Timing headers and request metrics (disable with RECNIK_METRICS=0)
+if metrics.ENABLED:
+    app.add_middleware(metrics.TimingMiddleware)
+
+# Most important first: morphology, then what word lookups need, then the
+# search indexes; etymology is only an extra on word pages
+SERVICES = (
+    ("jezik", lambda s: JezikService()),
+    ("frequency", lambda s: FrequencyService()),
+    ("wordlist", lambda s: WordlistService()),
+    ("ipa", lambda s: IPAService()),
+    ("analyzer", lambda s: TextAnalyzer(s.jezik, s.frequency)),
+    ("suggest", lambda s: SuggestService(s.wordlist, s.frequency, s.jezik)),
+    ("fuzzy", lambda s: FuzzyService(s.wordlist, s.frequency, s.jezik)),
+    ("suffix", lambda s: SuffixService(s.wordlist, s.frequency, s.jezik)),
+    ("pattern", lambda s: PatternService(s.wordlist, s.frequency, s.jezik)),
+    ("random", lambda s: RandomService(s.jezik, s.frequency)),
+    ("etymology", lambda s: EtymologyService()),
+)
+
+
+def _new_data(builder: WordInfoBuilder) -> ServiceSet:
+    """An empty service set; each service stays None until it is loaded."""
+    return ServiceSet(version="", builder=builder, **{name: None for name, _ in SERVICES})
+
+
+def _publish(target: ServiceSet, name: str, service):
+    """Put a loaded service in its set and in the set's word builder."""
+    setattr(target, name, service)
+    attribute = f"{name}_service"
+    if hasattr(target.builder, attribute):
+        setattr(target.builder, attribute, service)
+
+
+# The services in use. Endpoints read this once per request; a reload swaps
+# in a fully loaded new set, so a request never mixes two data versions.
+data = _new_data(WordInfoBuilder(None, None, None, None, None))
+
+loader = ServiceLoader(on_loaded=_publish)
+for _name, _load in SERVICES:
+    loader.add(_name, _load)
+
+
+def _data_files():
+    files = []
+    current = data
+    for service in (current.jezik, current.frequency, current.wordlist, current.etymology):
+        source_files = getattr(service, 'source_files', None)
+        if source_files:
+            files.extend(source_files())
+    return files
+
+
+# Version of the data files on disk; data.version is the one that is loaded
+data_version = DataVersion(_data_files, salt=API_VERSION)
+response_cache = ResponseCache(data_version)
+
+
+def _preload(target: ServiceSet):
+    # Whatever jezik loads lazily is loaded before the first request (and,
+    # in the pre-fork parent, before the workers are forked)
+    if target.jezik is not None:
+        target.jezik.preload()
+
+
+def _loaded(target: ServiceSet):
+    target.version = data_version.fingerprint()
+    _preload(target)
+
+
+def _swap(new: ServiceSet):
+    global data
+    _preload(new)
+    data = new
+    print(f"Swapped in data version {new.version}")
+
+
+def reload_data() -> bool:
+    """Load every service again from the current files and swap them in.
+
+    Blocks until done; True if the new data is in use, False if the reload
+    failed or the initial load or another reload is still running.
+    """
+    reload_library()
+    new = _new_data(data.builder.fresh())
+    # Taken before reading the files: a change made while loading is
+    # picked up by the next reload
+    new.version = data_version.fingerprint()
+    return loader.reload(new, _swap) and data is new
+
+
+def _data_changed() -> bool:
+    """True if the files on disk differ from the loaded (or last tried) version."""
+    if not loader.ready or loader.reloading:
+        return False
+    version = data_version.fingerprint()
+    last_tried = (loader.last_reload or {}).get("version")
+    return version != data.version and version != last_tried
+
+
+# The pre-fork parent always loads before forking, so the workers share it
+if not LAZY_START or (__name__ == "__main__" and WORKERS > 1):
+    loader.load_all(data, _loaded)
+
+
+def _require(name: str):
+    """Raise a 503 (with Retry-After) if a service is not loaded yet."""
+    if not loader.is_ready(name):
+        raise HTTPException(
+            status_code=503,
+            detail=f"Still loading ({name}), try again shortly",
+            headers={"Retry-After": "1", "Cache-Control": "no-store"}
+        )
+
+
+def _cache_control(max_age: int) -> str:
+    """Cache-Control of a cacheable response kept ``max_age`` seconds."""
+    return f"public, max-age={max_age}" if max_age > 0 else "no-cache"
+
+
+def _cache_stats(name: str):
+    """cache_stats of a service, or nothing while it is not loaded."""
+    def stats():
+        service = getattr(data, name)
+        return service.cache_stats() if service is not None else {}
+    return stats
+
+
+metrics.REGISTRY.add_collector(metrics.gauge_collector({
+    "recnik_stages_in_flight": ("Word lookup stages submitted and not finished.",
+                                lambda: data.builder.slots.in_flight),
+    "recnik_stages_abandoned_running": ("Stages given up on at their deadline and still running.",
+                                        lambda: data.builder.slots.abandoned),
+    "recnik_stage_slots": ("Stages that may be in flight at once (RECNIK_STAGE_WORKERS).",
+                           lambda: data.builder.slots.limit),
+}))
+metrics.REGISTRY.add_collector(metrics.cache_collector({
+    "lookup": _cache_stats("jezik"),
+    "paradigm_ipa": _cache_stats("ipa"),
+    "analyze": _cache_stats("analyzer"),
+    "etymology": _cache_stats("etymology"),
+    "response": response_cache.stats,
+}))
 
 
 class WordResponse(BaseModel):
@@ -48,6 +248,7 @@ class WordResponse(BaseModel):
     pos_sr: Optional[str] = None
     gender: Optional[str] = None
     morphology: Optional[Dict[str, Any]] = None
+    morphology_ipa: Optional[Dict[str, List[str]]] = None  # Only with ?paradigm_ipa=true
     frequency: Optional[Dict[str, Any]] = None
     has_jezik_entry: bool = False
     ipa: Optional[str] = None
@@ -59,16 +260,31 @@ class WordResponse(BaseModel):
     variants: Optional[List[Dict[str, Any]]] = None  # Multiple POS interpretations
     etymology: Optional[str] = None
     definitions: Optional[List[Dict[str, Any]]] = None
+    partial: Optional[bool] = None  # Some stages timed out, see degraded_stages
+    degraded_stages: Optional[List[str]] = None
+
+
+class BatchRequest(BaseModel):
+    words: List[str]
+    fields: Optional[List[str]] = None  # e.g. ["lemma", "pos", "frequency"]
 
 
 @app.get("/")
 def root():
     return {
         "message": "Serbian Word Explorer API",
-        "version": "0.1.0",
+        "version": API_VERSION,
         "endpoints": {
             "word_lookup": "/api/word/{word}",
-            "health": "/health"
+            "batch_lookup": "POST /api/words",
+            "analyze": "POST /api/analyze",
+            "suggest": "/api/suggest?q={prefix}",
+            "suffix_search": "/api/search/suffix?q={suffix}",
+            "pattern_search": "/api/search/pattern?q={pattern}",
+            "stats": "/api/stats",
+            "metrics": "/metrics",
+            "health": "/health",
+            "ready": "/ready"
         }
     }
 
@@ -78,139 +294,341 @@ def health_check():
     return {"status": "ok"}
 
 
+@app.get("/ready")
+def readiness_check(response: Response):
+    """
+    Load state of every data service, in load order, with the seconds it
+    took to load, plus the loaded data version and the outcome of the last
+    reload. 200 once everything is loaded, 503 while anything is still
+    loading or failed to load.
+    """
+    status = loader.status()
+    response.status_code = 200 if status["status"] == "ready" else 503
+    response.headers["Cache-Control"] = "no-store"
+    return {**status, "data_version": data.version}
+
+
+@app.post("/admin/reload", status_code=202)
+def trigger_reload(request: Request):
+    """
+    Reload the data files in the background and swap them in when loaded.
+    
+    Requests keep being served from the loaded data meanwhile; GET /ready
+    reports the outcome. Needs "Authorization: Bearer <RECNIK_ADMIN_TOKEN>",
+    or a request from localhost when no token is configured. With several
+    workers the pre-fork parent reloads and then replaces the workers.
+    """
+    if ADMIN_TOKEN:
+        authorization = request.headers.get("authorization", "")
+        if not hmac.compare_digest(authorization.encode('utf-8'),
+                                   f"Bearer {ADMIN_TOKEN}".encode('utf-8')):
+            raise HTTPException(status_code=403, detail="Invalid admin token")
+    elif request.client is None or request.client.host not in ("127.0.0.1", "::1"):
+        raise HTTPException(status_code=403, detail="Admin endpoints are only open to localhost")
+    
+    if in_worker():
+        request_reload()
+        return {"status": "reloading", "data_version": data.version}
+    if not loader.ready:
+        raise HTTPException(status_code=503, detail="Still loading, try again shortly",
+                            headers={"Retry-After": "1"})
+    if loader.reloading:
+        raise HTTPException(status_code=409, detail="A reload is already running")
+    threading.Thread(target=reload_data, name="data-reload", daemon=True).start()
+    return {"status": "reloading", "data_version": data.version}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """
+    Request latency histograms, stage timings and counters of this worker
+    process, in Prometheus text format.
+    """
+    return PlainTextResponse(
+        metrics.REGISTRY.render(),
+        media_type=metrics.PROMETHEUS_CONTENT_TYPE,
+        headers={"Cache-Control": "no-store"}
+    )
+
+
+@app.get("/api/stats")
+def get_stats():
+    """
+    Cache and memory statistics for this worker process.
+    """
+    return {
+        "worker_pid": os.getpid(),
+        "memory": memory_usage(),
+        "data_version": data.version,
+        "lookup_cache": _cache_stats("jezik")(),
+        "paradigm_ipa_cache": _cache_stats("ipa")(),
+        "analyze_cache": _cache_stats("analyzer")(),
+        "etymology_cache": _cache_stats("etymology")(),
+        "response_cache": response_cache.stats()
+    }
+
+
 @app.get("/api/word/{word}", response_model=WordResponse)
-def get_word_info(word: str):
+async def get_word_info(word: str, request: Request, paradigm_ipa: bool = False):
     """
     Get comprehensive information about a Serbian word.
+    
+    Serialized responses are cached per data version. The ETag only depends
+    on the word and the data version, so a matching If-None-Match is answered
+    with 304 before any lookup work is done. Lookup stages run concurrently;
+    partial responses (a stage timed out) are neither cached nor validated.
+    
+    With paradigm_ipa=true the response also has the IPA of every form in
+    the morphology table (morphology_ipa).
+    
+    Unknown words get a 404 whose body lists "did you mean" suggestions
+    (known words one edit away, ignoring script and diacritics).
+    
+    The Server-Timing header has the time spent in each stage and the work
+    counters of the request (jezik lookups, lookup cache hits, ...).
     """
-    result = {
-        "word": word,
-        "exists": False,
-        "has_jezik_entry": False
-    }
+    current = data
+    word = normalize_word(word)
+    fields = set(WORD_FIELDS) if paradigm_ipa else None
+    cache_key = f"{word}\0paradigm_ipa" if paradigm_ipa else word
+    version = current.version
+    etag = response_cache.etag(cache_key, version)
+    headers = {"Cache-Control": _cache_control(CACHE_MAX_AGE)}
     
-    # Try to get morphology from jezik
-    # First try the word as-is (lowercase for consistency)
-    word_lower = word.lower()
-    jezik_data = jezik_service.lookup_word(word_lower)
-    
-    # Check if the searched word matches specific inflected forms
-    # This handles cases like "škola" which is both nom sg AND gen pl
-    if jezik_data:
-        form_matches = jezik_service.find_matching_forms(word_lower, word_lower)
-        if form_matches and len(form_matches) > 0:
-            # Only set form_info if the word is NOT exactly the lemma in nom sg
-            # (to distinguish "škola" the inflected form from "škola" the lemma)
-            if len(form_matches) > 1 or form_matches[0] not in ['sg nom', 'infinitive']:
-                result["searched_form"] = word
-                result["found_lemma"] = word_lower
-                result["form_info"] = {
-                    "labels": form_matches,
-                    "accented_form": jezik_service.get_accented_form(word_lower, form_matches[0])
-                }
-    
-    # If not found as lemma, try to find lemma by searching inflected forms
-    # Look for ALL possible interpretations
-    if not jezik_data:
-        all_lemmas = jezik_service.find_all_lemmas_by_form(word_lower)
-        if all_lemmas:
-            # Use first result as primary
-            lemma_result = all_lemmas[0]
-            lemma = lemma_result["lemma"]
-            jezik_data = jezik_service.lookup_word(lemma)
-            if jezik_data:
-                result["searched_form"] = word
-                result["found_lemma"] = lemma
-                result["form_info"] = {
-                    "labels": lemma_result["labels"],
-                    "accented_form": lemma_result["accented_form"]
-                }
-                
-                # If there are multiple interpretations, add them as variants
-                if len(all_lemmas) > 1:
-                    result["variants"] = []
-                    for alt_lemma in all_lemmas:
-                        alt_data = jezik_service.lookup_word(alt_lemma["lemma"])
-                        if alt_data:
-                            result["variants"].append({
-                                "lemma": alt_lemma["lemma"],
-                                "pos": alt_data["pos"],
-                                "pos_sr": alt_data["pos_sr"],
-                                "labels": alt_lemma["labels"],
-                                "accented_form": alt_lemma["accented_form"]
-                            })
-    
-    if jezik_data:
-        result["has_jezik_entry"] = True
-        result["lemma"] = jezik_data.get("lemma")
-        result["pos"] = jezik_data.get("pos")
-        result["pos_sr"] = jezik_data.get("pos_sr")
-        result["gender"] = jezik_data.get("gender")
-        result["morphology"] = jezik_data.get("morphology")
-        
-        # Add IPA and stress pattern
-        accented_form = None
-        # If we searched for an inflected form, use that form's accent
-        if result.get("form_info") and result["form_info"].get("accented_form"):
-            accented_form = result["form_info"]["accented_form"]
-        elif result.get("morphology"):
-            # Otherwise use nominative singular
-            if "sg nom" in result["morphology"]:
-                accented_form = result["morphology"]["sg nom"][0]
-            elif "m sg nom short" in result["morphology"]:
-                accented_form = result["morphology"]["m sg nom short"][0]
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        metrics.count("not_modified")
+        return Response(status_code=304, headers={**headers, "ETag": etag})
+    
+    cached = response_cache.get(cache_key, version)
+    if cached is None:
+        metrics.count("response_cache_misses")
+        try:
+            result = await current.builder.build_async(word, fields)
+        except WordNotFoundError:
+            result = None
+        except WordLookupUnavailable as e:
+            if isinstance(e, WordLookupBusy):
+                detail = "Too many lookups in progress, try again"
+            elif loader.ready:
+                detail = "Lookup timed out, try again"
             else:
-                first_key = list(result["morphology"].keys())[0]
-                accented_form = result["morphology"][first_key][0]
+                detail = "Still loading, try again"
+            return Response(
+                content=json.dumps({"detail": detail}).encode('utf-8'),
+                status_code=503,
+                media_type="application/json",
+                headers={"Cache-Control": "no-store", "Retry-After": "1"}
+            )
         
-        if accented_form:
-            ipa = ipa_service.to_ipa(accented_form)
-            stress = ipa_service.extract_stress_pattern(accented_form)
-            if ipa:
-                result["ipa"] = ipa
-            if stress:
-                result["stress_pattern"] = stress
-    
-    # Check if word exists in word list
-    exists = wordlist_service.word_exists(word)
-    result["exists"] = exists
-    
-    # Get related forms from wordlist (inflected forms) - only if no jezik data
-    if not jezik_data:
-        related_forms = wordlist_service.find_related_forms(word, limit=50)
-        if related_forms:
-            result["related_forms"] = related_forms
-    
-    # Get frequency data
-    freq_data = frequency_service.get_frequency(word)
-    if freq_data:
-        result["frequency"] = freq_data
-    
-    # Get etymology and definitions from Wiktionary
-    lemma_to_lookup = result.get("lemma") or word
-    etym_data = etymology_service.get_word_data(lemma_to_lookup)
-    if etym_data:
-        result["etymology"] = etym_data.get("etymology")
-        result["definitions"] = etym_data.get("definitions")
-    
-    if not exists and not jezik_data:
-        raise HTTPException(status_code=404, detail="Word not found")
-    
-    return result
+        if result is None:
+            fuzzy = current.fuzzy
+            suggestions = fuzzy.did_you_mean(word) if fuzzy is not None else []
+            body = json.dumps({
+                "detail": "Word not found",
+                "suggestions": suggestions
+            }, ensure_ascii=False).encode('utf-8')
+            cached = CachedResponse(404, body)
+        else:
+            body = WordResponse(**result).model_dump_json().encode('utf-8')
+            cached = CachedResponse(200, body)
+        
+        # Partial answers (a stage timed out or is still loading) and 404s
+        # without the suggestions index are not cached
+        if (result is not None and result.get("partial")) or \
+                (result is None and current.fuzzy is None):
+            return Response(
+                content=cached.body,
+                status_code=cached.status_code,
+                media_type="application/json",
+                headers={"Cache-Control": "no-store"}
+            )
+        response_cache.put(cache_key, version, cached)
+    
+    # Only successful responses get a validator; 404s just expire, soon,
+    # so that a word added by a data update is found
+    if cached.status_code == 200:
+        headers["ETag"] = etag
+    else:
+        headers["Cache-Control"] = _cache_control(NOT_FOUND_MAX_AGE)
+    
+    return Response(
+        content=cached.body,
+        status_code=cached.status_code,
+        media_type="application/json",
+        headers=headers
+    )
+
+
+@app.post("/api/words")
+def get_words_info(batch: BatchRequest, response: Response):
+    """
+    Look up many words in one request.
+    
+    Returns one result per input word, in order. Each result has a status and
+    either the (optionally field-restricted) word data or an error, so one
+    unknown word does not fail the whole batch.
+    """
+    if len(batch.words) > MAX_BATCH_WORDS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many words (maximum is {MAX_BATCH_WORDS})"
+        )
+    
+    fields = None
+    if batch.fields is not None:
+        unknown = sorted(set(batch.fields) - set(WORD_FIELDS))
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        fields = set(batch.fields)
+    
+    results = data.builder.build_many(batch.words, fields, loading=not loader.ready)
+    if any(entry["status"] == 503 for entry in results):
+        response.headers["Retry-After"] = "1"
+    if fields is None:
+        # Full results have the same shape as GET /api/word/{word}
+        for entry in results:
+            if "data" in entry:
+                entry["data"] = WordResponse(**entry["data"]).model_dump()
+    return {"results": results}
+
+
+@app.post("/api/analyze")
+async def analyze_text(request: Request):
+    """
+    Lemmatize and annotate running text (UTF-8 request body, either script).
+    
+    Streams one JSON object per token as NDJSON: token, start (character
+    offset), lemma, pos, labels, alternatives (other interpretations, if any)
+    and frequency rank. The body is spooled to a temporary file and analyzed
+    in chunks while the response is being sent; if the client stops reading,
+    the analysis stops.
+    """
+    _require("analyzer")
+    current = data
+    body = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > MAX_ANALYZE_BYTES:
+            body.close()
+            raise HTTPException(
+                status_code=413,
+                detail=f"Text too long (maximum is {MAX_ANALYZE_BYTES} bytes)"
+            )
+        body.write(chunk)
+    body.seek(0)
+    
+    return StreamingResponse(
+        current.analyzer.stream_ndjson(body),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-store"}
+    )
+
+
+@app.get("/api/suggest")
+def get_suggestions(q: str, response: Response, limit: int = 10):
+    """
+    Autocomplete: the most frequent words starting with q.
+    
+    Accepts Latin or Cyrillic, with or without diacritics.
+    """
+    _require("suggest")
+    response.headers["Cache-Control"] = _cache_control(CACHE_MAX_AGE)
+    return {
+        "query": q,
+        "suggestions": data.suggest.suggest(q, limit)
+    }
+
+
+@app.get("/api/search/suffix")
+def search_suffix(q: str, response: Response, limit: int = 20, order: str = "frequency",
+                  cursor: Optional[str] = None):
+    """
+    Words ending in q (e.g. -ција), for rhymes.
+    
+    order is "frequency" (most frequent first) or "rhyme" (sorted by ending,
+    so words sharing longer endings are adjacent). Pass next_cursor from the
+    response as cursor to get the next page.
+    """
+    _require("suffix")
+    try:
+        result = data.suffix.search(q, limit, order, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    response.headers["Cache-Control"] = _cache_control(CACHE_MAX_AGE)
+    return {"query": q, "order": order, **result}
+
+
+@app.get("/api/search/pattern")
+def search_pattern(q: str, response: Response, length: Optional[int] = None, limit: int = 20):
+    """
+    Words matching a wildcard pattern (crossword mode), most frequent first.
+    
+    ? or _ stands for one letter and * for any number of letters
+    (e.g. ш_ол_, *ница); length keeps only words of that many letters.
+    """
+    _require("pattern")
+    try:
+        result = data.pattern.search(q, length, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    response.headers["Cache-Control"] = _cache_control(CACHE_MAX_AGE)
+    return {"query": q, "length": length, **result}
 
 
 @app.get("/api/random")
-def get_random_word():
+def get_random_word(response: Response, pos: Optional[str] = None,
+                    gender: Optional[str] = None, band: Optional[str] = None,
+                    count: Optional[int] = None, seed: Optional[str] = None):
     """
     Get a random word from the jezik database.
+    
+    Optionally only lemmas of a part of speech (noun or именица, ...), a
+    gender (m, f, n; nouns only) or a frequency band (top1k, top10k,
+    top100k, rare).
+    With count, up to that many distinct words (summaries, without the
+    morphology) are returned at once. The same seed (e.g. a date) always
+    gives the same words.
     """
-    word_data = jezik_service.get_random_word()
-    if not word_data:
-        raise HTTPException(status_code=500, detail="Could not fetch random word")
+    _require("random")
+    current = data
+    filtered = pos is not None or gender is not None or band is not None
+    if not current.random.available:
+        if filtered or count is not None or seed is not None:
+            raise HTTPException(status_code=503, detail="Random word filters need the form index")
+        word_data = current.jezik.get_random_word()
+        if not word_data:
+            raise HTTPException(status_code=500, detail="Could not fetch random word")
+        return word_data
+    
+    try:
+        total, words = current.random.sample(pos, gender, band, count or 1, seed)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if seed is not None:
+        response.headers["Cache-Control"] = _cache_control(CACHE_MAX_AGE)
+    else:
+        response.headers["Cache-Control"] = "no-store"
+    if count is not None:
+        return {"total": total, "seed": seed, "words": words}
+    if not words:
+        raise HTTPException(status_code=404, detail="No word matches the filters")
     
+    word = words[0]["word"]
+    word_data = current.jezik.lookup_word(word) or {}
+    word_data["word"] = word
     return word_data
 
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    if WORKERS > 1:
+        # Everything is loaded above, so the forked workers share it; reloads
+        # also happen here, followed by fresh workers
+        run_prefork(app, host="0.0.0.0", port=8000, workers=WORKERS, reload=reload_data,
+                    changed=_data_changed, reload_interval=RELOAD_INTERVAL)
+    else:
+        import uvicorn
+        uvicorn.run(app, host="0.0.0.0", port=8000)
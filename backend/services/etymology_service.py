@@ -0,0 +1,123 @@
+"""
+Etymology and definitions from a local SQLite store built from sr.wiktionary.
+
+The store is built offline by ``tools/build_etymology_db.py`` from a
+Wiktionary dump and keyed on ``canonical_key``, so a lemma is found in
+either script with one indexed query. Entries are read on demand and only
+the most recently used ones are kept in memory, so memory use does not grow
+with the size of the store; nothing is fetched over the network.
+"""
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+from .lru_cache import LRUCache
+from .normalize import canonical_key
+
+# Number of looked-up entries (including misses) kept per process
+DEFAULT_ETYMOLOGY_CACHE_SIZE = int(os.environ.get('RECNIK_ETYMOLOGY_CACHE_SIZE', 2048))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    etymology TEXT,
+    definitions TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def default_db_path() -> str:
+    """Return the etymology store location (production path first)."""
+    if os.path.exists('/opt/recnik/data/etymology.sqlite'):
+        return '/opt/recnik/data/etymology.sqlite'
+    return os.path.join(os.path.dirname(__file__), '../data/etymology.sqlite')
+
+
+class EtymologyService:
+    """Read-only lookups in the etymology store.
+
+    Every thread gets its own SQLite connection, opened on first use and
+    reopened after a fork, so the pre-fork parent and the stage thread pool
+    never share one.
+    """
+
+    def __init__(self, db_path: Optional[str] = None,
+                 cache_size: int = DEFAULT_ETYMOLOGY_CACHE_SIZE):
+        self.db_path = db_path or default_db_path()
+        self._cache = LRUCache(cache_size)
+        self._local = threading.local()
+        if not os.path.exists(self.db_path):
+            print(f"Warning: Etymology store not found at {self.db_path}, "
+                  f"etymology and definitions are disabled")
+
+    @property
+    def available(self) -> bool:
+        return os.path.exists(self.db_path)
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            local.pid = os.getpid()
+            local.connection = None
+            if self.available:
+                try:
+                    local.connection = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+                except sqlite3.Error as e:
+                    print(f"Error opening etymology store {self.db_path}: {e}")
+        return local.connection
+
+    def get_word_data(self, word: str) -> Optional[Dict[str, Any]]:
+        """Etymology and definitions of a lemma, or None if it has no entry.
+
+        Returns {"etymology": str or None, "definitions": [{"pos", "definition"}]}.
+        """
+        key = canonical_key(word.strip())
+        if not key:
+            return None
+        # Cached as a 1-tuple so that misses are cached too
+        cached = self._cache.get(key)
+        if cached is None:
+            try:
+                cached = (self._query(key),)
+            except sqlite3.Error as e:
+                # Not cached: the next request tries again
+                print(f"Error reading etymology for '{key}': {e}")
+                return None
+            self._cache.put(key, cached)
+        return cached[0]
+
+    def _query(self, key: str) -> Optional[Dict[str, Any]]:
+        connection = self._connection()
+        if connection is None:
+            return None
+        row = connection.execute(
+            "SELECT etymology, definitions FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        definitions: List[Dict[str, str]] = json.loads(row[1])
+        return {"etymology": row[0], "definitions": definitions}
+
+    def source_files(self) -> List[str]:
+        """Files whose contents determine this service's output."""
+        return [self.db_path] if self.available else []
+
+    def cache_stats(self) -> Dict[str, int]:
+        return self._cache.stats()
+
+
+# Singleton instance
+_etymology_service = None
+
+def get_etymology_service() -> EtymologyService:
+    global _etymology_service
+    if _etymology_service is None:
+        _etymology_service = EtymologyService()
+    return _etymology_service
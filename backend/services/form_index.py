@@ -0,0 +1,177 @@
+"""
+Inverted index from accent-stripped surface forms to jezik lemmas.
+
+The index is built offline by ``tools/build_form_index.py``, which expands
+every jezik paradigm once.  At runtime resolving an inflected form is a single
+dictionary probe instead of guessing candidate lemmas and calling ``lookup()``
+on each of them.
+"""
+import os
+import sys
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .normalize import canonical_key
+
+INDEX_HEADER = "# recnik-form-index v1"
+
+
+class FormEntry(NamedTuple):
+    """One interpretation of a surface form."""
+    lemma: str
+    pos: str
+    variant_idx: int
+    labels: Tuple[str, ...]
+    accented_form: str
+
+
+def form_key(text: str) -> str:
+    """Normalize a word form for index lookups (lowercase Cyrillic, no accents).
+
+    jezik forms are Cyrillic, so their keys are the same as before Latin
+    input was folded in; existing index files stay valid.
+    """
+    return canonical_key(text)
+
+
+def default_index_path() -> str:
+    """Return the form index location (production path first)."""
+    if os.path.exists('/opt/recnik/data/form_index.tsv'):
+        return '/opt/recnik/data/form_index.tsv'
+    return os.path.join(os.path.dirname(__file__), '../data/form_index.tsv')
+
+
+class FormIndex:
+    """Surface form -> list of (lemma, pos, variant_idx, labels, accented form)."""
+
+    def __init__(self, index_file: Optional[str] = None):
+        self.index_file = index_file or default_index_path()
+        self.forms: Dict[str, Tuple[FormEntry, ...]] = {}
+        self._load_index()
+
+    @property
+    def available(self) -> bool:
+        return bool(self.forms)
+
+    def _load_index(self):
+        """Load the prebuilt index from TSV."""
+        if not os.path.exists(self.index_file):
+            print(f"Warning: Form index not found at {self.index_file}, "
+                  f"falling back to heuristic form search")
+            return
+
+        # Lemmas, POS tags and label tuples repeat a lot, share one object each
+        shared: Dict[object, object] = {}
+
+        def share(value):
+            return shared.setdefault(value, value)
+
+        forms: Dict[str, List[FormEntry]] = {}
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                header = f.readline().rstrip('\n')
+                if header != INDEX_HEADER:
+                    print(f"Warning: Unsupported form index format in {self.index_file}")
+                    return
+
+                for line in f:
+                    parts = line.rstrip('\n').split('\t')
+                    if len(parts) != 6:
+                        continue
+                    form, lemma, pos, variant_idx, labels, accented = parts
+                    entry = FormEntry(
+                        share(lemma),
+                        share(pos),
+                        int(variant_idx),
+                        share(tuple(labels.split('|'))),
+                        accented,
+                    )
+                    forms.setdefault(sys.intern(form), []).append(entry)
+
+            self.forms = {form: tuple(entries) for form, entries in forms.items()}
+            print(f"Loaded {len(self.forms)} surface forms into form index")
+
+        except Exception as e:
+            print(f"Error loading form index: {e}")
+            self.forms = {}
+
+    def lookup(self, word: str) -> Tuple[FormEntry, ...]:
+        """Return every interpretation of a (possibly accented) word form."""
+        return self.forms.get(form_key(word), ())
+
+    def lemmas(self) -> List[str]:
+        """Return all lemmas present in the index, sorted."""
+        return sorted({entry.lemma for entries in self.forms.values() for entry in entries})
+
+
+def build_entries(lemmas: Iterable[str], lookup) -> Dict[str, List[FormEntry]]:
+    """Expand the paradigm of every lemma into surface form entries.
+
+    Entries for a form are ordered the same way the old heuristic search
+    preferred them: lemmas sharing the longest prefix with the form first.
+    Only the first variant of a given lemma+POS combination is kept.
+    """
+    forms: Dict[str, List[FormEntry]] = {}
+
+    for lemma in lemmas:
+        try:
+            result = lookup(lemma)
+        except Exception as e:
+            print(f"Error expanding '{lemma}': {e}")
+            continue
+        if not result:
+            continue
+
+        seen_pos = set()
+        for variant_idx, table in enumerate(result):
+            if table.pos in seen_pos:
+                continue
+            seen_pos.add(table.pos)
+
+            # form key -> (labels, first accented form) within this table
+            table_forms: Dict[str, Tuple[List[str], str]] = {}
+            for label, cell_forms in table:
+                for form in cell_forms:
+                    key = form_key(form)
+                    if key not in table_forms:
+                        table_forms[key] = ([], form)
+                    labels = table_forms[key][0]
+                    if label.strip() not in labels:
+                        labels.append(label.strip())
+
+            for key, (labels, accented) in table_forms.items():
+                forms.setdefault(key, []).append(
+                    FormEntry(lemma, table.pos, variant_idx, tuple(labels), accented)
+                )
+
+    for key, entries in forms.items():
+        entries.sort(key=lambda e: (-_common_prefix_len(key, form_key(e.lemma)), e.lemma))
+
+    return forms
+
+
+def write_index(forms: Dict[str, List[FormEntry]], index_file: str):
+    """Write form entries to ``index_file`` in the TSV format FormIndex loads."""
+    os.makedirs(os.path.dirname(os.path.abspath(index_file)), exist_ok=True)
+    tmp_file = index_file + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write(INDEX_HEADER + '\n')
+        for key in sorted(forms):
+            for entry in forms[key]:
+                f.write('\t'.join([
+                    key,
+                    entry.lemma,
+                    entry.pos,
+                    str(entry.variant_idx),
+                    '|'.join(entry.labels),
+                    entry.accented_form,
+                ]) + '\n')
+    os.replace(tmp_file, index_file)
+
+
+def _common_prefix_len(a: str, b: str) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
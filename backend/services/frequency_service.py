@@ -1,30 +1,57 @@
 import os
-from typing import Optional, Dict
+import sys
+import time
+from array import array
+from typing import Optional, Dict, List, Union
+
+from .normalize import CANONICAL_KEY_VERSION, canonical_key
+from .snapshot import SortedKeyIndex, load_snapshot
 
 class FrequencyService:
-    """Service for word frequency data."""
+    """Service for word frequency data.
+    
+    Each line of the frequency table becomes one row of two packed arrays
+    (count and rank). The canonical keys of words and their variants map to
+    the row index, so the table costs one dict entry per distinct key instead
+    of a dict per word, a word has the same frequency in either script, and
+    the table is never modified after loading. Keys are interned, so they are
+    the same string objects as the equal keys of the form index. With a
+    binary snapshot the same structure is mapped from disk (sorted keys
+    instead of a dict).
+    """
     
-    def __init__(self):
-        self.frequency_data = {}
+    def __init__(self, use_snapshot: bool = True, freq_file: Optional[str] = None):
+        self.word_rows: Union[Dict[str, int], SortedKeyIndex] = {}
+        self.counts = array('q')
+        self.ranks = array('q')
         self.total_words = 0
-        self._load_frequency_data()
+        self.freq_file = None
+        self.snapshot_file = None
+        self._load_frequency_data(use_snapshot, freq_file)
     
-    def _load_frequency_data(self):
+    def _load_frequency_data(self, use_snapshot: bool = True, freq_file: Optional[str] = None):
         """Load frequency data from TSV file."""
-        # Check production path first
-        if os.path.exists('/opt/recnik/inflection-sr/data/word_frequency_table.tsv'):
-            freq_file = '/opt/recnik/inflection-sr/data/word_frequency_table.tsv'
-        else:
-            # Development path
-            freq_file = os.path.join(
-                os.path.dirname(__file__),
-                '../../../inflection-sr/data/word_frequency_table.tsv'
-            )
+        # An explicit file (e.g. benchmark fixtures) overrides the default locations
+        if freq_file is None:
+            # Check production path first
+            if os.path.exists('/opt/recnik/inflection-sr/data/word_frequency_table.tsv'):
+                freq_file = '/opt/recnik/inflection-sr/data/word_frequency_table.tsv'
+            else:
+                # Development path
+                freq_file = os.path.join(
+                    os.path.dirname(__file__),
+                    '../../../inflection-sr/data/word_frequency_table.tsv'
+                )
+        self.freq_file = freq_file
+        
+        if use_snapshot and self._load_snapshot():
+            return
         
         if not os.path.exists(freq_file):
             print(f"Warning: Frequency file not found at {freq_file}")
             return
         
+        word_rows = self.word_rows
         try:
             with open(freq_file, 'r', encoding='utf-8') as f:
                 for i, line in enumerate(f, 1):
@@ -32,43 +59,98 @@ class FrequencyService:
                     if len(parts) >= 2:
                         try:
                             count = int(parts[0])
-                            word = parts[1]
-                            # Store primary word form
-                            self.frequency_data[word] = {
-                                'count': count,
-                                'rank': i
-                            }
-                            # Also store all variants if provided
-                            if len(parts) >= 3:
-                                variants = parts[2].split(', ')
-                                for variant in variants:
-                                    if variant and variant not in self.frequency_data:
-                                        self.frequency_data[variant] = {
-                                            'count': count,
-                                            'rank': i
-                                        }
                         except ValueError:
                             continue
+                        # One row per line; the word and its variants share it.
+                        # Lines are in frequency order, so the first row
+                        # seen for a key is the most frequent spelling
+                        row = len(self.counts)
+                        self.counts.append(count)
+                        self.ranks.append(i)
+                        words = [parts[1]]
+                        # Also store all variants if provided
+                        if len(parts) >= 3:
+                            words.extend(parts[2].split(', '))
+                        for word in words:
+                            if word:
+                                word_rows.setdefault(sys.intern(canonical_key(word)), row)
             
-            self.total_words = len(self.frequency_data)
-            print(f"Loaded {self.total_words} words with frequency data")
+            self.total_words = len(self.counts)
+            print(f"Loaded {self.total_words} words with frequency data "
+                  f"({len(word_rows)} keys)")
             
         except Exception as e:
             print(f"Error loading frequency data: {e}")
     
-    def get_frequency(self, word: str) -> Optional[Dict[str, int]]:
-        """Get frequency data for a word with percentile."""
-        data = self.frequency_data.get(word)
-        if data and self.total_words > 0:
-            # Calculate percentile (lower rank = higher percentile)
-            percentile = 100 * (1 - (data['rank'] / self.total_words))
-            data['percentile'] = round(percentile, 2)
-        return data
+    def _load_snapshot(self) -> bool:
+        """Map the frequency table from the binary snapshot if it is up to date."""
+        snapshot = load_snapshot()
+        if snapshot is None or not snapshot.has('freq.keys'):
+            return False
+        if not snapshot.source_matches('frequency', self.freq_file):
+            print(f"Warning: Snapshot {snapshot.path} is older than {self.freq_file}, "
+                  f"loading the text file instead")
+            return False
+        
+        keys = snapshot.strings('freq.keys')
+        rows = snapshot.array('freq.rows')
+        self.counts = snapshot.array('freq.counts')
+        self.ranks = snapshot.array('freq.ranks')
+        self.total_words = len(self.counts)
+        self.snapshot_file = snapshot.path
+        if snapshot.meta.get("canonical_keys") != CANONICAL_KEY_VERSION:
+            start = time.time()
+            word_rows: Dict[str, int] = {}
+            for key, row in zip(keys, rows):
+                key = sys.intern(canonical_key(key))
+                if row < word_rows.get(key, row + 1):
+                    word_rows[key] = row
+            self.word_rows = word_rows
+            print(f"Warning: Snapshot {snapshot.path} has outdated canonical keys, re-keyed "
+                  f"{len(word_rows)} frequency keys in {time.time() - start:.1f}s (rebuild it)")
+            return True
+        
+        self.word_rows = SortedKeyIndex(keys, rows)
+        print(f"Mapped {self.total_words} words with frequency data from snapshot")
+        return True
+    
+    def write_snapshot(self, writer):
+        """Add the frequency tables to a SnapshotWriter."""
+        keys = sorted(self.word_rows)
+        writer.add_source('frequency', self.freq_file)
+        writer.add_strings('freq.keys', keys)
+        writer.add_array('freq.rows', 'I', (self.word_rows[key] for key in keys))
+        writer.add_array('freq.counts', 'q', self.counts)
+        writer.add_array('freq.ranks', 'q', self.ranks)
+        writer.meta["canonical_keys"] = CANONICAL_KEY_VERSION
+    
+    def get_frequency(self, word: str) -> Optional[Dict[str, Union[int, float]]]:
+        """Get frequency data for a word with percentile.
+        
+        Returns a new dict on every call; the percentile is computed on read
+        from the row's position among the loaded rows, so skipped lines never
+        push it below zero.
+        """
+        row = self.word_rows.get(canonical_key(word))
+        if row is None:
+            return None
+        rank = self.ranks[row]
+        # Calculate percentile (lower rank = higher percentile)
+        percentile = max(0.0, 100 * (1 - ((row + 1) / self.total_words)))
+        return {
+            'count': self.counts[row],
+            'rank': rank,
+            'percentile': round(percentile, 2)
+        }
+    
+    def source_files(self) -> List[str]:
+        """Files whose contents determine this service's output."""
+        return [f for f in (self.freq_file, self.snapshot_file) if f]
     
     def get_rank(self, word: str) -> Optional[int]:
         """Get frequency rank for a word (1 = most frequent)."""
-        data = self.frequency_data.get(word)
-        return data['rank'] if data else None
+        row = self.word_rows.get(canonical_key(word))
+        return self.ranks[row] if row is not None else None
 
 
 # Singleton
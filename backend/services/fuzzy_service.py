@@ -0,0 +1,269 @@
+"""
+"Did you mean" suggestions for misspelled words (SymSpell-style).
+
+Words are compared by their ``fold_key`` (script, case and diacritics folded,
+so 'kuca', 'kuća' and 'кућа' are the same key), and every key is indexed
+under the variants of its prefix with up to ``max_distance`` characters
+deleted. A query generates the same deletion variants of its own key; keys
+sharing a variant are the only candidates, and their real edit distance
+(insertions, deletions, substitutions, adjacent transpositions) is computed
+for those alone, so a lookup costs a few dozen probes of a sorted array
+instead of a scan of the word list.
+"""
+import heapq
+import os
+import time
+import zlib
+from array import array
+from bisect import bisect_left
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+from .normalize import fold_key, is_cyrillic, to_latin
+from .snapshot import load_snapshot
+from .suggest_service import UNRANKED
+
+# Edits tolerated between the folded query and a suggestion
+DEFAULT_MAX_DISTANCE = int(os.environ.get('RECNIK_FUZZY_MAX_DISTANCE', 1))
+
+# Most frequent words indexed besides the jezik lemmas (bounds memory)
+DEFAULT_MAX_WORDS = int(os.environ.get('RECNIK_FUZZY_MAX_WORDS', 500000))
+
+# Only this many leading characters are indexed; longer words are told apart
+# when their candidates are verified
+PREFIX_LENGTH = 7
+
+# Keys longer than this are not looked up
+MAX_QUERY_LENGTH = 40
+
+# Index entries are (crc32 of the variant << ID_BITS) | key id
+ID_BITS = 24
+
+
+def deletion_variants(key: str, max_distance: int) -> Set[str]:
+    """The key's prefix with every combination of up to ``max_distance`` deletions."""
+    prefix = key[:PREFIX_LENGTH]
+    variants = {prefix}
+    for distance in range(1, min(max_distance, len(prefix)) + 1):
+        for positions in combinations(range(len(prefix)), distance):
+            variants.add(''.join(char for i, char in enumerate(prefix) if i not in positions))
+    return variants
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, or ``limit + 1`` if above ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if a == b:
+        return 0
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1] if previous[-1] <= limit else limit + 1
+
+
+def _variant_hash(variant: str) -> int:
+    return zlib.crc32(variant.encode('utf-8'))
+
+
+class DeletionIndex:
+    """Folded keys, the words spelled with each, and the deletion index.
+
+    ``entries`` is a sorted array of ``(crc32(variant) << ID_BITS) | key id``;
+    the ids for a variant are one contiguous run of it. Hash collisions only
+    add candidates, which verification discards.
+    """
+
+    def __init__(self, keys: Sequence[str], offsets: Sequence[int], words: Sequence[str],
+                 ranks: Sequence[int], entries: Sequence[int], max_distance: int):
+        self.keys = keys          # Sorted distinct folded keys
+        self.offsets = offsets    # words[offsets[i]:offsets[i + 1]] spell keys[i]
+        self.words = words
+        self.ranks = ranks        # Rank of each word
+        self.entries = entries
+        self.max_distance = max_distance
+
+    @classmethod
+    def build(cls, ranked_words: Dict[str, int], max_distance: int) -> "DeletionIndex":
+        """Index ``word -> rank`` (UNRANKED for words without frequency data)."""
+        spellings = sorted((fold_key(word), rank, word) for word, rank in ranked_words.items())
+        keys: List[str] = []
+        offsets = array('I')
+        words: List[str] = []
+        ranks = array('I')
+        for key, rank, word in spellings:
+            if not key:
+                continue
+            if not keys or keys[-1] != key:
+                keys.append(key)
+                offsets.append(len(words))
+            words.append(word)
+            ranks.append(rank)
+        offsets.append(len(words))
+        if len(keys) >= 1 << ID_BITS:
+            raise ValueError(f"Too many keys for the fuzzy index ({len(keys)})")
+
+        entries = []
+        for key_id, key in enumerate(keys):
+            for variant in deletion_variants(key, max_distance):
+                entries.append((_variant_hash(variant) << ID_BITS) | key_id)
+        entries.sort()
+        return cls(keys, offsets, words, ranks, array('Q', entries), max_distance)
+
+    def write_snapshot(self, writer, name: str):
+        writer.add_strings(f'{name}.keys', self.keys)
+        writer.add_array(f'{name}.offsets', 'I', self.offsets)
+        writer.add_strings(f'{name}.words', self.words)
+        writer.add_array(f'{name}.ranks', 'I', self.ranks)
+        writer.add_array(f'{name}.entries', 'Q', self.entries)
+        writer.meta[name] = {"max_distance": self.max_distance, "prefix_length": PREFIX_LENGTH}
+
+    @classmethod
+    def from_snapshot(cls, snapshot, name: str) -> "DeletionIndex":
+        return cls(snapshot.strings(f'{name}.keys'), snapshot.array(f'{name}.offsets'),
+                   snapshot.strings(f'{name}.words'), snapshot.array(f'{name}.ranks'),
+                   snapshot.array(f'{name}.entries'), snapshot.meta[name]["max_distance"])
+
+    def candidates(self, key: str) -> Set[int]:
+        """Ids of the keys sharing a deletion variant with ``key``."""
+        entries = self.entries
+        ids = set()
+        mask = (1 << ID_BITS) - 1
+        for variant in deletion_variants(key, self.max_distance):
+            start = _variant_hash(variant) << ID_BITS
+            i = bisect_left(entries, start)
+            end = start + (1 << ID_BITS)
+            while i < len(entries) and entries[i] < end:
+                ids.add(entries[i] & mask)
+                i += 1
+        return ids
+
+
+class FuzzyService:
+    """Spelling suggestions over the word list and the jezik lemmas.
+
+    Candidates are ranked by edit distance between the folded keys, then by
+    the distance between the spellings themselves (so a missing diacritic
+    beats a different letter), then by corpus frequency.
+    """
+
+    def __init__(self, wordlist_service, frequency_service, jezik_service=None,
+                 use_snapshot: bool = True, max_distance: int = DEFAULT_MAX_DISTANCE,
+                 max_words: int = DEFAULT_MAX_WORDS):
+        self.max_distance = max_distance
+        self.max_words = max_words
+        self.index: Optional[DeletionIndex] = None
+        if use_snapshot and self._load_snapshot(wordlist_service, frequency_service, jezik_service):
+            return
+        self._build_index(wordlist_service, frequency_service, jezik_service)
+
+    def _load_snapshot(self, wordlist_service, frequency_service, jezik_service) -> bool:
+        """Map the prebuilt index from the binary snapshot if it is up to date."""
+        snapshot = load_snapshot()
+        if snapshot is None or not snapshot.has('fuzzy.entries'):
+            return False
+        if snapshot.meta['fuzzy'] != {"max_distance": self.max_distance,
+                                      "prefix_length": PREFIX_LENGTH}:
+            print("Warning: Snapshot fuzzy index was built with other settings, rebuilding it")
+            return False
+        sources = [('wordlist', wordlist_service.wordlist_file),
+                   ('frequency', frequency_service.freq_file)]
+        if jezik_service is not None:
+            sources.append(('form_index', jezik_service.form_index.index_file))
+        for name, path in sources:
+            if name in snapshot.meta["sources"] and not snapshot.source_matches(name, path):
+                print(f"Warning: Snapshot {snapshot.path} is older than {path}, "
+                      f"rebuilding the fuzzy index")
+                return False
+
+        self.index = DeletionIndex.from_snapshot(snapshot, 'fuzzy')
+        print(f"Mapped fuzzy index over {len(self.index.keys)} keys from snapshot")
+        return True
+
+    def write_snapshot(self, writer):
+        """Add the fuzzy index to a SnapshotWriter."""
+        if self.index is not None:
+            self.index.write_snapshot(writer, 'fuzzy')
+
+    def _build_index(self, wordlist_service, frequency_service, jezik_service):
+        start = time.time()
+
+        lemmas: Iterable[str] = ()
+        if jezik_service is not None and jezik_service.form_index.available:
+            lemmas = jezik_service.form_index.lemmas()
+        ranked_words = {}
+        for word in lemmas:
+            rank = frequency_service.get_rank(word)
+            ranked_words[word] = rank if rank is not None else UNRANKED
+
+        # The most frequent words of the word list (unranked ones last)
+        others = ((rank if rank is not None else UNRANKED, word)
+                  for word, rank in ((word, frequency_service.get_rank(word))
+                                     for word in wordlist_service.word_set)
+                  if word not in ranked_words)
+        for rank, word in heapq.nsmallest(self.max_words, others):
+            ranked_words[word] = rank
+        if not ranked_words:
+            return
+
+        self.index = DeletionIndex.build(ranked_words, self.max_distance)
+        print(f"Built fuzzy index over {len(self.index.keys)} keys "
+              f"({len(self.index.entries)} entries) in {time.time() - start:.1f}s")
+
+    def did_you_mean(self, query: str, limit: int = 5) -> List[Dict[str, Optional[int]]]:
+        """Known words within ``max_distance`` edits of ``query``, best first.
+
+        Each word is given once, preferably in the script of the query.
+        """
+        if self.index is None:
+            return []
+        key = fold_key(query.strip())
+        if not key or len(key) > MAX_QUERY_LENGTH:
+            return []
+
+        index = self.index
+        query_lower = query.strip().lower()
+        spelling = to_latin(query_lower)
+        want_cyrillic = is_cyrillic(query)
+        scored = []
+        for key_id in index.candidates(key):
+            distance = edit_distance(key, index.keys[key_id], self.max_distance)
+            if distance > self.max_distance:
+                continue
+            # One word per key: the best-ranked spelling other than the query
+            # itself, in the query's script if it is spelled the same in both
+            best = None
+            for i in range(index.offsets[key_id], index.offsets[key_id + 1]):
+                word = index.words[i]
+                if word.lower() == query_lower:
+                    continue
+                candidate = (to_latin(word.lower()), is_cyrillic(word) != want_cyrillic,
+                             index.ranks[i], word)
+                if best is None:
+                    best = candidate
+                elif candidate[0] == best[0]:
+                    best = min(best, candidate)
+                elif candidate[2] < best[2]:
+                    best = candidate
+            if best is None:
+                continue
+            word_spelling, _, rank, word = best
+            spelling_distance = edit_distance(spelling, word_spelling, self.max_distance + len(key))
+            scored.append((distance, spelling_distance, rank, word))
+
+        return [
+            {"word": word, "distance": distance, "rank": rank if rank != UNRANKED else None}
+            for distance, _, rank, word in heapq.nsmallest(limit, scored)
+        ]
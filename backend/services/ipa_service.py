@@ -1,6 +1,14 @@
 """
 Service for converting Serbian Cyrillic text with accent marks to IPA notation.
 """
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .lru_cache import LRUCache
+
+# Number of lemma paradigms whose IPA is kept per process
+DEFAULT_PARADIGM_CACHE_SIZE = int(os.environ.get('RECNIK_PARADIGM_IPA_CACHE_SIZE', 2048))
 
 class IPAService:
     """Convert Serbian text with accents to IPA phonetic notation."""
@@ -34,6 +42,57 @@ class IPAService:
         '\u0304': 'ː',          # Macron (long)
     }
     
+    # Accent marks to (stress type, long); the macron only marks length
+    ACCENT_TO_STRESS = {
+        '\u0300': ('rising', False),
+        '\u0301': ('rising', True),
+        '\u030f': ('falling', True),
+        '\u0311': ('falling', False),
+        '\u0304': (None, True),
+    }
+    
+    def __init__(self, paradigm_cache_size: int = DEFAULT_PARADIGM_CACHE_SIZE):
+        self._compile()
+        self._paradigm_cache = LRUCache(paradigm_cache_size)
+    
+    def _compile(self):
+        """Precompute the transcription tables.
+        
+        Letters directly followed by an accent mark and the digraphs (lj, nj,
+        dž, with or without accent) are replaced in one regex pass using a
+        precomputed spelling for every such sequence; the remaining single
+        letters are mapped by one str.translate table. Accent marks not
+        attached to a letter are kept as they are.
+        """
+        letters = {**self.CYRILLIC_TO_IPA,
+                   **{k: v for k, v in self.LATIN_TO_IPA.items() if len(k) == 1}}
+        digraphs = {k: v for k, v in self.LATIN_TO_IPA.items() if len(k) == 2}
+        
+        sequences = dict(digraphs)
+        for base, ipa in {**letters, **digraphs}.items():
+            for mark, ipa_mark in self.ACCENT_TO_IPA.items():
+                sequences[base + mark] = ipa + ipa_mark
+        self._sequences = sequences
+        self._letter_table = str.maketrans(letters)
+        
+        # The replaced sequences must come out of the translate step unchanged
+        for ipa in sequences.values():
+            if ipa.translate(self._letter_table) != ipa:
+                raise ValueError(f"IPA output '{ipa}' overlaps with the letter table")
+        
+        marks = ''.join(self.ACCENT_TO_IPA)
+        self._sequence_re = re.compile(
+            f"(?:{'|'.join(map(re.escape, digraphs))})[{marks}]?"
+            f"|[{re.escape(''.join(letters))}][{marks}]"
+        )
+        self._accent_re = re.compile(f"[{marks}]")
+    
+    def _transcribe_lower(self, text: str) -> str:
+        sequences = self._sequences
+        replaced = self._sequence_re.sub(lambda m: sequences[m.group()], text)
+        return replaced.translate(self._letter_table)
+    
+    
     def to_ipa(self, text: str) -> str:
         """
         Convert Serbian text with accent marks to IPA.
@@ -46,57 +105,27 @@ class IPAService:
         """
         if not text:
             return ""
+        return self._transcribe_lower(text.lower())
+    
+    def to_ipa_many(self, texts: Iterable[str]) -> List[str]:
+        """
+        Convert many strings to IPA, in order.
         
-        result = []
-        text_lower = text.lower()
-        
-        i = 0
-        while i < len(text_lower):
-            char = text_lower[i]
-            
-            # Check for digraphs first (lj, nj, dž)
-            if i + 1 < len(text_lower):
-                digraph = text_lower[i:i+2]
-                if digraph in self.LATIN_TO_IPA:
-                    result.append(self.LATIN_TO_IPA[digraph])
-                    # Check for accent after digraph
-                    if i + 2 < len(text_lower) and text_lower[i + 2] in self.ACCENT_TO_IPA:
-                        accent_mark = self.ACCENT_TO_IPA[text_lower[i + 2]]
-                        if accent_mark:
-                            result.append(accent_mark)
-                        i += 1
-                    i += 2
-                    continue
-            
-            # Check if it's a Cyrillic letter
-            if char in self.CYRILLIC_TO_IPA:
-                ipa_char = self.CYRILLIC_TO_IPA[char]
-                result.append(ipa_char)
-                
-                # Check for accent marks after this character
-                if i + 1 < len(text_lower) and text_lower[i + 1] in self.ACCENT_TO_IPA:
-                    accent_mark = self.ACCENT_TO_IPA[text_lower[i + 1]]
-                    if accent_mark:
-                        result.append(accent_mark)
-                    i += 1  # Skip the accent mark
-            # Check if it's a Latin letter
-            elif char in self.LATIN_TO_IPA:
-                ipa_char = self.LATIN_TO_IPA[char]
-                result.append(ipa_char)
-                
-                # Check for accent marks after this character
-                if i + 1 < len(text_lower) and text_lower[i + 1] in self.ACCENT_TO_IPA:
-                    accent_mark = self.ACCENT_TO_IPA[text_lower[i + 1]]
-                    if accent_mark:
-                        result.append(accent_mark)
-                    i += 1  # Skip the accent mark
-            else:
-                # Keep other characters as is
-                result.append(char)
-            
-            i += 1
-        
-        return ''.join(result)
+        Repeated strings are transcribed once, and all distinct strings are
+        transcribed in a single pass over their newline-joined text.
+        """
+        texts = list(texts)
+        unique = list(dict.fromkeys(text for text in texts if text))
+        if any('\n' in text for text in unique):
+            transcribed = [self.to_ipa(text) for text in unique]
+        else:
+            transcribed = self._transcribe_lower('\n'.join(unique).lower()).split('\n')
+        ipa = dict(zip(unique, transcribed))
+        return [ipa.get(text, "") for text in texts]
+    
+    def transcribe(self, text: str) -> Tuple[str, dict]:
+        """IPA and stress pattern (see extract_stress_pattern) of ``text``."""
+        return self.to_ipa(text), self.extract_stress_pattern(text)
     
     def extract_stress_pattern(self, text: str) -> dict:
         """
@@ -108,37 +137,38 @@ class IPAService:
         if not text:
             return {}
         
-        stress_pos = -1
-        stress_type = None
-        is_long = False
+        # The first accent mark decides; position is that of the vowel before it
+        match = self._accent_re.search(text)
+        if match is None or match.start() == 0:
+            return {}
         
-        for i, char in enumerate(text):
-            if char in self.ACCENT_TO_IPA:
-                stress_pos = i - 1  # Position of the vowel before the accent
-                if char == '\u0300':
-                    stress_type = 'rising'
-                    is_long = False
-                elif char == '\u0301':
-                    stress_type = 'rising'
-                    is_long = True
-                elif char == '\u030f':
-                    stress_type = 'falling'
-                    is_long = True
-                elif char == '\u0311':
-                    stress_type = 'falling'
-                    is_long = False
-                elif char == '\u0304':
-                    is_long = True
-                break
+        stress_type, is_long = self.ACCENT_TO_STRESS[match.group()]
+        return {
+            'position': match.start() - 1,
+            'type': stress_type,
+            'length': 'long' if is_long else 'short'
+        }
+    
+    def paradigm_ipa(self, lemma: str, morphology: Dict[str, List[str]]) -> Dict[str, Tuple[str, ...]]:
+        """
+        IPA of every form of a morphology table, keyed like the table.
         
-        if stress_pos >= 0:
-            return {
-                'position': stress_pos,
-                'type': stress_type,
-                'length': 'long' if is_long else 'short'
+        Computed once per lemma and then served from a per-process cache.
+        """
+        cached: Optional[Dict[str, Tuple[str, ...]]] = self._paradigm_cache.get(lemma)
+        if cached is None:
+            forms = [form for cell in morphology.values() for form in cell]
+            transcribed = iter(self.to_ipa_many(forms))
+            cached = {
+                label: tuple(next(transcribed) for _ in cell)
+                for label, cell in morphology.items()
             }
-        
-        return {}
+            self._paradigm_cache.put(lemma, cached)
+        return cached
+    
+    def cache_stats(self) -> Dict[str, int]:
+        """Hit, miss and eviction counters of the paradigm cache."""
+        return self._paradigm_cache.stats()
 
 
 # Singleton
@@ -1,6 +1,14 @@
 import sys
 import os
-from typing import Optional, Dict, Any, List
+import random
+import importlib
+from typing import Optional, Dict, Any, List, Mapping, Tuple
+
+from . import metrics
+from .form_index import FormIndex
+from .lru_cache import LRUCache
+from .normalize import strip_accents
+from .paradigm_store import ParadigmStore
 
 # Add jezik to path - works for both development and production
 if os.path.exists('/opt/recnik/jezik'):
@@ -17,11 +25,181 @@ except ImportError as e:
     random_key = None
 
 
+def library_file(lookup_fn=None) -> Optional[str]:
+    """Module file of the jezik library (of ``lookup_fn``, default the current one)."""
+    lookup_fn = lookup_fn or lookup
+    module = sys.modules.get(lookup_fn.__module__) if lookup_fn is not None else None
+    return getattr(module, '__file__', None)
+
+
+def _library_mtime() -> Optional[int]:
+    """Modification time of the jezik module file, None if unknown."""
+    path = library_file()
+    try:
+        return os.stat(path).st_mtime_ns if path else None
+    except OSError:
+        return None
+
+
+_library_loaded_mtime = _library_mtime()
+
+
+def reload_library() -> bool:
+    """Re-import the jezik library if its module file changed since it was imported.
+    
+    Services created before keep the functions of the old import; returns
+    True if the library was reloaded.
+    """
+    global lookup, random_key, _library_loaded_mtime
+    mtime = _library_mtime()
+    if lookup is None or mtime is None or mtime == _library_loaded_mtime:
+        return False
+    module = importlib.reload(sys.modules[lookup.__module__])
+    lookup, random_key = module.lookup, module.random_key
+    _library_loaded_mtime = mtime
+    print("Reloaded the jezik library")
+    return True
+
+# jezik POS tags -> Serbian names
+POS_SERBIAN = {
+    "noun": "именица",
+    "verb": "глагол",
+    "adjective": "придев",
+    "adverb": "прилог"
+}
+
+GENDERS = ("m", "f", "n")
+
+
+def noun_gender(forms: Mapping[str, str]) -> Optional[str]:
+    """Grammatical gender of a noun from its declension.
+
+    ``forms`` maps the labels of a noun paradigm ('sg gen', 'pl nom', ...) to
+    the form, lowercase and without accents. jezik labels noun rows by number
+    and case only, so the gender follows from the endings: a genitive
+    singular in -а is masculine or neuter (neuter if the nominative plural
+    also ends in -а), one in -е or -и feminine (школа, ствар). Nouns without
+    a singular go by the nominative plural (врата, маказе). Masculine nouns
+    declined like feminine ones (судија, слуга) come out feminine.
+    """
+    sg_gen = forms.get('sg gen')
+    pl_nom = forms.get('pl nom')
+    if sg_gen:
+        if sg_gen.endswith('а'):
+            if pl_nom:
+                return 'n' if pl_nom.endswith('а') else 'm'
+            return 'n' if forms.get('sg nom', '').endswith(('о', 'е')) else 'm'
+        if sg_gen.endswith(('е', 'и')):
+            return 'f'
+        return None
+    if pl_nom:
+        return {'а': 'n', 'е': 'f', 'и': 'm'}.get(pl_nom[-1])
+    return None
+
+
+# Number of lookup() results kept per process
+DEFAULT_LOOKUP_CACHE_SIZE = int(os.environ.get('RECNIK_LOOKUP_CACHE_SIZE', 4096))
+
+
+class ParsedTable:
+    """Read-only copy of a jezik table.
+    
+    Labels are stripped and every form is also kept without accents, so
+    matching a word against the paradigm needs no further normalization.
+    Iterates as (label, forms) pairs, like the original jezik table.
+    """
+    __slots__ = ('pos', 'rows', 'plain_rows')
+    
+    def __init__(self, pos: str, rows: Tuple[Tuple[str, Tuple[str, ...]], ...],
+                 plain_rows: Tuple[Tuple[str, ...], ...]):
+        self.pos = pos
+        self.rows = rows
+        self.plain_rows = plain_rows
+    
+    def __iter__(self):
+        return iter(self.rows)
+
+
 class JezikService:
     """Service for interacting with the jezik morphology library."""
     
-    def __init__(self):
-        self.available = lookup is not None
+    def __init__(self, form_index: Optional[FormIndex] = None,
+                 cache_size: int = DEFAULT_LOOKUP_CACHE_SIZE,
+                 paradigm_store: Optional[ParadigmStore] = None):
+        # Bound here, so reloading the library only affects new instances
+        self._jezik_lookup = lookup
+        self._jezik_random_key = random_key
+        self.form_index = form_index if form_index is not None else FormIndex()
+        self.paradigms = paradigm_store if paradigm_store is not None else \
+            ParadigmStore(jezik_file=library_file(lookup))
+        # The exported paradigms are enough to serve without the library
+        self.available = lookup is not None or self.paradigms.available
+        self._lookup_cache = LRUCache(cache_size)
+    
+    def _lookup(self, word: str) -> Tuple[ParsedTable, ...]:
+        """Cached jezik lookup() returning parsed, immutable tables.
+        
+        Every lookup in this service goes through here. Lemmas in the
+        paradigm store are read from it and only the others are generated by
+        jezik (none if the store is complete: it then answers misses too).
+        Parsed tables are kept per process until they are evicted. Misses
+        are cached too (as an empty tuple).
+        """
+        tables = self._lookup_cache.get(word)
+        if tables is None:
+            stored = self.paradigms.tables(word)
+            if stored is not None:
+                metrics.count("paradigm_store_reads")
+                tables = tuple(ParsedTable(*table) for table in stored)
+            elif self._jezik_lookup is None or self.paradigms.complete:
+                tables = ()
+            else:
+                metrics.count("jezik_lookups")
+                with metrics.stage("paradigm"):
+                    tables = tuple(self._parse_table(table)
+                                   for table in self._jezik_lookup(word) or ())
+            self._lookup_cache.put(word, tables)
+        else:
+            metrics.count("lookup_cache_hits")
+        return tables
+    
+    def _parse_table(self, table) -> ParsedTable:
+        rows = []
+        plain_rows = []
+        for label, forms in table:
+            forms = tuple(forms)
+            rows.append((label.strip(), forms))
+            plain_rows.append(tuple(strip_accents(form.lower()) for form in forms))
+        return ParsedTable(table.pos, tuple(rows), tuple(plain_rows))
+    
+    def preload(self):
+        """Run one lookup so data jezik loads lazily is loaded now.
+        
+        Called in the pre-fork parent, so the workers inherit it instead of
+        each loading their own copy on the first request.
+        """
+        if self._jezik_lookup is None:
+            return
+        entries = next(iter(self.form_index.forms.values()), ())
+        word = entries[0].lemma if entries else 'кућа'
+        try:
+            self._lookup(word)
+        except Exception as e:
+            print(f"Error preloading jezik: {e}")
+    
+    def source_files(self) -> List[str]:
+        """Files whose contents determine this service's output."""
+        files = [self.form_index.index_file]
+        if self.paradigms.available:
+            files.append(self.paradigms.store_file)
+        jezik_file = library_file(self._jezik_lookup)
+        if jezik_file:
+            files.append(jezik_file)
+        return files
+    
+    def cache_stats(self) -> Dict[str, int]:
+        """Hit, miss and eviction counters of the lookup cache."""
+        return self._lookup_cache.stats()
     
     def lookup_word(self, word: str) -> Optional[Dict[str, Any]]:
         """
@@ -31,9 +209,9 @@ class JezikService:
             return None
         
         try:
-            result = lookup(word)
+            result = self._lookup(word)
             
-            if not result or len(result) == 0:
+            if not result:
                 return None
             
             # Get the first table (first variant)
@@ -57,11 +235,16 @@ class JezikService:
     
     def get_random_word(self) -> Optional[Dict[str, str]]:
         """Get a random word from the jezik database."""
-        if not self.available or random_key is None:
+        if not self.available:
             return None
         
         try:
-            key, yat = random_key()
+            if self._jezik_random_key is not None:
+                key, yat = self._jezik_random_key()
+            elif self.paradigms.available and len(self.paradigms.lemmas):
+                key = self.paradigms.lemmas[random.randrange(len(self.paradigms.lemmas))]
+            else:
+                return None
             word_data = self.lookup_word(key)
             if word_data:
                 word_data["word"] = key
@@ -73,16 +256,13 @@ class JezikService:
     
     def _get_pos_serbian(self, pos: str) -> str:
         """Convert POS tag to Serbian."""
-        pos_map = {
-            "noun": "именица",
-            "verb": "глагол",
-            "adjective": "придев",
-            "adverb": "прилог"
-        }
-        return pos_map.get(pos, pos)
+        return POS_SERBIAN.get(pos, pos)
     
-    def _extract_gender(self, table) -> Optional[str]:
+    def _extract_gender(self, table: ParsedTable) -> Optional[str]:
         """Extract gender from the table caption or data."""
+        if table.pos == "noun":
+            return noun_gender({label: plain[0] for (label, _), plain
+                                in zip(table.rows, table.plain_rows) if plain})
         # Try to extract from morphology labels
         for label, forms in table:
             if "m " in label:
@@ -93,28 +273,45 @@ class JezikService:
                 return "n"
         return None
     
-    def _parse_morphology(self, table) -> Dict[str, Any]:
-        """Parse the morphology table into a structured format."""
-        morphology = {}
+    def _parse_morphology(self, table: ParsedTable) -> Dict[str, Any]:
+        """Parse the morphology table into a structured format.
         
-        for label, forms in table:
-            # Clean up the label
-            clean_label = label.strip()
-            
-            # Store the forms
-            morphology[clean_label] = forms
-        
-        return morphology
+        Labels of a ParsedTable are already stripped (and interned when
+        read from the paradigm store).
+        """
+        return {label: list(forms) for label, forms in table.rows}
     
     def find_all_lemmas_by_form(self, word: str) -> List[Dict[str, Any]]:
         """Find ALL possible lemmas for a word form.
         
         Returns a list of all matches (e.g., 'zlo' as noun AND as adjective 'zao').
+        Uses the prebuilt form index when available, otherwise falls back to
+        guessing candidate lemmas.
         """
-        if not self.available or not word or len(word) < 3:
+        if not self.available or not word:
             return []
         
-        word_clean = self._remove_accents(word.lower())
+        if self.form_index.available:
+            return [
+                {
+                    "lemma": entry.lemma,
+                    "labels": list(entry.labels),
+                    "accented_form": entry.accented_form,
+                    "pos": entry.pos,
+                    "variant_idx": entry.variant_idx
+                }
+                for entry in self.form_index.lookup(word)
+            ]
+        
+        if len(word) < 3:
+            return []
+        
+        with metrics.stage("form_search"):
+            return self._guess_lemmas_by_form(word)
+    
+    def _guess_lemmas_by_form(self, word: str) -> List[Dict[str, Any]]:
+        """Heuristic form search: try likely lemmas derived from the word."""
+        word_clean = strip_accents(word.lower())
         all_results = []
         seen_lemmas = set()  # Track which lemmas we've already checked
         
@@ -159,6 +356,7 @@ class JezikService:
                 if sub and sub != word:
                     self._check_lemma_match(sub, word_clean, all_results, seen_lemmas)
         
+        metrics.count("form_candidates", len(seen_lemmas))
         return all_results
     
     def _check_lemma_match(self, root: str, word_clean: str, all_results: list, seen_lemmas: set):
@@ -168,18 +366,17 @@ class JezikService:
         seen_lemmas.add(root)
         
         try:
-            result = lookup(root)
-            if result and len(result) > 0:
+            result = self._lookup(root)
+            if result:
                 # Check ALL variants returned by lookup
                 for variant_idx, table in enumerate(result):
                     matching_labels = []
                     accented_form = None
                     
-                    for label, forms in table:
-                        for form in forms:
-                            form_clean = self._remove_accents(form)
+                    for (label, forms), plain_forms in zip(table.rows, table.plain_rows):
+                        for form, form_clean in zip(forms, plain_forms):
                             if form_clean == word_clean:
-                                matching_labels.append(label.strip())
+                                matching_labels.append(label)
                                 if not accented_form:
                                     accented_form = form
                                 break
@@ -204,10 +401,27 @@ class JezikService:
         Strategy: Try progressively shorter roots of the word.
         Returns all matching forms (e.g., genitiv and akuzativ for "čoveka").
         """
-        if not self.available or not word or len(word) < 3:
+        if not self.available or not word:
             return None
         
-        word_clean = self._remove_accents(word.lower())
+        if self.form_index.available:
+            for entry in self.form_index.lookup(word):
+                try:
+                    result = self._lookup(entry.lemma)
+                    return {
+                        "lemma": entry.lemma,
+                        "labels": list(entry.labels),
+                        "accented_form": entry.accented_form,
+                        "table": result[entry.variant_idx]
+                    }
+                except Exception:
+                    continue
+            return None
+        
+        if len(word) < 3:
+            return None
+        
+        word_clean = strip_accents(word.lower())
         
         # Try different root lengths
         for root_len in range(len(word), 2, -1):
@@ -215,19 +429,18 @@ class JezikService:
             
             # Try the root as a potential lemma
             try:
-                result = lookup(root)
-                if result and len(result) > 0:
+                result = self._lookup(root)
+                if result:
                     table = result[0]
                     
                     # Collect ALL matching forms
                     matching_labels = []
                     accented_form = None
                     
-                    for label, forms in table:
-                        for form in forms:
-                            form_clean = self._remove_accents(form)
+                    for (label, forms), plain_forms in zip(table.rows, table.plain_rows):
+                        for form, form_clean in zip(forms, plain_forms):
                             if form_clean == word_clean:
-                                matching_labels.append(label.strip())
+                                matching_labels.append(label)
                                 if not accented_form:
                                     accented_form = form
                                 break
@@ -250,22 +463,21 @@ class JezikService:
             return None
         
         try:
-            result = lookup(lemma)
-            if not result or len(result) == 0:
+            result = self._lookup(lemma)
+            if not result:
                 return None
             
             table = result[0]
             
             # Remove accents from search word for comparison
-            word_clean = self._remove_accents(word)
+            word_clean = strip_accents(word.lower())
             
             # Search through all forms to find a match
-            for label, forms in table:
-                for form in forms:
-                    form_clean = self._remove_accents(form)
+            for (label, forms), plain_forms in zip(table.rows, table.plain_rows):
+                for form, form_clean in zip(forms, plain_forms):
                     if form_clean == word_clean:
                         return {
-                            "label": label.strip(),
+                            "label": label,
                             "accented_form": form
                         }
             
@@ -289,20 +501,17 @@ class JezikService:
             return []
         
         try:
-            result = lookup(lemma)
-            if not result or len(result) == 0:
+            result = self._lookup(lemma)
+            if not result:
                 return []
             
             table = result[0]
-            word_clean = self._remove_accents(word.lower())
+            word_clean = strip_accents(word.lower())
             matching_labels = []
             
-            for label, forms in table:
-                for form in forms:
-                    form_clean = self._remove_accents(form.lower())
-                    if form_clean == word_clean:
-                        matching_labels.append(label.strip())
-                        break
+            for label, plain_forms in zip(table.rows, table.plain_rows):
+                if word_clean in plain_forms:
+                    matching_labels.append(label[0])
             
             return matching_labels
         except Exception as e:
@@ -323,15 +532,15 @@ class JezikService:
             return None
         
         try:
-            result = lookup(lemma)
-            if not result or len(result) == 0:
+            result = self._lookup(lemma)
+            if not result:
                 return None
             
             table = result[0]
             label_clean = label.strip()
             
             for table_label, forms in table:
-                if table_label.strip() == label_clean:
+                if table_label == label_clean:
                     return forms[0] if forms else None
             
             return None
@@ -339,13 +548,6 @@ class JezikService:
             print(f"Error getting accented form for '{lemma}' ({label}): {e}")
             return None
     
-    def _remove_accents(self, text: str) -> str:
-        """Remove accent marks from text."""
-        import unicodedata
-        # Normalize and remove combining characters (accents)
-        normalized = unicodedata.normalize('NFD', text)
-        return ''.join(char for char in normalized if unicodedata.category(char) != 'Mn')
-
 
 # Singleton instance
 _jezik_service = None
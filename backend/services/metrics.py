@@ -0,0 +1,324 @@
+"""
+Per-request stage timings (Server-Timing) and process-wide Prometheus metrics.
+
+While a request is being handled, ``TimingMiddleware`` keeps a
+``RequestTimings`` in a context variable. Services time their stages with
+``stage(name)`` and count their work with ``count(name)``; both only look
+the context variable up and do nothing when no request is being timed, so
+with metrics disabled (``RECNIK_METRICS=0``, the middleware is then not
+installed) the instrumentation costs one context variable read per call.
+
+When the request finishes its stage durations and counts are sent back in a
+``Server-Timing`` header and added to the latency histograms and counters
+served in Prometheus text format by ``/metrics``. The numbers are per
+process: with pre-forked workers every worker has its own.
+"""
+import contextvars
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+ENABLED = os.environ.get('RECNIK_METRICS', '1') != '0'
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class RequestTimings:
+    """Stage durations and work counters of one request.
+
+    Stages may run on several threads at once, hence the lock.
+    """
+    __slots__ = ('start', 'durations', 'counts', '_lock')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.durations: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add_duration(self, name: str, seconds: float):
+        with self._lock:
+            self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def add_count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + amount
+
+    def server_timing(self, total: float) -> str:
+        """``Server-Timing`` header value (durations in milliseconds)."""
+        entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.durations.items()]
+        entries += [f"{name};desc={amount}" for name, amount in self.counts.items()]
+        entries.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(entries)
+
+
+_current: contextvars.ContextVar[Optional[RequestTimings]] = \
+    contextvars.ContextVar('recnik_request_timings', default=None)
+
+
+class _Stage:
+    __slots__ = ('timings', 'name', 'start')
+
+    def __init__(self, timings: RequestTimings, name: str):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.timings.add_duration(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+def stage(name: str):
+    """Context manager adding the time spent in the block to stage ``name``."""
+    timings = _current.get()
+    if timings is None:
+        return _NO_STAGE
+    return _Stage(timings, name)
+
+
+def count(name: str, amount: int = 1):
+    """Add ``amount`` to the request's counter ``name``."""
+    timings = _current.get()
+    if timings is not None:
+        timings.add_count(name, amount)
+
+
+def timed_call(name: str, fn: Callable) -> Callable:
+    """``fn`` wrapped to run as stage ``name`` of the current request.
+
+    For handing work to an executor: the wrapper carries the request's
+    context over to the thread it runs on.
+    """
+    timings = _current.get()
+    if timings is None:
+        return fn
+    context = contextvars.copy_context()
+
+    def call(*args):
+        with _Stage(timings, name):
+            return context.run(fn, *args)
+    return call
+
+
+class Counter:
+    """Monotonic counter with labels."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative histogram with labels, as Prometheus expects it."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [count per bucket (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: Tuple[str, ...] = ()):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        bounds = [_number(bound) for bound in self.buckets] + ['+Inf']
+        labelnames = self.labelnames + ('le',)
+        with self._lock:
+            for labels, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(bounds, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{self.name}_bucket{_labels(labelnames, labels + (bound,))} "
+                                 f"{cumulative}")
+                label_text = _labels(self.labelnames, labels)
+                lines.append(f"{self.name}_sum{label_text} {_number(total[0])}")
+                lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class Registry:
+    """The metrics of this process, plus collectors read at scrape time."""
+
+    def __init__(self):
+        self.metrics: List = []
+        self.collectors: List[Callable[[], Iterable[str]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[str]]):
+        """Register a function returning exposition lines (e.g. cache counters)."""
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+request_duration = REGISTRY.histogram(
+    'recnik_request_duration_seconds', 'Time to the response headers, by endpoint and status.',
+    ('endpoint', 'status'))
+stage_duration = REGISTRY.histogram(
+    'recnik_stage_duration_seconds', 'Time spent per request in each stage.', ('stage',))
+operations = REGISTRY.counter(
+    'recnik_operations_total', 'Work done while handling requests (lookups, candidates, ...).',
+    ('operation',))
+stages_abandoned = REGISTRY.counter(
+    'recnik_stages_abandoned_total',
+    'Lookup stages given up on at their deadline (their thread runs on), by stage.', ('stage',))
+lookups_shed = REGISTRY.counter(
+    'recnik_lookups_shed_total', 'Word lookups answered 503 because every stage slot was taken.')
+lookups_shed.inc((), 0)
+
+
+def cache_collector(caches: Dict[str, Callable[[], Dict[str, int]]]) -> Callable[[], List[str]]:
+    """Collector exporting ``stats()`` of LRU caches (hits, misses, evictions, size)."""
+
+    def collect() -> List[str]:
+        stats = {name: get_stats() for name, get_stats in caches.items()}
+        lines = []
+        for key, kind, documentation in (
+            ("hits", "counter", "Cache hits."),
+            ("misses", "counter", "Cache misses."),
+            ("evictions", "counter", "Cache evictions."),
+            ("size", "gauge", "Entries in the cache."),
+        ):
+            name = f"recnik_cache_{key}" + ("_total" if kind == "counter" else "")
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for cache, cache_stats in stats.items():
+                lines.append(f'{name}{{cache="{cache}"}} {cache_stats.get(key, 0)}')
+        return lines
+    return collect
+
+
+def gauge_collector(gauges: Dict[str, Tuple[str, Callable[[], float]]]) -> Callable[[], List[str]]:
+    """Collector exporting gauges read at scrape time: name -> (documentation, read)."""
+
+    def collect() -> List[str]:
+        lines = []
+        for name, (documentation, read) in gauges.items():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_number(read())}")
+        return lines
+    return collect
+
+
+class TimingMiddleware:
+    """ASGI middleware timing every HTTP request.
+
+    Adds the ``Server-Timing`` header when the response starts and records
+    the request's latency, stage durations and counters afterwards.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        status = [500]
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                total = time.perf_counter() - timings.start
+                header = timings.server_timing(total).encode('latin-1')
+                message = {**message, "headers": list(message.get("headers", []))
+                           + [(b"server-timing", header)]}
+                endpoint = scope.get("endpoint")
+                request_duration.observe(total, (getattr(endpoint, "__name__", "other"),
+                                                 str(status[0])))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            for name, seconds in list(timings.durations.items()):
+                stage_duration.observe(seconds, (name,))
+            for name, amount in list(timings.counts.items()):
+                operations.inc((name,), amount)
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value: float) -> str:
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
@@ -0,0 +1,124 @@
+"""
+Script and diacritic normalization shared by the search indexes.
+
+Two keys are used for matching. ``canonical_key`` (lowercase Serbian
+Cyrillic without accent marks) keys the word list, the frequency table and
+the form index, so a word resolves with one probe whatever script, case or
+accents it was typed in. ``fold_key`` additionally drops the difference
+between č/ć/c, š/s, ž/z and đ/dj, for autocomplete and typo tolerance.
+"""
+import re
+import unicodedata
+
+CYRILLIC_TO_LATIN = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'ђ': 'đ', 'е': 'e',
+    'ж': 'ž', 'з': 'z', 'и': 'i', 'ј': 'j', 'к': 'k', 'л': 'l', 'љ': 'lj',
+    'м': 'm', 'н': 'n', 'њ': 'nj', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's',
+    'т': 't', 'ћ': 'ć', 'у': 'u', 'ф': 'f', 'х': 'h', 'ц': 'c', 'ч': 'č',
+    'џ': 'dž', 'ш': 'š',
+}
+
+_TO_LATIN_TABLE = str.maketrans({
+    **CYRILLIC_TO_LATIN,
+    **{cyr.upper(): lat.capitalize() for cyr, lat in CYRILLIC_TO_LATIN.items()},
+})
+
+# Latin -> Cyrillic: the digraphs (lj, nj, dž in any capitalization) are
+# replaced first, then single letters through one table
+_LATIN_DIGRAPHS = {
+    variant: cyr if variant.islower() else cyr.upper()
+    for cyr, lat in CYRILLIC_TO_LATIN.items() if len(lat) == 2
+    for variant in (lat, lat.capitalize(), lat.upper())
+}
+_LATIN_DIGRAPH_RE = re.compile('|'.join(_LATIN_DIGRAPHS))
+_TO_CYRILLIC_TABLE = str.maketrans({
+    **{lat: cyr for cyr, lat in CYRILLIC_TO_LATIN.items() if len(lat) == 1},
+    **{lat.upper(): cyr.upper() for cyr, lat in CYRILLIC_TO_LATIN.items() if len(lat) == 1},
+})
+
+# Lowercase Latin without diacritics: č/ć -> c, š -> s, ž -> z, đ -> dj.
+# Applied after NFD, so č, ć, š, ž arrive as base letter + combining mark.
+_FOLD_TABLE = str.maketrans({
+    **{cyr: lat for cyr, lat in CYRILLIC_TO_LATIN.items()},
+    'ђ': 'dj', 'ж': 'z', 'ћ': 'c', 'ч': 'c', 'џ': 'dz', 'ш': 's',
+    'đ': 'dj',
+    # Combining marks (accents, carons, acutes) are dropped
+    **{chr(cp): None for cp in range(0x0300, 0x0370)},
+})
+
+
+# Version of the canonical key scheme; stored in snapshots keyed with it
+CANONICAL_KEY_VERSION = 2
+
+# Anything but the lowercase Serbian Cyrillic alphabet (which is already canonical)
+_NON_CANONICAL_RE = re.compile('[^абвгдђежзијклљмнњопрстћуфхцчџш]')
+
+# A letter left over after transliteration: the text was not Serbian (x, q,
+# w, y, ð, other scripts) and is keyed without transliterating it
+_FOREIGN_LETTER_RE = re.compile('[^\\W\\d_абвгдђежзијклљмнњопрстћуфхцчџш]')
+
+# Serbian accents, macrons and carons (Combining Diacritical Marks block);
+# below U+0483 (which includes Serbian Cyrillic) these are the only Mn characters
+_COMBINING_MARKS_RE = re.compile('[\u0300-\u036f]+')
+
+
+def strip_accents(text: str) -> str:
+    """Remove accent and other combining marks ('шко̑ла̄' -> 'школа', 'č' -> 'c').
+
+    Same result as dropping every Mn character after NFD; Latin and Serbian
+    Cyrillic text takes a single precompiled substitution instead of a
+    category lookup per character.
+    """
+    decomposed = unicodedata.normalize('NFD', text)
+    if decomposed.isascii():
+        return decomposed
+    if max(decomposed) < '\u0483':
+        return _COMBINING_MARKS_RE.sub('', decomposed)
+    return ''.join(char for char in decomposed if unicodedata.category(char) != 'Mn')
+
+
+def to_latin(text: str) -> str:
+    """Transliterate Serbian Cyrillic to Latin, keeping diacritics ('Љубав' -> 'Ljubav')."""
+    return text.translate(_TO_LATIN_TABLE)
+
+
+def to_cyrillic(text: str) -> str:
+    """Transliterate Serbian Latin (NFC) to Cyrillic."""
+    text = _LATIN_DIGRAPH_RE.sub(lambda m: _LATIN_DIGRAPHS[m.group()], text)
+    return text.translate(_TO_CYRILLIC_TABLE)
+
+
+def canonical_key(text: str) -> str:
+    """Script-, case- and accent-insensitive key, in lowercase Cyrillic.
+
+    'Škola', 'школа', 'шко̑ла' and 'ŠKOLA' all become 'школа'. Unlike
+    ``fold_key`` the letters with diacritics stay distinct ('kuca' -> 'куца',
+    'kuća' -> 'кућа'). Only text whose letters are all Serbian (Latin or
+    Cyrillic) is transliterated; anything else is just lowercased without
+    accents ('x-ray' -> 'x-ray', 'ÐAK' -> 'ðak').
+    """
+    if not _NON_CANONICAL_RE.search(text):
+        return text
+    # Precomposed Latin letters (č, ć, š, ž, đ) are transliterated before the
+    # accent marks are stripped, as NFD would split č into c + caron
+    lowered = unicodedata.normalize('NFC', text.lower())
+    text = to_cyrillic(lowered)
+    if _NON_CANONICAL_RE.search(text):
+        # Accented vowels (Latin or Cyrillic), combining marks, other characters
+        text = to_cyrillic(strip_accents(text))
+        if _FOREIGN_LETTER_RE.search(text):
+            return unicodedata.normalize('NFC', strip_accents(lowered))
+    return text
+
+
+def fold_key(text: str) -> str:
+    """Script-, case- and diacritic-insensitive key.
+
+    'Школа', 'škola' and 'skola' all fold to 'skola'; 'ђак' and 'djak' to 'djak'.
+    """
+    return unicodedata.normalize('NFD', text.lower()).translate(_FOLD_TABLE)
+
+
+def is_cyrillic(text: str) -> bool:
+    """True if the text contains any Cyrillic letter."""
+    return any('Ѐ' <= char <= 'ӿ' for char in text)
@@ -0,0 +1,202 @@
+"""
+Columnar store of the jezik paradigms.
+
+``tools/build_paradigm_store.py`` expands every jezik lemma once and writes
+its tables column by column, in the container format of the data snapshot
+(``services.snapshot``):
+
+    paradigm.lemmas        sorted lemma keys (string table)
+    paradigm.lemma_tables  per lemma: offset of its first table (+ end)
+    paradigm.table_pos     per table: part-of-speech id
+    paradigm.table_rows    per table: offset of its first row (+ end)
+    paradigm.row_labels    per row: label id into ``paradigm.labels``
+    paradigm.row_cells     per row: offset of its first form (+ end)
+    paradigm.cell_forms    per form: id of the accented form in ``paradigm.forms``
+    paradigm.cell_plain    per form: id of the form without accents
+    paradigm.forms         every distinct form spelling (string table)
+
+Labels ('sg nom', 'pl gen', ...) are interned once when the store is opened,
+and a paradigm is read by slicing the mapped arrays, so a lookup needs no
+jezik call and creates no label strings.
+"""
+import os
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .normalize import strip_accents
+from .snapshot import SnapshotWriter, load_snapshot
+
+# A table as (pos, ((label, forms), ...), ((plain form, ...), ...)), plain
+# forms being lowercase and without accents, row by row
+StoredTable = Tuple[str, Tuple[Tuple[str, Tuple[str, ...]], ...], Tuple[Tuple[str, ...], ...]]
+
+
+def default_store_path() -> str:
+    """Return the paradigm store location (production path first)."""
+    if os.path.exists('/opt/recnik/data/paradigms.bin'):
+        return '/opt/recnik/data/paradigms.bin'
+    return os.path.join(os.path.dirname(__file__), '../data/paradigms.bin')
+
+
+class ParadigmStore:
+    """Read-only, memory-mapped paradigm tables of every exported lemma."""
+
+    def __init__(self, store_file: Optional[str] = None, jezik_file: Optional[str] = None):
+        self.store_file = store_file or default_store_path()
+        self.available = False
+        self.complete = False
+        self.lemmas: Sequence[str] = []
+        self.labels: List[str] = []
+        self._load(jezik_file)
+
+    def _load(self, jezik_file: Optional[str]):
+        snapshot = load_snapshot(self.store_file)
+        if snapshot is None:
+            return
+        if 'paradigm' not in snapshot.meta:
+            print(f"Warning: {self.store_file} is not a paradigm store")
+            return
+        if jezik_file and 'jezik' in snapshot.meta["sources"] and \
+                not snapshot.source_matches('jezik', jezik_file):
+            print(f"Warning: Paradigm store {self.store_file} is older than {jezik_file}, "
+                  f"generating paradigms with jezik instead")
+            return
+
+        meta = snapshot.meta['paradigm']
+        self.lemmas = snapshot.strings('paradigm.lemmas')
+        self.labels = [sys.intern(label) for label in snapshot.strings('paradigm.labels')]
+        self.pos = [sys.intern(pos) for pos in meta["pos"]]
+        self.complete = meta["complete"]
+        self._forms = snapshot.strings('paradigm.forms')
+        self._lemma_tables = snapshot.array('paradigm.lemma_tables')
+        self._table_pos = snapshot.array('paradigm.table_pos')
+        self._table_rows = snapshot.array('paradigm.table_rows')
+        self._row_labels = snapshot.array('paradigm.row_labels')
+        self._row_cells = snapshot.array('paradigm.row_cells')
+        self._cell_forms = snapshot.array('paradigm.cell_forms')
+        self._cell_plain = snapshot.array('paradigm.cell_plain')
+        self.available = True
+        print(f"Mapped paradigm store with {len(self.lemmas)} lemmas "
+              f"({len(self._table_pos)} tables, {len(self.labels)} labels)")
+
+    def __contains__(self, lemma: str) -> bool:
+        return self._position(lemma) is not None
+
+    def _position(self, lemma: str) -> Optional[int]:
+        if not self.available:
+            return None
+        i = bisect_left(self.lemmas, lemma)
+        if i < len(self.lemmas) and self.lemmas[i] == lemma:
+            return i
+        return None
+
+    def tables(self, lemma: str) -> Optional[Tuple[StoredTable, ...]]:
+        """The tables of ``lemma``, or None if it was not exported."""
+        i = self._position(lemma)
+        if i is None:
+            return None
+        labels, row_labels = self.labels, self._row_labels
+        row_cells, cell_forms, cell_plain = self._row_cells, self._cell_forms, self._cell_plain
+        first_row = self._table_rows[self._lemma_tables[i]]
+        last_row = self._table_rows[self._lemma_tables[i + 1]]
+
+        # Decode each distinct form of the paradigm once (forms repeat
+        # across rows, and most plain forms are also accented forms)
+        start, end = row_cells[first_row], row_cells[last_row]
+        ids = set(cell_forms[start:end])
+        ids.update(cell_plain[start:end])
+        forms = {j: self._forms[j] for j in ids}
+
+        tables = []
+        for t in range(self._lemma_tables[i], self._lemma_tables[i + 1]):
+            rows = []
+            plain_rows = []
+            for r in range(self._table_rows[t], self._table_rows[t + 1]):
+                start, end = row_cells[r], row_cells[r + 1]
+                rows.append((labels[row_labels[r]],
+                             tuple([forms[j] for j in cell_forms[start:end]])))
+                plain_rows.append(tuple([forms[j] for j in cell_plain[start:end]]))
+            tables.append((self.pos[self._table_pos[t]], tuple(rows), tuple(plain_rows)))
+        return tuple(tables)
+
+
+class ParadigmStoreWriter:
+    """Builds the columns of a paradigm store from jezik tables."""
+
+    def __init__(self):
+        self._lemmas: Dict[str, list] = {}
+        self._labels: Dict[str, int] = {}
+        self._pos: Dict[str, int] = {}
+        self._forms: Dict[str, int] = {}
+
+    def add(self, lemma: str, tables: Iterable):
+        """Add the jezik tables (``.pos`` plus (label, forms) rows) of a lemma."""
+        encoded = []
+        for table in tables:
+            rows = []
+            for label, forms in table:
+                forms = list(forms)
+                rows.append((
+                    self._intern(self._labels, label.strip()),
+                    [self._intern(self._forms, form) for form in forms],
+                    [self._intern(self._forms, strip_accents(form.lower())) for form in forms],
+                ))
+            encoded.append((self._intern(self._pos, table.pos), rows))
+        if encoded:
+            self._lemmas[lemma] = encoded
+
+    def __len__(self) -> int:
+        return len(self._lemmas)
+
+    @staticmethod
+    def _intern(table: Dict[str, int], value: str) -> int:
+        index = table.get(value)
+        if index is None:
+            index = table[value] = len(table)
+        return index
+
+    def write(self, path: str, complete: bool = True, jezik_file: Optional[str] = None):
+        """Write the store; ``complete`` means every jezik lemma was exported."""
+        lemmas = sorted(self._lemmas)
+        lemma_tables = array('I', [0])
+        table_pos = array('B' if len(self._pos) <= 0xFF else 'H')
+        table_rows = array('I', [0])
+        row_labels = array('H' if len(self._labels) <= 0xFFFF else 'I')
+        row_cells = array('I', [0])
+        cell_forms = array('I')
+        cell_plain = array('I')
+        for lemma in lemmas:
+            for pos, rows in self._lemmas[lemma]:
+                table_pos.append(pos)
+                for label, forms, plain in rows:
+                    row_labels.append(label)
+                    cell_forms.extend(forms)
+                    cell_plain.extend(plain)
+                    row_cells.append(len(cell_forms))
+                table_rows.append(len(row_labels))
+            lemma_tables.append(len(table_pos))
+
+        writer = SnapshotWriter()
+        if jezik_file and os.path.exists(jezik_file):
+            writer.add_source('jezik', jezik_file)
+        writer.add_strings('paradigm.lemmas', lemmas)
+        writer.add_strings('paradigm.labels', _by_id(self._labels))
+        writer.add_strings('paradigm.forms', _by_id(self._forms))
+        writer.add_array('paradigm.lemma_tables', 'I', lemma_tables)
+        writer.add_array('paradigm.table_pos', table_pos.typecode, table_pos)
+        writer.add_array('paradigm.table_rows', 'I', table_rows)
+        writer.add_array('paradigm.row_labels', row_labels.typecode, row_labels)
+        writer.add_array('paradigm.row_cells', 'I', row_cells)
+        writer.add_array('paradigm.cell_forms', 'I', cell_forms)
+        writer.add_array('paradigm.cell_plain', 'I', cell_plain)
+        writer.meta['paradigm'] = {"pos": _by_id(self._pos), "complete": complete}
+        writer.write(path)
+
+
+def _by_id(table: Dict[str, int]) -> List[str]:
+    values = [''] * len(table)
+    for value, index in table.items():
+        values[index] = value
+    return values
@@ -0,0 +1,277 @@
+"""
+Wildcard search (crossword mode) over the word list and the jezik forms.
+
+Patterns use ``?`` (or ``_``) for one letter and ``*`` for any number of
+letters: ``ш?ол?``, ``*ница``, ``пр*ти``. Words are grouped by length, and
+every length bucket keeps one bitset per (position, letter) with a bit set
+for each word of the bucket that has that letter there. A pattern is
+resolved per candidate length by intersecting the bitsets of its fixed
+letters (a ``*`` between fixed parts becomes the union over the positions
+the part can take), so the cost depends on the number of distinct letters
+in the pattern, not on the size of the lexicon. The words of a bucket are
+numbered in frequency order, so the best-ranked matches are the lowest set
+bits.
+"""
+import heapq
+import re
+import time
+from array import array
+from collections import defaultdict
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .normalize import canonical_key, is_cyrillic, to_latin
+from .snapshot import load_snapshot
+from .suffix_service import lexicon_keys
+from .suggest_service import UNRANKED
+
+# Longer words are not indexed (nothing a puzzle would ask for)
+MAX_WORD_LENGTH = 32
+
+# Longer patterns are rejected
+MAX_PATTERN_LENGTH = 40
+
+_NONZERO_BYTE_RE = re.compile(b'[^\x00]')
+
+
+def _select_table(code: int) -> bytes:
+    """bytes.translate table mapping ``code`` to b'1' and every other byte to b'0'."""
+    return bytes(0x31 if i == code else 0x30 for i in range(256))
+
+
+class LengthBucket:
+    """Words of one length, best-ranked first, with their letter bitsets."""
+
+    def __init__(self, length: int, keys: Sequence[str], ranks: Sequence[int],
+                 positions: List[Dict[str, int]]):
+        self.length = length
+        self.keys = keys
+        self.ranks = ranks
+        self.positions = positions   # positions[i][letter] -> bitset of words
+        self.all = (1 << len(keys)) - 1
+
+    @classmethod
+    def build(cls, length: int, entries: List[Tuple[int, str]]) -> "LengthBucket":
+        """Bucket of sorted (rank, key) entries."""
+        keys = [key for _, key in entries]
+        ranks = array('I', (rank for rank, _ in entries))
+        blob = ''.join(keys)
+        letters = sorted(set(blob))
+        if len(letters) > 256:
+            return cls(length, keys, ranks, cls._positions_slow(length, keys))
+
+        # Letters become one-byte codes, so the letters at a position are a
+        # slice of the concatenated keys and a bitset is two C-level passes
+        # over it: translate to '0'/'1' digits, then parse them as binary
+        codes = blob.translate({ord(letter): i for i, letter in enumerate(letters)})
+        codes = codes.encode('latin-1')
+        positions = []
+        for position in range(length):
+            column = codes[position::length]
+            table = {}
+            for code in set(column):
+                digits = column.translate(_select_table(code))
+                table[letters[code]] = int(digits[::-1], 2)
+            positions.append(table)
+        return cls(length, keys, ranks, positions)
+
+    @staticmethod
+    def _positions_slow(length: int, keys: List[str]) -> List[Dict[str, int]]:
+        size = (len(keys) + 7) // 8
+        tables: List[Dict[str, bytearray]] = [{} for _ in range(length)]
+        for i, key in enumerate(keys):
+            byte, bit = i >> 3, 1 << (i & 7)
+            for table, letter in zip(tables, key):
+                bits = table.get(letter)
+                if bits is None:
+                    bits = table[letter] = bytearray(size)
+                bits[byte] |= bit
+        return [
+            {letter: int.from_bytes(bits, 'little') for letter, bits in table.items()}
+            for table in tables
+        ]
+
+    def match(self, part: str, start: int) -> int:
+        """Bitset of the words with ``part`` (which may contain '?') at ``start``."""
+        bits = self.all
+        for i, letter in enumerate(part, start):
+            if letter != '?':
+                bits &= self.positions[i].get(letter, 0)
+                if not bits:
+                    break
+        return bits
+
+    def ids(self, bits: int) -> Iterator[int]:
+        """Word ids in a bitset, best-ranked first."""
+        data = bits.to_bytes((len(self.keys) + 7) // 8, 'little')
+        for found in _NONZERO_BYTE_RE.finditer(data):
+            byte = found.start()
+            value = data[byte]
+            while value:
+                low = value & -value
+                yield (byte << 3) + low.bit_length() - 1
+                value ^= low
+
+    def ranked(self, ids: Iterator[int]) -> Iterator[Tuple[int, str]]:
+        for i in ids:
+            yield self.ranks[i], self.keys[i]
+
+
+class PatternService:
+    """Words matching a wildcard pattern, most frequent first.
+
+    Words are returned once per canonical key, in lowercase, in the script
+    of the pattern; lengths count Cyrillic letters (``lj``, ``nj`` and
+    ``dž`` are one letter each).
+    """
+
+    MAX_LIMIT = 100
+
+    def __init__(self, wordlist_service, frequency_service, jezik_service=None,
+                 use_snapshot: bool = True):
+        self.buckets: Dict[int, LengthBucket] = {}
+        if use_snapshot and self._load_snapshot(wordlist_service, frequency_service, jezik_service):
+            return
+        self._build_index(wordlist_service, frequency_service, jezik_service)
+
+    def _load_snapshot(self, wordlist_service, frequency_service, jezik_service) -> bool:
+        """Load the prebuilt bitsets from the binary snapshot if it is up to date."""
+        snapshot = load_snapshot()
+        if snapshot is None or 'pattern' not in snapshot.meta:
+            return False
+        sources = [('wordlist', wordlist_service.wordlist_file),
+                   ('frequency', frequency_service.freq_file)]
+        if jezik_service is not None:
+            sources.append(('form_index', jezik_service.form_index.index_file))
+        for name, path in sources:
+            if name in snapshot.meta["sources"] and not snapshot.source_matches(name, path):
+                print(f"Warning: Snapshot {snapshot.path} is older than {path}, "
+                      f"rebuilding the pattern index")
+                return False
+
+        # Bitsets become integers (one copy); the words stay mapped
+        for length, letters in snapshot.meta['pattern']['lengths'].items():
+            name = f'pattern.{length}'
+            keys = snapshot.strings(f'{name}.keys')
+            data = snapshot.array(f'{name}.bits')
+            size = (len(keys) + 7) // 8
+            positions = []
+            offset = 0
+            for position_letters in letters:
+                table = {}
+                for letter in position_letters:
+                    table[letter] = int.from_bytes(data[offset:offset + size], 'little')
+                    offset += size
+                positions.append(table)
+            self.buckets[int(length)] = LengthBucket(
+                int(length), keys, snapshot.array(f'{name}.ranks'), positions)
+        print(f"Loaded pattern index over {self.word_count()} words from snapshot")
+        return True
+
+    def write_snapshot(self, writer):
+        """Add the pattern index to a SnapshotWriter."""
+        lengths = {}
+        for length, bucket in sorted(self.buckets.items()):
+            name = f'pattern.{length}'
+            size = (len(bucket.keys) + 7) // 8
+            data = bytearray()
+            letters = []
+            for table in bucket.positions:
+                letters.append(''.join(sorted(table)))
+                for letter in sorted(table):
+                    data += table[letter].to_bytes(size, 'little')
+            writer.add_strings(f'{name}.keys', bucket.keys)
+            writer.add_array(f'{name}.ranks', 'I', bucket.ranks)
+            writer.add_array(f'{name}.bits', 'B', data)
+            lengths[str(length)] = letters
+        writer.meta['pattern'] = {"lengths": lengths}
+
+    def _build_index(self, wordlist_service, frequency_service, jezik_service):
+        start = time.time()
+
+        by_length: Dict[int, List[Tuple[int, str]]] = defaultdict(list)
+        for key in lexicon_keys(wordlist_service, jezik_service):
+            if len(key) <= MAX_WORD_LENGTH:
+                rank = frequency_service.get_rank(key)
+                by_length[len(key)].append((rank if rank is not None else UNRANKED, key))
+        for length, entries in by_length.items():
+            entries.sort()
+            self.buckets[length] = LengthBucket.build(length, entries)
+
+        if self.buckets:
+            print(f"Built pattern index over {self.word_count()} words "
+                  f"in {time.time() - start:.1f}s")
+
+    def word_count(self) -> int:
+        return sum(len(bucket.keys) for bucket in self.buckets.values())
+
+    def search(self, pattern: str, length: Optional[int] = None,
+               limit: int = 20) -> Dict[str, Any]:
+        """Words matching ``pattern``, optionally only those of ``length`` letters.
+
+        Returns the normalized pattern, the number of matching words and the
+        ``limit`` most frequent as ``{"word", "rank"}``. Raises ValueError
+        for a pattern with anything but letters and wildcards.
+        """
+        text = re.sub(r'\*+', '*', canonical_key(pattern.strip()).replace('_', '?'))
+        if not text:
+            raise ValueError("Empty pattern")
+        if len(text) > MAX_PATTERN_LENGTH:
+            raise ValueError(f"Pattern too long (maximum is {MAX_PATTERN_LENGTH} characters)")
+        if any(not (char.isalpha() or char in '?*-') for char in text):
+            raise ValueError("Patterns may only contain letters, '?' (or '_') and '*'")
+        limit = max(1, min(limit, self.MAX_LIMIT))
+
+        parts = text.split('*')
+        fixed = sum(len(part) for part in parts)
+        lengths = [fixed] if len(parts) == 1 else range(fixed, MAX_WORD_LENGTH + 1)
+        if length is not None:
+            lengths = [length] if length in lengths else []
+        # Parts between two '*' only narrow the candidates down when there is
+        # one of them; with more, the order of the parts is checked per word
+        verify = re.compile(text.replace('?', '.').replace('*', '.*')) if len(parts) > 3 else None
+
+        total = 0
+        streams = []
+        for word_length in lengths:
+            bucket = self.buckets.get(word_length)
+            if bucket is None:
+                continue
+            bits = self._match(bucket, parts)
+            if not bits:
+                continue
+            if verify is None:
+                total += bin(bits).count('1')  # int.bit_count() needs Python 3.10
+                streams.append(bucket.ranked(bucket.ids(bits)))
+            else:
+                ids = [i for i in bucket.ids(bits) if verify.fullmatch(bucket.keys[i])]
+                total += len(ids)
+                streams.append(bucket.ranked(iter(ids)))
+
+        latin = not is_cyrillic(pattern) and any(char.isalpha() for char in pattern)
+        results: List[Dict[str, Optional[int]]] = []
+        for rank, key in islice(heapq.merge(*streams), limit):
+            results.append({
+                "word": to_latin(key) if latin else key,
+                "rank": rank if rank != UNRANKED else None
+            })
+        return {"pattern": text, "total": total, "results": results}
+
+    @staticmethod
+    def _match(bucket: LengthBucket, parts: List[str]) -> int:
+        """Bitset of the words of a bucket matching the pattern's parts."""
+        word_length = bucket.length
+        bits = bucket.match(parts[0], 0)
+        if len(parts) == 1 or not bits:
+            return bits
+        head, tail = parts[0], parts[-1]
+        bits &= bucket.match(tail, word_length - len(tail))
+        for part in parts[1:-1]:
+            if not bits:
+                break
+            if part.strip('?'):
+                anywhere = 0
+                for start in range(len(head), word_length - len(tail) - len(part) + 1):
+                    anywhere |= bucket.match(part, start)
+                bits &= anywhere
+        return bits
@@ -0,0 +1,276 @@
+"""
+Pre-fork multi-process serving.
+
+The parent process imports the application once (loading the word list,
+frequency table, form index, snapshot and jezik), freezes the loaded objects
+out of the garbage collector and then forks the workers. The read-only data
+stays in copy-on-write pages shared by every worker, so adding a worker costs
+its private heap (request state, lookup and response caches) rather than
+another copy of the data.
+
+Unlike ``uvicorn --workers``, which spawns fresh interpreters that each
+import and load everything again, workers here are plain ``fork()`` children
+of the loaded parent. Linux only (memory accounting reads ``/proc``).
+
+Data is reloaded in the parent too, so the workers go on sharing one copy:
+on SIGHUP (``request_reload()`` from a worker, or ``kill -HUP``), or when
+``changed()`` reports new files, the parent loads the new data and replaces
+the workers one by one with forks of itself. The old workers finish the
+requests they have and exit. Reloading inside each worker would instead
+leave every worker with a private copy of the whole data set.
+"""
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+# Seconds the workers get to start before the memory report is printed
+REPORT_DELAY = 3.0
+
+# Seconds to wait before replacing a worker that died
+RESTART_DELAY = 1.0
+
+# Pid of the pre-fork parent, in a worker process
+_parent_pid: Optional[int] = None
+
+
+def in_worker() -> bool:
+    """True in a worker forked by PreforkServer."""
+    return _parent_pid is not None
+
+
+def request_reload() -> bool:
+    """Ask the pre-fork parent to reload the data and replace the workers."""
+    if _parent_pid is None:
+        return False
+    try:
+        os.kill(_parent_pid, signal.SIGHUP)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def memory_usage(pid: Optional[int] = None) -> Optional[Dict[str, int]]:
+    """Resident memory of a process in kB, split into shared and private.
+
+    ``shared`` counts pages also mapped by another process (e.g. inherited
+    from the pre-fork parent and not written since); ``pss`` divides every
+    shared page between the processes mapping it, so the PSS of all workers
+    adds up to their real combined footprint. None where /proc is missing.
+    """
+    path = f"/proc/{pid or os.getpid()}/smaps_rollup"
+    fields = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == 'kB':
+                    fields[parts[0].rstrip(':')] = int(parts[1])
+    except OSError:
+        return None
+    return {
+        "rss_kb": fields.get("Rss", 0),
+        "pss_kb": fields.get("Pss", 0),
+        "shared_kb": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+        "private_kb": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def freeze_loaded_data():
+    """Move every object allocated so far to the GC's permanent generation.
+
+    Collections in the workers then never traverse (and so never write to
+    the GC headers of) the loaded data, which would otherwise turn shared
+    pages into private copies one by one.
+    """
+    gc.collect()
+    gc.freeze()
+
+
+class PreforkServer:
+    """Fork ``workers`` uvicorn servers that share one listening socket.
+
+    ``reload()`` loads new data in this process and returns True once it is
+    in use; ``changed()`` is polled every ``reload_interval`` seconds (0 =
+    only reload on SIGHUP).
+    """
+
+    def __init__(self, app, host: str = "0.0.0.0", port: int = 8000, workers: int = 2,
+                 reload: Optional[Callable[[], bool]] = None,
+                 changed: Optional[Callable[[], bool]] = None,
+                 reload_interval: float = 0, **uvicorn_options):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.reload = reload
+        self.changed = changed
+        self.reload_interval = reload_interval
+        self.uvicorn_options = uvicorn_options
+        self.children: Dict[int, int] = {}  # pid -> worker number
+        self._retiring: Set[int] = set()  # Workers replaced after a reload
+        self._stopping = False
+        self._reload_requested = False
+
+    def _bind(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        return sock
+
+    def _spawn(self, sock: socket.socket, number: int):
+        pid = os.fork()
+        if pid:
+            self.children[pid] = number
+            return
+
+        # Worker: restore default signal handling (uvicorn installs its own)
+        # and collect garbage normally from here on; frozen objects stay frozen
+        global _parent_pid
+        _parent_pid = os.getppid()
+        try:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGHUP, signal.SIG_IGN)
+            gc.enable()
+
+            import uvicorn
+            config = uvicorn.Config(self.app, host=self.host, port=self.port,
+                                    **self.uvicorn_options)
+            uvicorn.Server(config).run(sockets=[sock])
+        except BaseException as e:
+            if not isinstance(e, (SystemExit, KeyboardInterrupt)):
+                print(f"Worker {number} (pid {os.getpid()}) crashed: {e}")
+        finally:
+            sys.stdout.flush()
+            os._exit(0)
+
+    def _stop(self, signum, frame):
+        self._stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _request_reload(self, signum, frame):
+        self._reload_requested = True
+
+    def _reload_and_replace(self, sock: socket.socket):
+        """Reload the data here, then swap every worker for a fresh fork."""
+        if self.reload is None:
+            print("Reload requested, but no reload function was given")
+            return
+        if not self.reload():
+            print("Data not reloaded, keeping the workers")
+            return
+
+        # The old data is now only referenced by the old workers' copies
+        gc.unfreeze()
+        freeze_loaded_data()
+        old = sorted(self.children.items(), key=lambda item: item[1])
+        for pid, number in old:
+            self._spawn(sock, number)
+            self._retiring.add(pid)
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        print(f"Replaced {len(old)} workers with forks holding the new data")
+
+    def memory_report(self) -> List[str]:
+        """One line per process: RSS split into shared and private, and PSS."""
+        lines = []
+        processes = [("parent", os.getpid())] + [
+            (f"worker {number}", pid) for pid, number in sorted(self.children.items(),
+                                                               key=lambda item: item[1])
+        ]
+        total_rss = total_pss = 0
+        for name, pid in processes:
+            usage = memory_usage(pid)
+            if usage is None:
+                continue
+            total_rss += usage["rss_kb"]
+            total_pss += usage["pss_kb"]
+            lines.append(
+                f"  {name:<10} pid {pid:<7} rss {usage['rss_kb'] / 1024:7.1f} MB  "
+                f"shared {usage['shared_kb'] / 1024:7.1f} MB  "
+                f"private {usage['private_kb'] / 1024:7.1f} MB  "
+                f"pss {usage['pss_kb'] / 1024:7.1f} MB"
+            )
+        if lines:
+            lines.append(f"  total      rss {total_rss / 1024:.1f} MB, "
+                         f"actual (pss) {total_pss / 1024:.1f} MB")
+        return lines
+
+    def run(self):
+        sock = self._bind()
+
+        # No collections between freezing and forking, as recommended for gc.freeze()
+        gc.disable()
+        freeze_loaded_data()
+
+        for number in range(1, self.workers + 1):
+            self._spawn(sock, number)
+
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGHUP, self._request_reload)
+        print(f"Started {self.workers} workers on http://{self.host}:{self.port} "
+              f"(parent pid {os.getpid()})")
+
+        report_at = time.monotonic() + REPORT_DELAY
+        check_at = time.monotonic() + self.reload_interval
+        while self.children:
+            now = time.monotonic()
+            if report_at is not None and now >= report_at and not self._stopping:
+                report = self.memory_report()
+                if report:
+                    print("Memory per process (shared pages are inherited from the parent):")
+                    print("\n".join(report))
+                    sys.stdout.flush()
+                report_at = None
+
+            if self.changed is not None and self.reload_interval > 0 and now >= check_at:
+                check_at = now + self.reload_interval
+                try:
+                    if self.changed():
+                        self._reload_requested = True
+                except Exception as e:
+                    print(f"Warning: Data watcher error: {e}")
+            if self._reload_requested and not self._stopping:
+                self._reload_requested = False
+                self._reload_and_replace(sock)
+                report_at = time.monotonic() + REPORT_DELAY
+
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                time.sleep(0.2)
+                continue
+
+            number = self.children.pop(pid)
+            if pid in self._retiring:
+                self._retiring.discard(pid)
+            elif not self._stopping:
+                print(f"Worker {number} (pid {pid}) exited with status {status}, restarting")
+                time.sleep(RESTART_DELAY)
+                self._spawn(sock, number)
+
+        sock.close()
+
+
+def run_prefork(app, host: str = "0.0.0.0", port: int = 8000, workers: int = 2,
+                reload: Optional[Callable[[], bool]] = None,
+                changed: Optional[Callable[[], bool]] = None,
+                reload_interval: float = 0, **uvicorn_options):
+    """Serve ``app`` from ``workers`` forked processes (see module docstring)."""
+    PreforkServer(app, host, port, workers, reload, changed, reload_interval,
+                  **uvicorn_options).run()
@@ -0,0 +1,140 @@
+"""
+Random lemmas filtered by part of speech, gender and frequency band.
+
+At startup every lemma of the form index is put in one pool per
+(part of speech, gender, band) it belongs to; only nouns have a gender,
+derived from their declension. A request picks the pools matching its
+filters and draws positions from their combined length, so a filtered
+random word costs the same as an unfiltered one whatever the filters, and a
+batch of ``count`` distinct words needs no retries.
+"""
+import random
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+from .jezik_service import GENDERS, POS_SERBIAN, noun_gender
+from .suggest_service import UNRANKED
+
+# Upper rank of each frequency band; lemmas ranked below the last one (or
+# not at all) are "rare". Bands are cumulative: top10k includes top1k.
+BANDS = {"top1k": 1000, "top10k": 10000, "top100k": 100000}
+_BAND_BOUNDS = tuple(sorted(BANDS.values()))
+RARE_BAND = "rare"
+
+# The only part of speech with a gender of its own
+NOUN = "noun"
+
+
+class RandomService:
+    """Uniform random selection from precomputed lemma pools."""
+
+    MAX_COUNT = 100
+
+    def __init__(self, jezik_service, frequency_service):
+        self.lemmas: List[str] = []
+        self.ranks = array('I')
+        # (pos, gender, band index) -> lemma ids
+        self.pools: Dict[Tuple[str, Optional[str], int], array] = {}
+        self._build_pools(jezik_service, frequency_service)
+
+    @property
+    def available(self) -> bool:
+        return bool(self.pools)
+
+    def _build_pools(self, jezik_service, frequency_service):
+        if not jezik_service.form_index.available:
+            return
+        start = time.time()
+
+        # lemma -> pos -> label -> form (lowercase, without accents); the
+        # first variant per POS is the one the form index keeps
+        paradigms: Dict[str, Dict[str, Dict[str, str]]] = {}
+        for form, entries in jezik_service.form_index.forms.items():
+            for entry in entries:
+                forms = paradigms.setdefault(entry.lemma, {}).setdefault(entry.pos, {})
+                for label in entry.labels:
+                    forms.setdefault(label, form)
+
+        self.lemmas = sorted(paradigms)
+        pools: Dict[Tuple[str, Optional[str], int], List[int]] = {}
+        for lemma_id, lemma in enumerate(self.lemmas):
+            rank = frequency_service.get_rank(lemma)
+            self.ranks.append(rank if rank is not None else UNRANKED)
+            band = bisect_left(_BAND_BOUNDS, rank) if rank is not None else len(_BAND_BOUNDS)
+            for pos, forms in paradigms[lemma].items():
+                gender = noun_gender(forms) if pos == NOUN else None
+                pools.setdefault((pos, gender, band), []).append(lemma_id)
+
+        # In a fixed order, so that a seed always draws the same lemmas
+        self.pools = {
+            key: array('I', pools[key])
+            for key in sorted(pools, key=lambda key: (key[0], key[1] or '', key[2]))
+        }
+        print(f"Built random word pools over {len(self.lemmas)} lemmas "
+              f"({len(self.pools)} pools) in {time.time() - start:.1f}s")
+
+    def _matching_pools(self, pos: Optional[str], gender: Optional[str],
+                        band: Optional[str]) -> List[Tuple[Tuple[str, Optional[str], int], array]]:
+        if band is None:
+            bands = None
+        elif band == RARE_BAND:
+            bands = {len(_BAND_BOUNDS)}
+        elif band in BANDS:
+            bands = set(range(bisect_right(_BAND_BOUNDS, BANDS[band])))
+        else:
+            raise ValueError(f"Unknown band '{band}' "
+                             f"(expected one of {', '.join(list(BANDS) + [RARE_BAND])})")
+        if gender is not None and gender not in GENDERS:
+            raise ValueError(f"Unknown gender '{gender}' (expected one of {', '.join(GENDERS)})")
+        if pos is not None:
+            tags = {tag for tag, _, _ in self.pools}
+            wanted = {tag for tag in tags
+                      if pos in (tag, POS_SERBIAN.get(tag, tag))}
+            if not wanted:
+                raise ValueError(f"Unknown part of speech '{pos}' "
+                                 f"(expected one of {', '.join(sorted(tags))})")
+            if gender is not None and wanted != {NOUN}:
+                raise ValueError(f"Only nouns have a gender, not '{pos}'")
+
+        return [
+            (key, ids) for key, ids in self.pools.items()
+            if (pos is None or key[0] in wanted)
+            and (gender is None or key[1] == gender)
+            and (bands is None or key[2] in bands)
+        ]
+
+    def sample(self, pos: Optional[str] = None, gender: Optional[str] = None,
+               band: Optional[str] = None, count: int = 1,
+               seed: Optional[str] = None) -> Tuple[int, List[Dict[str, Any]]]:
+        """Up to ``count`` distinct random lemmas matching the filters.
+
+        Returns the number of matching (lemma, part of speech) pairs and the
+        picks as ``{"word", "pos", "pos_sr", "gender", "rank"}``. The same
+        ``seed`` gives the same picks for as long as the data is unchanged.
+        A gender filter only matches nouns. Raises ValueError for an unknown
+        filter value or a gender with another part of speech.
+        """
+        pools = self._matching_pools(pos, gender, band)
+        offsets = [0]
+        for _, ids in pools:
+            offsets.append(offsets[-1] + len(ids))
+        total = offsets[-1]
+
+        rng = random.Random(seed) if seed is not None else random
+        picks = rng.sample(range(total), min(max(1, count), self.MAX_COUNT, total))
+        words = []
+        for pick in picks:
+            index = bisect_right(offsets, pick) - 1
+            (tag, word_gender, _), ids = pools[index]
+            lemma_id = ids[pick - offsets[index]]
+            rank = self.ranks[lemma_id]
+            words.append({
+                "word": self.lemmas[lemma_id],
+                "pos": tag,
+                "pos_sr": POS_SERBIAN.get(tag, tag),
+                "gender": word_gender,
+                "rank": rank if rank != UNRANKED else None
+            })
+        return total, words
@@ -0,0 +1,92 @@
+"""
+Full-response cache for word lookups, keyed by word and data version.
+
+The API output only changes when the data files behind it change, so
+serialized responses are cached per data version and served with a strong
+ETag derived from that version.
+"""
+import hashlib
+import os
+import threading
+import time
+from typing import Callable, Iterable, NamedTuple, Optional
+
+from .lru_cache import LRUCache
+
+DEFAULT_RESPONSE_CACHE_SIZE = int(os.environ.get('RECNIK_RESPONSE_CACHE_SIZE', 2048))
+
+
+class DataVersion:
+    """Fingerprint of the data files backing the API.
+
+    Files are re-checked (size and mtime) at most every ``check_interval``
+    seconds, so the version changes automatically when a file is replaced.
+    """
+
+    def __init__(self, files: Callable[[], Iterable[str]], salt: str = "",
+                 check_interval: float = 5.0):
+        self._files = files
+        self._salt = salt
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._version = ""
+
+    def current(self) -> str:
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval or not self._version:
+            with self._lock:
+                if now - self._checked_at >= self.check_interval or not self._version:
+                    self._version = self.fingerprint()
+                    self._checked_at = now
+        return self._version
+
+    def fingerprint(self) -> str:
+        """Version of the files as they are now (bypasses the check interval)."""
+        digest = hashlib.sha1(self._salt.encode('utf-8'))
+        for path in sorted(set(self._files())):
+            try:
+                st = os.stat(path)
+                digest.update(f"{path}\0{st.st_size}\0{st.st_mtime_ns}\n".encode('utf-8'))
+            except OSError:
+                digest.update(f"{path}\0missing\n".encode('utf-8'))
+        return digest.hexdigest()[:16]
+
+
+class CachedResponse(NamedTuple):
+    status_code: int
+    body: bytes
+
+
+class ResponseCache:
+    """LRU of serialized responses keyed by (word, data version)."""
+
+    def __init__(self, data_version: DataVersion, maxsize: int = DEFAULT_RESPONSE_CACHE_SIZE):
+        self.data_version = data_version
+        self._cache = LRUCache(maxsize)
+
+    def etag(self, key: str, version: Optional[str] = None) -> str:
+        """Strong ETag for ``key`` at the given (or current) data version."""
+        version = version or self.data_version.current()
+        digest = hashlib.sha1(f"{version}\0{key}".encode('utf-8')).hexdigest()[:20]
+        return f'"{version}-{digest}"'
+
+    def get(self, key: str, version: str) -> Optional[CachedResponse]:
+        return self._cache.get((key, version))
+
+    def put(self, key: str, version: str, response: CachedResponse):
+        self._cache.put((key, version), response)
+
+    def stats(self):
+        return self._cache.stats()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header value against ``etag``."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*' or candidate == etag or candidate == f"W/{etag}":
+            return True
+    return False
@@ -0,0 +1,296 @@
+"""
+Binary, memory-mapped data snapshot.
+
+``tools/build_snapshot.py`` compiles the word list, the frequency table and
+the suggest index into one file of sorted string tables and packed integer
+arrays. Services mmap it and query it in place, so startup does not depend
+on the size of the data and the pages are shared between worker processes.
+
+Layout::
+
+    b'RECNIKSN' | u32 format version | u32 header length | JSON header | sections
+
+Every section starts at an 8-byte aligned offset relative to the end of the
+header. A string table is an offsets array (count + 1 entries) followed by
+the concatenated UTF-8 strings.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+MAGIC = b'RECNIKSN'
+FORMAT_VERSION = 1
+
+# Compare source files by content hash instead of modification time at
+# startup (for deployments that cannot preserve mtimes; reads every file)
+VERIFY_SOURCES = os.environ.get('RECNIK_VERIFY_SOURCES', '0') == '1'
+
+
+def default_snapshot_path() -> str:
+    """Return the snapshot location (production path first)."""
+    if os.path.exists('/opt/recnik/data/snapshot.bin'):
+        return '/opt/recnik/data/snapshot.bin'
+    return os.path.join(os.path.dirname(__file__), '../data/snapshot.bin')
+
+
+# path -> (file identity when hashed, signature), so that the services
+# checking the same source during one load hash it only once
+_signatures: Dict[str, Tuple[Tuple[int, int, int], Dict[str, Any]]] = {}
+_signatures_lock = threading.Lock()
+
+
+def file_signature(path: str) -> Dict[str, Any]:
+    """Content signature of a source file: size plus a hash of all of it.
+
+    Reads the whole file, so it is meant for the build tools; loading a
+    snapshot only compares sizes and modification times unless
+    ``RECNIK_VERIFY_SOURCES=1``. A signature computed earlier in this
+    process is reused while the file's inode, size and mtime are unchanged.
+    """
+    path = os.path.abspath(path)
+    identity = _file_identity(path)
+    with _signatures_lock:
+        cached = _signatures.get(path)
+    if cached is not None and identity is not None and cached[0] == identity:
+        return cached[1]
+
+    size = 0
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            size += len(block)
+            digest.update(block)
+    signature = {"size": size, "sha256": digest.hexdigest()}
+    # A file that changed while it was read is hashed again next time
+    if identity is not None and _file_identity(path) == identity:
+        with _signatures_lock:
+            _signatures[path] = (identity, signature)
+    return signature
+
+
+class StringTable(Sequence[str]):
+    """Read-only sequence of strings stored in a snapshot."""
+
+    def __init__(self, buf: memoryview, offsets: memoryview, blob_start: int):
+        self._buf = buf
+        self._offsets = offsets
+        self._blob = blob_start
+        self._len = len(offsets) - 1
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._get(j) for j in range(*i.indices(self._len))]
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError(i)
+        return self._get(i)
+
+    def _get(self, i: int) -> str:
+        start = self._blob + self._offsets[i]
+        end = self._blob + self._offsets[i + 1]
+        return str(self._buf[start:end], 'utf-8')
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self._len):
+            yield self._get(i)
+
+
+class SortedKeyIndex:
+    """Dict-like ``get`` over a sorted string table and parallel values."""
+
+    def __init__(self, keys: Sequence[str], values: Sequence[int]):
+        self.keys = keys
+        self.values = values
+
+    def get(self, key: str, default=None):
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return self.values[i]
+        return default
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+class Snapshot:
+    """A memory-mapped snapshot file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mmap)
+
+        if bytes(buf[:8]) != MAGIC:
+            raise ValueError(f"{path} is not a snapshot file")
+        version, header_len = struct.unpack_from('<II', buf, 8)
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path} has snapshot format {version}, expected {FORMAT_VERSION}")
+
+        header = json.loads(str(buf[16:16 + header_len], 'utf-8'))
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError(f"{path} was built on a {header['byteorder']}-endian machine")
+
+        self._buf = buf
+        self._data_start = _align(16 + header_len)
+        self.sections: Dict[str, Dict[str, Any]] = header["sections"]
+        self.meta: Dict[str, Any] = header.get("meta", {})
+
+    def has(self, name: str) -> bool:
+        return name in self.sections
+
+    def array(self, name: str) -> memoryview:
+        """Packed integer array section (indexable like array.array)."""
+        section = self.sections[name]
+        start = self._data_start + section["offset"]
+        size = section["count"] * array(section["typecode"]).itemsize
+        return self._buf[start:start + size].cast(section["typecode"])
+
+    def strings(self, name: str) -> StringTable:
+        """String table section."""
+        section = self.sections[name]
+        start = self._data_start + section["offset"]
+        itemsize = array(section["typecode"]).itemsize
+        offsets_size = (section["count"] + 1) * itemsize
+        offsets = self._buf[start:start + offsets_size].cast(section["typecode"])
+        return StringTable(self._buf, offsets, _align(start + offsets_size))
+
+    def source_matches(self, name: str, path: Optional[str]) -> bool:
+        """Was the snapshot built from the current contents of ``path``?
+
+        Compares the size and modification time recorded at build time, so
+        the check costs one ``stat`` (copy the data with its mtimes, e.g.
+        ``scp -p``). With ``RECNIK_VERIFY_SOURCES=1`` the content hash is
+        compared instead of the mtime. Also true when the source file is not
+        present at all (a deployment may ship only the snapshot).
+        """
+        recorded = self.meta.get("sources", {}).get(name)
+        if recorded is None:
+            return False
+        if not path:
+            return True
+        try:
+            st = os.stat(path)
+        except OSError:
+            return True
+        if st.st_size != recorded.get("size"):
+            return False
+        if VERIFY_SOURCES:
+            return file_signature(path)["sha256"] == recorded.get("sha256")
+        return st.st_mtime_ns == recorded.get("mtime_ns")
+
+
+class SnapshotWriter:
+    """Collects sections in memory and writes a snapshot file."""
+
+    def __init__(self):
+        self._sections: Dict[str, Dict[str, Any]] = {}
+        self._chunks: List[bytes] = []
+        self._size = 0
+        self.meta: Dict[str, Any] = {"sources": {}}
+
+    def add_source(self, name: str, path: str):
+        """Record the signature and mtime of a source file the snapshot was built from."""
+        mtime_ns = os.stat(path).st_mtime_ns
+        self.meta["sources"][name] = dict(file_signature(path), mtime_ns=mtime_ns)
+
+    def add_array(self, name: str, typecode: str, values: Iterable[int]):
+        data = values if isinstance(values, array) and values.typecode == typecode \
+            else array(typecode, values)
+        self._sections[name] = {
+            "kind": "array", "typecode": typecode, "count": len(data),
+            "offset": self._append(data.tobytes()),
+        }
+
+    def add_strings(self, name: str, strings: Iterable[str]):
+        encoded = [s.encode('utf-8') for s in strings]
+        blob = b''.join(encoded)
+        typecode = 'I' if len(blob) < 2 ** 32 else 'Q'
+        offsets = array(typecode, [0])
+        position = 0
+        for item in encoded:
+            position += len(item)
+            offsets.append(position)
+        self._sections[name] = {
+            "kind": "strings", "typecode": typecode, "count": len(encoded),
+            "offset": self._append(offsets.tobytes()),
+        }
+        self._append(blob)
+
+    def _append(self, data: bytes) -> int:
+        offset = self._size
+        padding = _align(len(data)) - len(data)
+        self._chunks.append(data + b'\0' * padding)
+        self._size += len(data) + padding
+        return offset
+
+    def write(self, path: str):
+        header = json.dumps({
+            "byteorder": sys.byteorder,
+            "sections": self._sections,
+            "meta": self.meta,
+        }, ensure_ascii=False).encode('utf-8')
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<II', FORMAT_VERSION, len(header)))
+            f.write(header)
+            f.write(b'\0' * (_align(16 + len(header)) - 16 - len(header)))
+            for chunk in self._chunks:
+                f.write(chunk)
+        # Atomic replace: processes that mapped the old file keep their pages
+        os.replace(tmp_path, path)
+
+
+# path -> (file identity when opened, snapshot)
+_snapshots: Dict[str, Tuple[Optional[Tuple[int, int, int]], Optional[Snapshot]]] = {}
+_snapshots_lock = threading.Lock()
+
+
+def _file_identity(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def load_snapshot(path: Optional[str] = None) -> Optional[Snapshot]:
+    """Open the snapshot at ``path``, or None if absent.
+
+    The snapshot is opened once per process and shared until the file is
+    replaced; the next call then opens the new file, while services that
+    mapped the old one keep reading it.
+    """
+    path = path or default_snapshot_path()
+    identity = _file_identity(path)
+    with _snapshots_lock:
+        cached = _snapshots.get(path)
+        if cached is None or cached[0] != identity:
+            snapshot = None
+            if identity is not None:
+                try:
+                    snapshot = Snapshot(path)
+                except Exception as e:
+                    print(f"Error loading snapshot {path}: {e}")
+            _snapshots[path] = (identity, snapshot)
+        return _snapshots[path][1]
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
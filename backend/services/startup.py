@@ -0,0 +1,178 @@
+"""
+Loading of the data services, in priority order, with per-service state.
+
+By default every service is loaded before the application accepts requests.
+In lazy mode (``RECNIK_LAZY_START=1``) the server binds at once and a
+background thread loads the services one after another, most important
+first; requests that need a service that is not loaded yet get partial
+results (or a 503 with ``Retry-After``) until it is.
+
+The services live in a ``ServiceSet``. A reload builds a complete new set
+in the background, from the current files, and the application swaps it in
+with a single assignment: requests read the set once and keep using the one
+they started with, and nothing on the request path takes a lock.
+"""
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class ServiceSet(SimpleNamespace):
+    """One generation of loaded services plus the data version they were built from."""
+
+
+class ServiceLoader:
+    """Runs the registered load steps in order and records how each went.
+
+    Every step gets the ServiceSet being filled (to reach the services loaded
+    before it) and returns its service; ``on_loaded(target, name, service)``
+    then puts the service in the set.
+    """
+
+    def __init__(self, on_loaded: Callable[[ServiceSet, str, Any], None]):
+        self.on_loaded = on_loaded
+        self._steps: List[Tuple[str, Callable[[ServiceSet], Any]]] = []
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._reload_lock = threading.Lock()
+        self.last_reload: Optional[Dict[str, Any]] = None
+
+    @property
+    def names(self) -> List[str]:
+        return [name for name, _ in self._steps]
+
+    def add(self, name: str, load: Callable[[ServiceSet], Any]):
+        """Register a step; steps run in the order they were added."""
+        self._steps.append((name, load))
+        self._states[name] = {"state": PENDING, "seconds": None, "error": None}
+
+    def load_all(self, target: ServiceSet,
+                 on_complete: Optional[Callable[[ServiceSet], None]] = None):
+        """Run every pending step in this thread, then call ``on_complete(target)``."""
+        for name, load in self._steps:
+            with self._lock:
+                if self._states[name]["state"] != PENDING:
+                    continue
+                self._states[name]["state"] = LOADING
+            self._run(name, load, target)
+        if on_complete is not None:
+            on_complete(target)
+
+    def start(self, target: ServiceSet,
+              on_complete: Optional[Callable[[ServiceSet], None]] = None
+              ) -> Optional[threading.Thread]:
+        """Run the pending steps in a background thread (once)."""
+        with self._lock:
+            if self._thread is not None or self.ready:
+                return self._thread
+            self._thread = threading.Thread(target=self.load_all, args=(target, on_complete),
+                                            name="service-loader", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def _run(self, name: str, load: Callable[[ServiceSet], Any], target: ServiceSet):
+        start = time.time()
+        try:
+            self.on_loaded(target, name, load(target))
+        except Exception as e:
+            print(f"Warning: Could not load {name}: {e}")
+            state, error = FAILED, str(e)
+        else:
+            state, error = READY, None
+        seconds = round(time.time() - start, 3)
+        with self._lock:
+            self._states[name].update(state=state, seconds=seconds, error=error)
+        if state == READY:
+            print(f"Loaded {name} in {seconds:.1f}s")
+
+    def reload(self, target: ServiceSet, swap: Callable[[ServiceSet], None]) -> bool:
+        """Load every service again into ``target`` and pass it to ``swap``.
+
+        Runs in the calling thread. If any step fails, nothing is swapped and
+        the services in use stay as they are. After a successful swap every
+        step is ready again, with the time it took to reload (so a service
+        that failed at startup recovers). Returns False without doing
+        anything before the initial load has finished or while another
+        reload is running; the outcome is kept in ``last_reload``.
+        """
+        if not self.ready or not self._reload_lock.acquire(blocking=False):
+            return False
+        start = time.time()
+        self.last_reload = {"state": LOADING, "version": getattr(target, "version", None),
+                            "seconds": None, "error": None}
+        name = None
+        try:
+            seconds = {}
+            for name, load in self._steps:
+                step_start = time.time()
+                self.on_loaded(target, name, load(target))
+                seconds[name] = round(time.time() - step_start, 3)
+            name = None
+            with self._lock:
+                swap(target)
+                for step, step_seconds in seconds.items():
+                    self._states[step].update(state=READY, seconds=step_seconds, error=None)
+        except Exception as e:
+            where = f"{name}: " if name else ""
+            print(f"Warning: Reload failed, keeping the loaded data ({where}{e})")
+            self.last_reload.update(state=FAILED, error=f"{where}{e}")
+        else:
+            self.last_reload["state"] = READY
+        finally:
+            self.last_reload["seconds"] = round(time.time() - start, 3)
+            self._reload_lock.release()
+        return True
+
+    @property
+    def reloading(self) -> bool:
+        return self._reload_lock.locked()
+
+    def state(self, name: str) -> str:
+        return self._states[name]["state"]
+
+    def is_ready(self, name: str) -> bool:
+        return self._states[name]["state"] == READY
+
+    @property
+    def ready(self) -> bool:
+        """True once every step has finished (successfully or not)."""
+        return all(state["state"] in (READY, FAILED) for state in self._states.values())
+
+    def status(self) -> Dict[str, Any]:
+        """Overall state, every step's state, duration and error, and the last reload."""
+        with self._lock:
+            services = {name: dict(self._states[name]) for name, _ in self._steps}
+        states = {service["state"] for service in services.values()}
+        if states <= {READY}:
+            overall = READY
+        elif states <= {READY, FAILED}:
+            overall = FAILED
+        else:
+            overall = LOADING
+        last_reload = dict(self.last_reload) if self.last_reload is not None else None
+        return {"status": overall, "services": services, "reload": last_reload}
+
+
+def watch(interval: float, changed: Callable[[], bool], reload: Callable[[], Any],
+          name: str = "data-watcher") -> threading.Thread:
+    """Call ``reload()`` whenever ``changed()`` is true, checking every ``interval`` seconds."""
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                if changed():
+                    reload()
+            except Exception as e:
+                print(f"Warning: Data watcher error: {e}")
+
+    thread = threading.Thread(target=run, name=name, daemon=True)
+    thread.start()
+    return thread
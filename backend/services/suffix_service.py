@@ -0,0 +1,167 @@
+"""
+Suffix and rhyme search over the word list and the jezik forms.
+
+Every word is indexed under its ``canonical_key`` spelled backwards, so the
+words ending in a suffix are one contiguous range of the sorted keys, found
+by binary search, and words sharing longer endings (better rhymes) are
+neighbours. The ranking machinery is the autocomplete ``RankedPrefixIndex``
+run over the reversed keys.
+"""
+import base64
+import json
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .normalize import canonical_key, is_cyrillic, to_latin
+from .snapshot import load_snapshot
+from .suggest_service import UNRANKED, RankedPrefixIndex
+
+# Result orders: most frequent first, or by ending (rhyme dictionary order)
+ORDERS = ('frequency', 'rhyme')
+
+
+def lexicon_keys(wordlist_service, jezik_service=None) -> Set[str]:
+    """Canonical keys of the word list, the jezik lemmas and all their forms."""
+    keys = {canonical_key(word) for word in wordlist_service.word_set}
+    if jezik_service is not None and jezik_service.form_index.available:
+        # Form index keys are already accent-stripped canonical forms
+        keys.update(jezik_service.form_index.forms)
+        keys.update(canonical_key(lemma) for lemma in jezik_service.form_index.lemmas())
+    keys.discard('')
+    return keys
+
+
+def encode_cursor(order: str, rank: int, key: str) -> str:
+    """Opaque cursor resuming a search after the entry with ``key``.
+
+    The cursor names the last entry instead of its position, so it stays
+    valid when the index is rebuilt with other words.
+    """
+    data = json.dumps([order, rank, key], ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, order: str) -> Tuple[int, str]:
+    """(rank, key) of a cursor; raises ValueError if it is not one for ``order``."""
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_order, rank, key = json.loads(data.decode('utf-8'))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if cursor_order != order or not isinstance(rank, int) or not isinstance(key, str):
+        raise ValueError("Invalid cursor")
+    return rank, key
+
+
+class SuffixService:
+    """Words ending in a given suffix, by frequency or in rhyme order.
+
+    Words are returned once per canonical key, in lowercase, in the script
+    of the query.
+    """
+
+    MAX_LIMIT = 50
+
+    def __init__(self, wordlist_service, frequency_service, jezik_service=None,
+                 use_snapshot: bool = True):
+        self.index: Optional[RankedPrefixIndex] = None
+        if use_snapshot and self._load_snapshot(wordlist_service, frequency_service, jezik_service):
+            return
+        self._build_index(wordlist_service, frequency_service, jezik_service)
+
+    def _load_snapshot(self, wordlist_service, frequency_service, jezik_service) -> bool:
+        """Map the prebuilt index from the binary snapshot if it is up to date."""
+        snapshot = load_snapshot()
+        if snapshot is None or not snapshot.has('suffix.keys'):
+            return False
+        sources = [('wordlist', wordlist_service.wordlist_file),
+                   ('frequency', frequency_service.freq_file)]
+        if jezik_service is not None:
+            sources.append(('form_index', jezik_service.form_index.index_file))
+        for name, path in sources:
+            if name in snapshot.meta["sources"] and not snapshot.source_matches(name, path):
+                print(f"Warning: Snapshot {snapshot.path} is older than {path}, "
+                      f"rebuilding the suffix index")
+                return False
+
+        self.index = RankedPrefixIndex.from_snapshot(snapshot, 'suffix')
+        print(f"Mapped suffix index over {len(self.index.keys)} words from snapshot")
+        return True
+
+    def write_snapshot(self, writer):
+        """Add the suffix index to a SnapshotWriter."""
+        if self.index is not None:
+            self.index.write_snapshot(writer, 'suffix')
+
+    def _build_index(self, wordlist_service, frequency_service, jezik_service):
+        start = time.time()
+
+        keys = lexicon_keys(wordlist_service, jezik_service)
+        if not keys:
+            return
+
+        entries = []
+        for key in keys:
+            rank = frequency_service.get_rank(key)
+            entries.append((key[::-1], rank if rank is not None else UNRANKED))
+        entries.sort()
+
+        self.index = RankedPrefixIndex(
+            [key for key, _ in entries], array('I', (rank for _, rank in entries)),
+            top_k=self.MAX_LIMIT * 2
+        )
+        print(f"Built suffix index over {len(entries)} words in {time.time() - start:.1f}s")
+
+    def search(self, suffix: str, limit: int = 20, order: str = 'frequency',
+               cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Words ending in ``suffix`` (a leading '-' is ignored).
+
+        Returns the normalized suffix, the number of matching words, one page
+        of ``{"word", "rank"}`` results and the cursor of the next page (None
+        on the last one). Raises ValueError for an unknown order or a cursor
+        that does not belong to it.
+        """
+        if order not in ORDERS:
+            raise ValueError(f"Unknown order '{order}' (expected one of {', '.join(ORDERS)})")
+        limit = max(1, min(limit, self.MAX_LIMIT))
+        key = canonical_key(suffix.strip().lstrip('-'))
+        after = decode_cursor(cursor, order) if cursor else None
+        result: Dict[str, Any] = {"suffix": key, "total": 0, "results": [], "next_cursor": None}
+        if self.index is None or not key:
+            return result
+
+        index = self.index
+        prefix = key[::-1]
+        lo, hi = index.prefix_range(prefix)
+        result["total"] = hi - lo
+
+        # One extra entry tells whether there is a next page
+        if order == 'rhyme':
+            start = lo if after is None else max(lo, bisect_right(index.keys, after[1], lo, hi))
+            positions = list(range(start, min(start + limit + 1, hi)))
+        elif after is None:
+            positions = index.top(prefix, limit + 1)
+        else:
+            rank, cursor_key = after
+            pos = bisect_left(index.keys, cursor_key, lo, hi)
+            if pos == hi or index.keys[pos] != cursor_key:
+                # The word is gone: resume before the key that took its place
+                pos -= 1
+            positions = index.top_after(prefix, limit + 1, (rank, pos))
+
+        latin = not is_cyrillic(suffix)
+        page: List[Dict[str, Optional[int]]] = []
+        for pos in positions[:limit]:
+            word = index.keys[pos][::-1]
+            rank = index.ranks[pos]
+            page.append({
+                "word": to_latin(word) if latin else word,
+                "rank": rank if rank != UNRANKED else None
+            })
+        result["results"] = page
+        if len(positions) > limit:
+            last = positions[limit - 1]
+            result["next_cursor"] = encode_cursor(order, index.ranks[last], index.keys[last])
+        return result
@@ -0,0 +1,238 @@
+"""
+Frequency-ranked autocomplete over the word list and jezik lemmas.
+"""
+import heapq
+import os
+import time
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .normalize import fold_key, is_cyrillic, to_latin
+from .snapshot import load_snapshot
+
+_MAX_CHAR = '\U0010ffff'
+
+# Rank used for words without frequency data (sorts after every ranked word)
+UNRANKED = 0xFFFFFFFF
+
+
+class RankedPrefixIndex:
+    """Sorted keys with precomputed best-ranked entries for large prefixes.
+
+    Prefix ranges with at most ``group_threshold`` entries are ranked on the
+    fly; every prefix with a bigger range has its ``top_k`` best positions
+    precomputed at build time, so a query never scans more than
+    ``group_threshold`` entries.
+    """
+
+    def __init__(self, keys: Sequence[str], ranks: Sequence[int],
+                 top_k: int = 20, group_threshold: int = 256, top=None):
+        self.keys = keys
+        self.ranks = ranks
+        self.top_k = top_k
+        self.group_threshold = group_threshold
+        if top is not None:
+            # Precomputed (e.g. mapped from a snapshot)
+            self._top = top
+        else:
+            self._top: Dict[str, Tuple[int, ...]] = {}
+            if len(keys) > group_threshold:
+                self._collect(0, len(keys), 0, '')
+
+    def _collect(self, lo: int, hi: int, depth: int, prefix: str) -> List[Tuple[int, int]]:
+        """Store and return the best (rank, position) pairs of a large group."""
+        keys, ranks = self.keys, self.ranks
+        items = []
+
+        # Keys equal to the prefix itself sort first
+        i = lo
+        while i < hi and len(keys[i]) == depth:
+            items.append((ranks[i], i))
+            i += 1
+
+        # Then one contiguous child range per next character
+        while i < hi:
+            child = keys[i][:depth + 1]
+            j = bisect_left(keys, child + _MAX_CHAR, i, hi)
+            if j - i > self.group_threshold:
+                items.extend(self._collect(i, j, depth + 1, child))
+            else:
+                items.extend(heapq.nsmallest(self.top_k, zip(ranks[i:j], range(i, j))))
+            i = j
+
+        top = heapq.nsmallest(self.top_k, items)
+        self._top[prefix] = tuple(pos for _, pos in top)
+        return top
+
+    def write_snapshot(self, writer, name: str):
+        """Add the index tables to a SnapshotWriter under ``name``."""
+        prefixes = sorted(self._top)
+        offsets = array('I', [0])
+        positions = array('I')
+        for prefix in prefixes:
+            positions.extend(self._top[prefix])
+            offsets.append(len(positions))
+        writer.add_strings(f'{name}.keys', self.keys)
+        writer.add_array(f'{name}.ranks', 'I', self.ranks)
+        writer.add_strings(f'{name}.top.prefixes', prefixes)
+        writer.add_array(f'{name}.top.offsets', 'I', offsets)
+        writer.add_array(f'{name}.top.positions', 'I', positions)
+        writer.meta[name] = {"top_k": self.top_k, "group_threshold": self.group_threshold}
+
+    @classmethod
+    def from_snapshot(cls, snapshot, name: str) -> "RankedPrefixIndex":
+        params = snapshot.meta[name]
+        top = _SnapshotTopMap(
+            snapshot.strings(f'{name}.top.prefixes'),
+            snapshot.array(f'{name}.top.offsets'),
+            snapshot.array(f'{name}.top.positions'),
+        )
+        return cls(snapshot.strings(f'{name}.keys'), snapshot.array(f'{name}.ranks'),
+                   top_k=params["top_k"], group_threshold=params["group_threshold"], top=top)
+
+    def prefix_range(self, prefix: str) -> Tuple[int, int]:
+        lo = bisect_left(self.keys, prefix)
+        return lo, bisect_left(self.keys, prefix + _MAX_CHAR, lo)
+
+    def top(self, prefix: str, k: int) -> List[int]:
+        """Positions of the ``k`` best-ranked keys starting with ``prefix``."""
+        lo, hi = self.prefix_range(prefix)
+        if hi - lo > self.group_threshold:
+            return list(self._top[prefix][:k])
+        return heapq.nsmallest(k, range(lo, hi), key=self.ranks.__getitem__)
+
+    def top_after(self, prefix: str, k: int, after: Tuple[int, int]) -> List[int]:
+        """Like ``top``, but only keys ranked after ``after``, a (rank, position) pair.
+
+        Pages within the precomputed best positions of a large prefix cost
+        nothing extra; pages beyond them scan the prefix range.
+        """
+        lo, hi = self.prefix_range(prefix)
+        ranks = self.ranks
+        if hi - lo > self.group_threshold:
+            following = [pos for pos in self._top[prefix] if (ranks[pos], pos) > after]
+            if len(following) >= k:
+                return following[:k]
+        return heapq.nsmallest(k, (pos for pos in range(lo, hi) if (ranks[pos], pos) > after),
+                               key=ranks.__getitem__)
+
+
+class _SnapshotTopMap:
+    """Read-only prefix -> best positions mapping stored in a snapshot."""
+
+    def __init__(self, prefixes: Sequence[str], offsets: Sequence[int], positions: Sequence[int]):
+        self.prefixes = prefixes
+        self.offsets = offsets
+        self.positions = positions
+
+    def __getitem__(self, prefix: str) -> Sequence[int]:
+        i = bisect_left(self.prefixes, prefix)
+        if i == len(self.prefixes) or self.prefixes[i] != prefix:
+            raise KeyError(prefix)
+        return self.positions[self.offsets[i]:self.offsets[i + 1]]
+
+
+class SuggestService:
+    """Autocomplete for the search box, ranked by corpus frequency.
+
+    Input may be Latin or Cyrillic, with or without diacritics: 'sk' matches
+    'школа', 'škola' and 'skola'.
+    """
+
+    MAX_LIMIT = 20
+
+    def __init__(self, wordlist_service, frequency_service, jezik_service=None,
+                 use_snapshot: bool = True):
+        self.words: Sequence[str] = []
+        self.index: Optional[RankedPrefixIndex] = None
+        if use_snapshot and self._load_snapshot(wordlist_service, frequency_service, jezik_service):
+            return
+        self._build_index(wordlist_service, frequency_service, jezik_service)
+
+    def _load_snapshot(self, wordlist_service, frequency_service, jezik_service) -> bool:
+        """Map the prebuilt index from the binary snapshot if it is up to date."""
+        snapshot = load_snapshot()
+        if snapshot is None or not snapshot.has('suggest.keys'):
+            return False
+        sources = [('wordlist', wordlist_service.wordlist_file),
+                   ('frequency', frequency_service.freq_file)]
+        if jezik_service is not None:
+            sources.append(('form_index', jezik_service.form_index.index_file))
+        for name, path in sources:
+            if name in snapshot.meta["sources"] and not snapshot.source_matches(name, path):
+                print(f"Warning: Snapshot {snapshot.path} is older than {path}, "
+                      f"rebuilding the suggest index")
+                return False
+
+        self.words = snapshot.strings('suggest.words')
+        self.index = RankedPrefixIndex.from_snapshot(snapshot, 'suggest')
+        print(f"Mapped suggest index over {len(self.words)} words from snapshot")
+        return True
+
+    def write_snapshot(self, writer, form_index_file: Optional[str] = None):
+        """Add the suggest index to a SnapshotWriter."""
+        if self.index is None:
+            return
+        if form_index_file and os.path.exists(form_index_file):
+            writer.add_source('form_index', form_index_file)
+        writer.add_strings('suggest.words', self.words)
+        self.index.write_snapshot(writer, 'suggest')
+
+    def _build_index(self, wordlist_service, frequency_service, jezik_service):
+        start = time.time()
+
+        words = set(wordlist_service.word_set)
+        if jezik_service is not None and jezik_service.form_index.available:
+            words.update(jezik_service.form_index.lemmas())
+        if not words:
+            return
+
+        entries = []
+        for word in words:
+            rank = frequency_service.get_rank(word)
+            entries.append((fold_key(word), rank if rank is not None else UNRANKED, word))
+        entries.sort()
+
+        self.words = [word for _, _, word in entries]
+        keys = [key for key, _, _ in entries]
+        ranks = array('I', (rank for _, rank, _ in entries))
+        self.index = RankedPrefixIndex(keys, ranks, top_k=self.MAX_LIMIT * 2)
+
+        print(f"Built suggest index over {len(self.words)} words in {time.time() - start:.1f}s")
+
+    def suggest(self, query: str, limit: int = 10) -> List[Dict[str, Optional[int]]]:
+        """Top completions of ``query``, most frequent first.
+
+        The same word spelled in both scripts is returned once, in the script
+        of the query.
+        """
+        if self.index is None:
+            return []
+        key = fold_key(query.strip())
+        if not key:
+            return []
+        limit = max(1, min(limit, self.MAX_LIMIT))
+
+        # Fetch extra candidates to make up for cross-script duplicates
+        positions = self.index.top(key, limit * 2)
+        want_cyrillic = is_cyrillic(query)
+
+        chosen: Dict[str, int] = {}
+        for pos in positions:
+            word = self.words[pos]
+            spelling = to_latin(word.lower())
+            if spelling not in chosen:
+                chosen[spelling] = pos
+            elif is_cyrillic(word) == want_cyrillic and \
+                    is_cyrillic(self.words[chosen[spelling]]) != want_cyrillic:
+                chosen[spelling] = pos
+
+        results = []
+        for pos in list(chosen.values())[:limit]:
+            rank = self.index.ranks[pos]
+            results.append({
+                "word": self.words[pos],
+                "rank": rank if rank != UNRANKED else None
+            })
+        return results
@@ -0,0 +1,174 @@
+"""
+Tokenizes running Serbian text and annotates every token for /api/analyze.
+
+The text is read in fixed-size chunks and annotated chunk by chunk, so memory
+use does not depend on the length of the input. Each distinct token is
+resolved once (through the form resolution of JezikService) and remembered
+in a bounded per-process cache.
+"""
+import codecs
+import json
+import os
+import re
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Tuple
+
+from .lru_cache import LRUCache
+from .normalize import canonical_key
+
+# Number of resolved tokens kept per process
+DEFAULT_TOKEN_CACHE_SIZE = int(os.environ.get('RECNIK_ANALYZE_CACHE_SIZE', 50000))
+
+# Bytes of input read (and annotated) per step
+CHUNK_SIZE = 64 * 1024
+
+# A token is a run of letters, each optionally followed by combining accents.
+# Digits, punctuation and whitespace separate tokens in both scripts.
+TOKEN_RE = re.compile(r'(?:[^\W\d_][\u0300-\u036f]*)+')
+
+# Longer runs of letters are not words (e.g. base64 or a pasted blob) and
+# are dropped, so a token never has to be held back across many chunks
+MAX_TOKEN_LENGTH = 256
+
+# The rest of a dropped run at the start of the next chunk
+_RUN_RE = re.compile(r'(?:[^\W\d_]|[\u0300-\u036f])*')
+
+
+def tokenize(chunks: Iterable[str]) -> Iterator[List[Tuple[str, int]]]:
+    """Split a stream of text chunks into (token, character offset) pairs.
+
+    Yields one list per chunk. A token touching the end of a chunk is held
+    back until the next chunk shows whether it continues there. Tokens longer
+    than MAX_TOKEN_LENGTH characters are dropped; once the held-back part
+    exceeds it, the rest of the run is skipped without being buffered.
+    """
+    carry = ''
+    offset = 0  # Offset of ``carry`` in the whole text
+    skipping = False  # Inside a dropped run that may continue in this chunk
+    for chunk in chunks:
+        text = carry + chunk
+        start = 0
+        if skipping:
+            start = _RUN_RE.match(text).end()
+            skipping = start == len(text)
+        tokens = []
+        end = start
+        for match in TOKEN_RE.finditer(text, start):
+            if match.end() == len(text):
+                end = match.start()
+                break
+            if match.end() - match.start() <= MAX_TOKEN_LENGTH:
+                tokens.append((match.group(), offset + match.start()))
+            end = match.end()
+        else:
+            end = len(text)
+        carry = text[end:]
+        offset += end
+        if len(carry) > MAX_TOKEN_LENGTH:
+            offset += len(carry)
+            carry = ''
+            skipping = True
+        yield tokens
+    yield [(match.group(), offset + match.start()) for match in TOKEN_RE.finditer(carry)
+           if match.end() - match.start() <= MAX_TOKEN_LENGTH]
+
+
+def read_text(source: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Decode a UTF-8 byte stream chunk by chunk (invalid bytes are replaced)."""
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    while True:
+        data = source.read(chunk_size)
+        if not data:
+            break
+        text = decoder.decode(data)
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+class TextAnalyzer:
+    """Lemma, POS, form labels and frequency rank for every token of a text."""
+
+    def __init__(self, jezik_service, frequency_service,
+                 cache_size: int = DEFAULT_TOKEN_CACHE_SIZE):
+        self.jezik_service = jezik_service
+        self.frequency_service = frequency_service
+        self._cache = LRUCache(cache_size)
+
+    def resolve(self, token: str) -> Dict[str, Any]:
+        """Annotation of one token (without its position), cached per canonical key."""
+        return self._resolve_cached(token)[0]
+
+    def _resolve_cached(self, token: str) -> Tuple[Dict[str, Any], str]:
+        """The annotation and its serialized JSON members (cached together).
+
+        Cached per canonical key, so spellings of a word in either script
+        share one entry.
+        """
+        key = canonical_key(token)
+        cached = self._cache.get(key)
+        if cached is None:
+            info = self._resolve(key)
+            cached = (info, json.dumps(info, ensure_ascii=False)[1:-1])
+            self._cache.put(key, cached)
+        return cached
+
+    def _resolve(self, key: str) -> Dict[str, Any]:
+        info: Dict[str, Any] = {"lemma": None, "pos": None, "labels": None, "accented_form": None}
+        try:
+            interpretations = self.jezik_service.find_all_lemmas_by_form(key)
+        except Exception as e:
+            print(f"Error resolving '{key}': {e}")
+            interpretations = []
+        if interpretations:
+            first = interpretations[0]
+            info["lemma"] = first["lemma"]
+            info["pos"] = first.get("pos")
+            info["labels"] = first["labels"]
+            info["accented_form"] = first.get("accented_form")
+            if len(interpretations) > 1:
+                info["alternatives"] = [
+                    {"lemma": alt["lemma"], "pos": alt.get("pos")}
+                    for alt in interpretations[1:]
+                ]
+
+        info["rank"] = self.frequency_service.get_rank(key)
+        return info
+
+    def annotate(self, chunks: Iterable[str]) -> Iterator[List[Dict[str, Any]]]:
+        """Yield the annotated tokens of the text, one list per input chunk."""
+        for tokens in tokenize(chunks):
+            if tokens:
+                yield [{"token": token, "start": start, **self.resolve(token)}
+                       for token, start in tokens]
+
+    def stream_ndjson(self, source: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """NDJSON lines for every token of a UTF-8 text, produced chunk by chunk.
+
+        Nothing is read ahead: a consumer that stops iterating stops the work.
+        ``source`` is closed when the iteration ends or is abandoned.
+        """
+        dumps = json.dumps
+        try:
+            for tokens in tokenize(read_text(source, chunk_size)):
+                if not tokens:
+                    continue
+                # Same lines as dumping each annotate() record, but every distinct
+                # token of the chunk is resolved and serialized once:
+                # token -> (line up to the offset, rest of the line)
+                lines = []
+                parts: Dict[str, Tuple[str, str]] = {}
+                for token, start in tokens:
+                    if token not in parts:
+                        members = self._resolve_cached(token)[1]
+                        parts[token] = (f'{{"token": {dumps(token, ensure_ascii=False)}, "start": ',
+                                        f', {members}}}\n')
+                    head, tail = parts[token]
+                    lines.append(f'{head}{start}{tail}')
+                yield ''.join(lines).encode('utf-8')
+        finally:
+            source.close()
+
+    def cache_stats(self) -> Dict[str, int]:
+        return self._cache.stats()
@@ -0,0 +1,529 @@
+"""
+Assembles the /api/word response from the individual data services.
+"""
+import asyncio
+import os
+import threading
+import time
+import unicodedata
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from . import metrics
+from .normalize import canonical_key
+
+# Every field of the word response, in response order
+WORD_FIELDS = (
+    "word", "exists", "lemma", "lemma_latin", "pos", "pos_sr", "gender",
+    "morphology", "morphology_ipa", "frequency", "has_jezik_entry", "ipa", "stress_pattern",
+    "related_forms", "searched_form", "found_lemma", "form_info", "variants",
+    "etymology", "definitions", "partial", "degraded_stages",
+)
+
+# Fields only computed when asked for by name
+OPT_IN_FIELDS = frozenset({"morphology_ipa"})
+
+# Per-stage time limits (seconds) for the async pipeline; override with
+# e.g. RECNIK_TIMEOUT_ETYMOLOGY=0.2
+DEFAULT_STAGE_TIMEOUTS = {
+    stage: float(os.environ.get(f'RECNIK_TIMEOUT_{stage.upper()}', default))
+    for stage, default in (
+        ("morphology", 3.0),
+        ("wordlist", 1.0),
+        ("related_forms", 1.0),
+        ("frequency", 1.0),
+        ("etymology", 0.5),
+        ("pronunciation", 0.5),
+        ("paradigm_ipa", 1.0),
+    )
+}
+
+# Threads shared by all async lookups in this process; at most this many
+# stages are in flight at once, so a stage never waits in the pool's queue
+STAGE_WORKERS = int(os.environ.get('RECNIK_STAGE_WORKERS', 16))
+
+
+class WordNotFoundError(LookupError):
+    """The word is neither in jezik nor in the word list."""
+
+
+class WordLookupUnavailable(RuntimeError):
+    """Nothing was found, but a stage that could have found it timed out or failed."""
+
+
+class WordLookupBusy(WordLookupUnavailable):
+    """Every stage slot is taken (e.g. by stages stuck past their deadline)."""
+
+
+class StageSlots:
+    """Counts the lookup stages handed to the thread pool and not finished yet.
+
+    A stage takes a slot when it is submitted and gives it back when its
+    function returns, not when the request stops waiting for it. Stages
+    abandoned at their deadline keep their thread and their slot, so when
+    they pile up new lookups are turned away instead of queueing behind them.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self.abandoned = 0  # Abandoned stages still running
+        self._lock = threading.Lock()
+
+    def acquire(self, count: int = 1) -> bool:
+        with self._lock:
+            if self.in_flight + count > self.limit:
+                return False
+            self.in_flight += count
+            return True
+
+    def release(self, stage: "_StageRun"):
+        with self._lock:
+            self.in_flight -= 1
+            if stage.abandoned:
+                self.abandoned -= 1
+            stage.done = True
+
+    def abandon(self, stage: "_StageRun"):
+        with self._lock:
+            if not stage.done and not stage.abandoned:
+                stage.abandoned = True
+                self.abandoned += 1
+
+
+class _StageRun:
+    """One stage of an async lookup: its future and when its thread picked it up."""
+    __slots__ = ('name', 'future', 'waiter', 'started', 'started_at', 'abandoned', 'done')
+
+    def __init__(self, name: str, started: asyncio.Event):
+        self.name = name
+        self.future: Optional[Future] = None
+        self.waiter: Optional[asyncio.Future] = None
+        self.started = started
+        self.started_at = 0.0
+        self.abandoned = False
+        self.done = False
+
+
+def normalize_word(word: str) -> str:
+    """Canonical spelling of a request word (trimmed, NFC)."""
+    return unicodedata.normalize('NFC', word.strip())
+
+
+class WordInfoBuilder:
+    """Builds word responses, optionally restricted to a set of fields.
+
+    Stages whose output is not requested (pronunciation, related forms,
+    frequency, etymology) are skipped entirely. A service may be None while
+    it is still being loaded in the background; its stages are then skipped
+    and the response is flagged ``partial``.
+    """
+
+    def __init__(self, jezik_service, frequency_service, wordlist_service,
+                 ipa_service, etymology_service,
+                 timeouts: Optional[Dict[str, float]] = None,
+                 max_workers: int = STAGE_WORKERS):
+        self.jezik_service = jezik_service
+        self.frequency_service = frequency_service
+        self.wordlist_service = wordlist_service
+        self.ipa_service = ipa_service
+        self.etymology_service = etymology_service
+        self.timeouts = {**DEFAULT_STAGE_TIMEOUTS, **(timeouts or {})}
+        self.max_workers = max_workers
+        self.slots = StageSlots(max_workers)
+        # Created on first use, so it is never inherited by forked workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def build(self, word: str, fields: Optional[Set[str]] = None,
+              shared: Optional[Dict[Tuple[str, str], Any]] = None) -> Dict[str, Any]:
+        """Assemble the word response; raises WordNotFoundError if unknown.
+
+        Args:
+            word: The word as requested
+            fields: Response fields to compute (None for all)
+            shared: Memo for per-lemma work shared between several builds,
+                e.g. the forms of one lemma within a batch request
+        """
+        wanted = set(WORD_FIELDS) - OPT_IN_FIELDS if fields is None else set(fields) | {"word"}
+        shared = {} if shared is None else shared
+        degraded: List[str] = []
+        loaded = _loaded_check(degraded)
+
+        result = {
+            "word": word,
+            "exists": False,
+            "has_jezik_entry": False
+        }
+
+        jezik_data = None
+        if loaded("morphology", self.jezik_service):
+            jezik_data = self._add_morphology(word, result)
+
+        if jezik_data and wanted & {"ipa", "stress_pattern"} and \
+                loaded("pronunciation", self.ipa_service):
+            self._add_pronunciation(result, shared)
+        if jezik_data and "morphology_ipa" in wanted and loaded("paradigm_ipa", self.ipa_service):
+            self._add_paradigm_ipa(result)
+
+        # Check if word exists in word list
+        exists = False
+        if loaded("wordlist", self.wordlist_service):
+            exists = self.wordlist_service.word_exists(word)
+        result["exists"] = exists
+
+        # Get related forms from wordlist (inflected forms) - only if no jezik data
+        if not jezik_data and "related_forms" in wanted and \
+                loaded("related_forms", self.wordlist_service):
+            related_forms = self.wordlist_service.find_related_forms(word, limit=50)
+            if related_forms:
+                result["related_forms"] = related_forms
+
+        # Get frequency data
+        if "frequency" in wanted and loaded("frequency", self.frequency_service):
+            freq_data = self.frequency_service.get_frequency(word)
+            if freq_data:
+                result["frequency"] = freq_data
+
+        # Get etymology and definitions from Wiktionary
+        if wanted & {"etymology", "definitions"} and \
+                loaded("etymology", self.etymology_service):
+            lemma_to_lookup = result.get("lemma") or word
+            etym_data = _memo(shared, ("etymology", lemma_to_lookup),
+                              lambda: self.etymology_service.get_word_data(lemma_to_lookup))
+            if etym_data:
+                result["etymology"] = etym_data.get("etymology")
+                result["definitions"] = etym_data.get("definitions")
+
+        if not exists and not jezik_data:
+            if {"morphology", "wordlist"} & set(degraded):
+                raise WordLookupUnavailable(word)
+            raise WordNotFoundError(word)
+
+        if fields is not None:
+            result = {key: value for key, value in result.items() if key in wanted}
+        if degraded:
+            result["partial"] = True
+            result["degraded_stages"] = degraded
+        return result
+
+    async def build_async(self, word: str, fields: Optional[Set[str]] = None) -> Dict[str, Any]:
+        """Assemble the word response, running independent stages concurrently.
+
+        Morphology, word list membership and frequency run in parallel on a
+        bounded thread pool; etymology, related forms and the IPA stages start
+        as soon as the lemma is known. A stage that exceeds its timeout, counted from when a
+        thread starts running it, (or fails) is left out and the response is
+        flagged ``partial`` with the stage listed in ``degraded_stages``, as
+        is a stage whose service is still loading or that found no free slot.
+
+        Raises WordNotFoundError if the word is unknown,
+        WordLookupUnavailable if it could not be found because a stage that
+        might have found it did not finish, or WordLookupBusy if there are no
+        stage slots for the lookup.
+        """
+        wanted = set(WORD_FIELDS) - OPT_IN_FIELDS if fields is None else set(fields) | {"word"}
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        slots = self.slots
+        degraded: List[str] = []
+        loaded = _loaded_check(degraded)
+
+        def submit(stage: str, fn, *args) -> _StageRun:
+            # Called with a slot taken for the stage
+            call = metrics.timed_call(stage, fn)
+            run = _StageRun(stage, asyncio.Event())
+
+            def work():
+                run.started_at = time.monotonic()
+                loop.call_soon_threadsafe(run.started.set)
+                try:
+                    return call(*args)
+                finally:
+                    slots.release(run)
+
+            run.future = executor.submit(work)
+            run.waiter = asyncio.wrap_future(run.future, loop=loop)
+            return run
+
+        def start(stage: str, fn, *args) -> Optional[_StageRun]:
+            if not slots.acquire():
+                degraded.append(stage)
+                return None
+            return submit(stage, fn, *args)
+
+        async def finish(run: Optional[_StageRun], default=None):
+            if run is None:
+                return default
+            timeout = self.timeouts[run.name]
+            try:
+                # The slot limit keeps the pool from queueing, so this is short
+                await asyncio.wait_for(run.started.wait(), timeout)
+                remaining = run.started_at + timeout - time.monotonic()
+                return await asyncio.wait_for(asyncio.shield(run.waiter), max(0.0, remaining))
+            except asyncio.TimeoutError:
+                print(f"Stage '{run.name}' timed out for '{word}'")
+                if run.future.cancel():
+                    # Never started, so its slot is not given back by the thread
+                    slots.release(run)
+                else:
+                    slots.abandon(run)
+                    metrics.stages_abandoned.inc((run.name,))
+            except Exception as e:
+                print(f"Stage '{run.name}' failed for '{word}': {e}")
+            degraded.append(run.name)
+            return default
+
+        first = [
+            ("morphology", self._morphology, word)
+            if loaded("morphology", self.jezik_service) else None,
+            ("wordlist", self.wordlist_service.word_exists, word)
+            if loaded("wordlist", self.wordlist_service) else None,
+            ("frequency", self.frequency_service.get_frequency, word)
+            if "frequency" in wanted and loaded("frequency", self.frequency_service) else None,
+        ]
+        # Shed the lookup while it has not started anything rather than
+        # queueing it behind stages that are stuck
+        if not slots.acquire(sum(stage is not None for stage in first)):
+            metrics.lookups_shed.inc()
+            raise WordLookupBusy(word)
+        morphology, exists, frequency = (
+            submit(*stage) if stage is not None else None for stage in first
+        )
+
+        jezik_data, result = await finish(morphology, (None, {}))
+        result = {"word": word, "exists": False, "has_jezik_entry": False, **result}
+
+        # These depend on the lemma found by the morphology stage
+        lemma_to_lookup = result.get("lemma") or word
+        etymology = start("etymology", self.etymology_service.get_word_data, lemma_to_lookup) \
+            if wanted & {"etymology", "definitions"} and \
+            loaded("etymology", self.etymology_service) else None
+        related = start("related_forms", self.wordlist_service.find_related_forms, word, 50) \
+            if not jezik_data and "related_forms" in wanted and \
+            loaded("related_forms", self.wordlist_service) else None
+
+        pronunciation = start("pronunciation", _added_fields,
+                              lambda r: self._add_pronunciation(r, {}), result) \
+            if jezik_data and wanted & {"ipa", "stress_pattern"} and \
+            loaded("pronunciation", self.ipa_service) else None
+        paradigm_ipa = start("paradigm_ipa", _added_fields, self._add_paradigm_ipa, result) \
+            if jezik_data and "morphology_ipa" in wanted and \
+            loaded("paradigm_ipa", self.ipa_service) else None
+
+        result.update(await finish(pronunciation, {}))
+        result.update(await finish(paradigm_ipa, {}))
+
+        result["exists"] = await finish(exists, False)
+
+        related_forms = await finish(related)
+        if related_forms:
+            result["related_forms"] = related_forms
+
+        freq_data = await finish(frequency)
+        if freq_data:
+            result["frequency"] = freq_data
+
+        etym_data = await finish(etymology)
+        if etym_data:
+            result["etymology"] = etym_data.get("etymology")
+            result["definitions"] = etym_data.get("definitions")
+
+        if not result["exists"] and not jezik_data:
+            if {"morphology", "wordlist"} & set(degraded):
+                raise WordLookupUnavailable(word)
+            raise WordNotFoundError(word)
+
+        if degraded:
+            result["partial"] = True
+            result["degraded_stages"] = degraded
+
+        if fields is None:
+            return result
+        return {key: value for key, value in result.items() if key in wanted}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="word-stage"
+                    )
+        return self._executor
+
+    def fresh(self) -> "WordInfoBuilder":
+        """Builder with the same settings and thread pool but no services yet.
+
+        For reloads: requests still running on this builder keep submitting
+        their stages to the shared pool, so it must not be shut down, and
+        the stage slots of the pool are shared as well. A pool that was not
+        created yet (e.g. in the pre-fork parent) is still not created.
+        """
+        builder = WordInfoBuilder(None, None, None, None, None, self.timeouts, self.max_workers)
+        builder._executor = self._executor
+        builder.slots = self.slots
+        return builder
+
+    def _morphology(self, word: str) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+        """Run the jezik stage on its own result dict (for the async pipeline)."""
+        result: Dict[str, Any] = {}
+        return self._add_morphology(word, result), result
+
+    def build_many(self, words: Iterable[str], fields: Optional[Set[str]] = None,
+                   loading: bool = False) -> List[Dict[str, Any]]:
+        """Resolve many words at once.
+
+        Duplicate inputs are resolved once and per-lemma work is shared between
+        forms of the same lemma. Returns one entry per input word, in order,
+        with either ``data`` or an ``error``. ``loading`` tells whether the
+        services are still being loaded, for the error of a word that could
+        not be looked up (otherwise a service failed to load).
+        """
+        shared: Dict[Tuple[str, str], Any] = {}
+        resolved: Dict[str, Dict[str, Any]] = {}
+        results = []
+
+        for raw_word in words:
+            word = normalize_word(raw_word)
+            if word not in resolved:
+                if not word:
+                    resolved[word] = {"status": 400, "error": "Empty word"}
+                else:
+                    try:
+                        resolved[word] = {"status": 200, "data": self.build(word, fields, shared)}
+                    except WordNotFoundError:
+                        resolved[word] = {"status": 404, "error": "Word not found"}
+                    except WordLookupUnavailable:
+                        resolved[word] = {
+                            "status": 503,
+                            "error": "Still loading, try again" if loading
+                            else "Lookup unavailable, try again later",
+                        }
+            results.append({"word": raw_word, **resolved[word]})
+
+        return results
+
+    def _add_morphology(self, word: str, result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Fill in the jezik fields of ``result``; returns the lemma data."""
+        jezik_service = self.jezik_service
+
+        # Try to get morphology from jezik
+        # First try the word as-is (jezik is keyed in lowercase Cyrillic)
+        word_lower = canonical_key(word)
+        jezik_data = jezik_service.lookup_word(word_lower)
+
+        # Check if the searched word matches specific inflected forms
+        # This handles cases like "škola" which is both nom sg AND gen pl
+        if jezik_data:
+            form_matches = jezik_service.find_matching_forms(word_lower, word_lower)
+            if form_matches and len(form_matches) > 0:
+                # Only set form_info if the word is NOT exactly the lemma in nom sg
+                # (to distinguish "škola" the inflected form from "škola" the lemma)
+                if len(form_matches) > 1 or form_matches[0] not in ['sg nom', 'infinitive']:
+                    result["searched_form"] = word
+                    result["found_lemma"] = word_lower
+                    result["form_info"] = {
+                        "labels": form_matches,
+                        "accented_form": jezik_service.get_accented_form(word_lower, form_matches[0])
+                    }
+
+        # If not found as lemma, try to find lemma by searching inflected forms
+        # Look for ALL possible interpretations
+        if not jezik_data:
+            all_lemmas = jezik_service.find_all_lemmas_by_form(word_lower)
+            if all_lemmas:
+                # Use first result as primary
+                lemma_result = all_lemmas[0]
+                lemma = lemma_result["lemma"]
+                jezik_data = jezik_service.lookup_word(lemma)
+                if jezik_data:
+                    result["searched_form"] = word
+                    result["found_lemma"] = lemma
+                    result["form_info"] = {
+                        "labels": lemma_result["labels"],
+                        "accented_form": lemma_result["accented_form"]
+                    }
+
+                    # If there are multiple interpretations, add them as variants
+                    if len(all_lemmas) > 1:
+                        result["variants"] = []
+                        for alt_lemma in all_lemmas:
+                            alt_data = jezik_service.lookup_word(alt_lemma["lemma"])
+                            if alt_data:
+                                result["variants"].append({
+                                    "lemma": alt_lemma["lemma"],
+                                    "pos": alt_data["pos"],
+                                    "pos_sr": alt_data["pos_sr"],
+                                    "labels": alt_lemma["labels"],
+                                    "accented_form": alt_lemma["accented_form"]
+                                })
+
+        if jezik_data:
+            result["has_jezik_entry"] = True
+            result["lemma"] = jezik_data.get("lemma")
+            result["pos"] = jezik_data.get("pos")
+            result["pos_sr"] = jezik_data.get("pos_sr")
+            result["gender"] = jezik_data.get("gender")
+            result["morphology"] = jezik_data.get("morphology")
+
+        return jezik_data
+
+    def _add_pronunciation(self, result: Dict[str, Any], shared: Dict[Tuple[str, str], Any]):
+        """Add IPA and stress pattern for the searched form (or the lemma)."""
+        accented_form = None
+        # If we searched for an inflected form, use that form's accent
+        if result.get("form_info") and result["form_info"].get("accented_form"):
+            accented_form = result["form_info"]["accented_form"]
+        elif result.get("morphology"):
+            # Otherwise use nominative singular
+            if "sg nom" in result["morphology"]:
+                accented_form = result["morphology"]["sg nom"][0]
+            elif "m sg nom short" in result["morphology"]:
+                accented_form = result["morphology"]["m sg nom short"][0]
+            else:
+                first_key = list(result["morphology"].keys())[0]
+                accented_form = result["morphology"][first_key][0]
+
+        if accented_form:
+            ipa, stress = _memo(shared, ("pronunciation", accented_form),
+                                lambda: self.ipa_service.transcribe(accented_form))
+            if ipa:
+                result["ipa"] = ipa
+            if stress:
+                result["stress_pattern"] = stress
+
+    def _add_paradigm_ipa(self, result: Dict[str, Any]):
+        """Add the IPA of every form in the morphology table."""
+        if result.get("lemma") and result.get("morphology"):
+            result["morphology_ipa"] = self.ipa_service.paradigm_ipa(
+                result["lemma"], result["morphology"]
+            )
+
+
+def _loaded_check(degraded: List[str]):
+    """Check for a stage's service that records the stage as degraded if it is None."""
+
+    def loaded(stage: str, service) -> bool:
+        if service is None:
+            degraded.append(stage)
+            return False
+        return True
+    return loaded
+
+
+def _added_fields(add, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Run ``add`` on a copy of ``result`` and return the fields it set.
+
+    For stages that may be abandoned at their deadline, so that they never
+    write to the response after it was returned.
+    """
+    before = dict(result)
+    copy = dict(before)
+    add(copy)
+    return {key: value for key, value in copy.items() if key not in before}
+
+
+def _memo(shared: Dict[Tuple[str, str], Any], key: Tuple[str, str], compute):
+    if key not in shared:
+        shared[key] = compute()
+    return shared[key]
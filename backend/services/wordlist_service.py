@@ -1,84 +1,164 @@
 import os
-from typing import Set
+import time
+from bisect import bisect_left
+from typing import AbstractSet, Iterator, List, Optional, Sequence, Tuple
 
-class WordlistService:
-    """Service for word existence validation using spisak-srpskih-reci."""
-    
-    # Latin to Cyrillic conversion map
-    LATIN_TO_CYRILLIC = {
-        'a': 'а', 'b': 'б', 'c': 'ц', 'č': 'ч', 'ć': 'ћ',
-        'd': 'д', 'dž': 'џ', 'đ': 'ђ', 'e': 'е', 'f': 'ф',
-        'g': 'г', 'h': 'х', 'i': 'и', 'j': 'ј', 'k': 'к',
-        'l': 'л', 'lj': 'љ', 'm': 'м', 'n': 'н', 'nj': 'њ',
-        'o': 'о', 'p': 'п', 'r': 'р', 's': 'с', 'š': 'ш',
-        't': 'т', 'u': 'у', 'v': 'в', 'z': 'з', 'ž': 'ж',
-        'A': 'А', 'B': 'Б', 'C': 'Ц', 'Č': 'Ч', 'Ć': 'Ћ',
-        'D': 'Д', 'Dž': 'Џ', 'Đ': 'Ђ', 'E': 'Е', 'F': 'Ф',
-        'G': 'Г', 'H': 'Х', 'I': 'И', 'J': 'Ј', 'K': 'К',
-        'L': 'Л', 'Lj': 'Љ', 'M': 'М', 'N': 'Н', 'Nj': 'Њ',
-        'O': 'О', 'P': 'П', 'R': 'Р', 'S': 'С', 'Š': 'Ш',
-        'T': 'Т', 'U': 'У', 'V': 'В', 'Z': 'З', 'Ž': 'Ж'
-    }
-    
-    def __init__(self):
-        self.word_set: Set[str] = set()
-        self._load_wordlist()
-    
-    def _latin_to_cyrillic(self, text: str) -> str:
-        """Convert Latin Serbian to Cyrillic."""
-        result = []
-        i = 0
-        while i < len(text):
-            # Try digraphs first
-            if i + 1 < len(text):
-                digraph = text[i:i+2]
-                if digraph in self.LATIN_TO_CYRILLIC:
-                    result.append(self.LATIN_TO_CYRILLIC[digraph])
-                    i += 2
-                    continue
-            
-            # Single character
-            char = text[i]
-            result.append(self.LATIN_TO_CYRILLIC.get(char, char))
+from .normalize import CANONICAL_KEY_VERSION, canonical_key
+from .snapshot import load_snapshot
+
+class SortedWordSet:
+    """Set-like view of the word list (original spellings).
+    
+    Backed by the same sorted tables as the prefix index: membership is a
+    binary search on the canonical key followed by an exact comparison.
+    """
+    
+    def __init__(self, keys: Sequence[str], words: Sequence[str]):
+        self._keys = keys
+        self._words = words
+    
+    def __contains__(self, word: str) -> bool:
+        key = canonical_key(word)
+        i = bisect_left(self._keys, key)
+        while i < len(self._keys) and self._keys[i] == key:
+            if self._words[i] == word:
+                return True
             i += 1
-        
-        return ''.join(result)
+        return False
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._words)
+    
+    def __len__(self) -> int:
+        return len(self._words)
+
+
+class SortedKeySet:
+    """Membership in a sorted sequence of strings (e.g. a snapshot table)."""
+    
+    def __init__(self, keys: Sequence[str]):
+        self._keys = keys
+    
+    def __contains__(self, key: str) -> bool:
+        i = bisect_left(self._keys, key)
+        return i < len(self._keys) and self._keys[i] == key
+
+
+class WordlistService:
+    """Service for word existence validation using spisak-srpskih-reci.
+    
+    Words are keyed on their ``canonical_key``, so a word exists in any
+    script, case or accentuation with one probe.
+    """
     
-    def _load_wordlist(self):
+    def __init__(self, use_snapshot: bool = True, wordlist_file: Optional[str] = None):
+        self.word_set: AbstractSet[str] = frozenset()
+        self.wordlist_file = None
+        self.snapshot_file = None
+        # Prefix index: canonical keys in sorted order, with the original
+        # spelling of each word at the same position
+        self._prefix_keys: Sequence[str] = []
+        self._prefix_words: Sequence[str] = []
+        self._canonical_keys: AbstractSet[str] = frozenset()
+        self._load_wordlist(use_snapshot, wordlist_file)
+    
+    def _load_wordlist(self, use_snapshot: bool = True, wordlist_file: Optional[str] = None):
         """Load the Serbian word list into memory."""
-        # Check production path first
-        if os.path.exists('/opt/recnik/spisak-srpskih-reci/serbian-words.txt'):
-            wordlist_file = '/opt/recnik/spisak-srpskih-reci/serbian-words.txt'
-        else:
-            # Development path
-            wordlist_file = os.path.join(
-                os.path.dirname(__file__),
-                '../../../spisak-srpskih-reci/serbian-words.txt'
-            )
+        # An explicit file (e.g. benchmark fixtures) overrides the default locations
+        if wordlist_file is None:
+            # Check production path first
+            if os.path.exists('/opt/recnik/spisak-srpskih-reci/serbian-words.txt'):
+                wordlist_file = '/opt/recnik/spisak-srpskih-reci/serbian-words.txt'
+            else:
+                # Development path
+                wordlist_file = os.path.join(
+                    os.path.dirname(__file__),
+                    '../../../spisak-srpskih-reci/serbian-words.txt'
+                )
+        self.wordlist_file = wordlist_file
+        
+        if use_snapshot and self._load_snapshot():
+            return
         
         if not os.path.exists(wordlist_file):
             print(f"Warning: Word list file not found at {wordlist_file}")
             return
         
         try:
+            words = set()
             with open(wordlist_file, 'r', encoding='utf-8') as f:
                 for line in f:
                     word = line.strip()
                     if word:
-                        self.word_set.add(word)
+                        words.add(word)
             
+            self._build_prefix_index(words)
             print(f"Loaded {len(self.word_set)} words into wordlist")
             
         except Exception as e:
             print(f"Error loading wordlist: {e}")
     
-    def word_exists(self, word: str) -> bool:
-        """Check if a word exists in the wordlist."""
-        # Try both Latin and Cyrillic
-        if word in self.word_set:
+    def _load_snapshot(self) -> bool:
+        """Map the word list from the binary snapshot if it is up to date."""
+        snapshot = load_snapshot()
+        if snapshot is None or not snapshot.has('words.keys'):
+            return False
+        if not snapshot.source_matches('wordlist', self.wordlist_file):
+            print(f"Warning: Snapshot {snapshot.path} is older than {self.wordlist_file}, "
+                  f"loading the text file instead")
+            return False
+        
+        self.snapshot_file = snapshot.path
+        if snapshot.meta.get("canonical_keys") != CANONICAL_KEY_VERSION:
+            start = time.time()
+            self._build_prefix_index(snapshot.strings('words.orig'))
+            print(f"Warning: Snapshot {snapshot.path} has outdated canonical keys, re-keyed "
+                  f"{len(self.word_set)} words in {time.time() - start:.1f}s (rebuild it)")
             return True
-        cyrillic = self._latin_to_cyrillic(word)
-        return cyrillic in self.word_set
+        
+        self._prefix_keys = snapshot.strings('words.keys')
+        self._prefix_words = snapshot.strings('words.orig')
+        self.word_set = SortedWordSet(self._prefix_keys, self._prefix_words)
+        self._canonical_keys = SortedKeySet(self._prefix_keys)
+        print(f"Mapped {len(self.word_set)} words from snapshot")
+        return True
+    
+    def write_snapshot(self, writer):
+        """Add the word list tables to a SnapshotWriter."""
+        writer.add_source('wordlist', self.wordlist_file)
+        writer.add_strings('words.keys', self._prefix_keys)
+        writer.add_strings('words.orig', self._prefix_words)
+        writer.meta["canonical_keys"] = CANONICAL_KEY_VERSION
+    
+    def _build_prefix_index(self, words):
+        """Sort the words by canonical key so prefix queries become bisect ranges."""
+        pairs = []
+        for w in words:
+            key = canonical_key(w)
+            # Share the string object when the word is its own key
+            pairs.append((w if key == w else key, w))
+        pairs.sort()
+        # Never modified after loading; tuples and frozensets also keep the
+        # data out of the way of accidental writes in forked workers
+        self._prefix_keys = tuple(key for key, _ in pairs)
+        self._prefix_words = tuple(w for _, w in pairs)
+        self._canonical_keys = frozenset(self._prefix_keys)
+        self.word_set = SortedWordSet(self._prefix_keys, self._prefix_words)
+    
+    def _prefix_range(self, prefix: str) -> Tuple[int, int]:
+        """Index range of words whose canonical key starts with prefix."""
+        keys = self._prefix_keys
+        lo = bisect_left(keys, prefix)
+        hi = bisect_left(keys, prefix + '\U0010ffff', lo)
+        return lo, hi
+    
+    def word_exists(self, word: str) -> bool:
+        """Check if a word exists in the wordlist (in either script)."""
+        return canonical_key(word) in self._canonical_keys
+    
+    def source_files(self) -> List[str]:
+        """Files whose contents determine this service's output."""
+        return [f for f in (self.wordlist_file, self.snapshot_file) if f]
     
     def get_word_count(self) -> int:
         """Get total number of words in the list."""
@@ -86,20 +166,9 @@ class WordlistService:
     
     def find_related_forms(self, word: str, limit: int = 20) -> list:
         """Find all word forms that start with the given word (inflected forms)."""
-        word_lower = word.lower()
-        cyrillic_lower = self._latin_to_cyrillic(word_lower)
-        related = []
-        
-        # Find exact match and forms that start with the word (try both Latin and Cyrillic)
-        for w in self.word_set:
-            w_lower = w.lower()
-            if w_lower == word_lower or w_lower == cyrillic_lower or \
-               w_lower.startswith(word_lower) or w_lower.startswith(cyrillic_lower):
-                related.append(w)
-                if len(related) >= limit:
-                    break
-        
-        return sorted(related)
+        # Exact match and forms that start with the word, in either script
+        lo, hi = self._prefix_range(canonical_key(word))
+        return sorted(self._prefix_words[lo:min(hi, lo + limit)])
     
     def find_possible_lemmas(self, word: str, max_results: int = 10) -> list:
         """Find possible lemmas (base forms) for an inflected word.
@@ -110,34 +179,31 @@ class WordlistService:
         if not word or len(word) < 3:
             return []
         
-        word_lower = word.lower()
-        cyrillic_lower = self._latin_to_cyrillic(word_lower)
+        key = canonical_key(word)
+        keys = self._prefix_keys
         candidates = set()
         
-        # If word exists as-is, it might already be a lemma (try both scripts)
-        if word_lower in self.word_set:
-            candidates.add(word_lower)
-        if cyrillic_lower in self.word_set:
-            candidates.add(cyrillic_lower)
+        # If word exists as-is, it might already be a lemma; return the
+        # stored spellings rather than the canonical (Cyrillic) key
+        if key in self._canonical_keys:
+            lo, hi = self._prefix_range(key)
+            candidates.update(self._prefix_words[i].lower()
+                              for i in range(lo, hi) if keys[i] == key)
         
         # Try different root lengths to find lemmas
-        for root_length in range(min(len(word_lower) - 1, 6), 2, -1):
-            root_latin = word_lower[:root_length]
-            root_cyrillic = self._latin_to_cyrillic(root_latin)
-            
-            for w in self.word_set:
-                w_lower = w.lower()
-                # Look for words starting with same root (either script)
-                if w_lower.startswith(root_latin) or w_lower.startswith(root_cyrillic):
-                    candidates.add(w_lower)
-                    if len(candidates) >= max_results * 3:  # Get more candidates
-                        break
+        for root_length in range(min(len(key) - 1, 6), 2, -1):
+            # Look for words starting with same root
+            room = max_results * 3 - len(candidates)  # Get more candidates
+            if room <= 0:
+                break
+            lo, hi = self._prefix_range(key[:root_length])
+            candidates.update(w.lower() for w in self._prefix_words[lo:min(hi, lo + room)])
             
             if len(candidates) >= max_results:
                 break
         
         # Sort by length (shorter words more likely to be lemmas)
-        return sorted(list(candidates), key=len)[:max_results]
+        return sorted(candidates, key=lambda w: (len(w), w))[:max_results]
 
 
 # Singleton
@@ -0,0 +1,57 @@
+"""
+Shared fixtures: a small synthetic lexicon from benchmarks/fixtures.py.
+
+The services below are built from generated files only (word list,
+frequency table, form index), so these tests need neither the jezik data
+nor the real word lists. They never call jezik's ``lookup``, so the stub
+module is not installed and ``main`` keeps the real one in test_analyze.py.
+"""
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'benchmarks'))
+
+import fixtures  # noqa: E402
+
+LEMMAS = 300
+SEED = 1234
+
+
+class FormIndexOnly:
+    """Stands in for JezikService: the search indexes only need the form index."""
+
+    def __init__(self, form_index):
+        self.form_index = form_index
+
+
+@pytest.fixture(scope='session')
+def dictionary():
+    return fixtures.generate_dictionary(LEMMAS, SEED)
+
+
+@pytest.fixture(scope='session')
+def fixture_files(dictionary, tmp_path_factory):
+    directory = tmp_path_factory.mktemp('recnik-data')
+    return fixtures.write_fixture_files(str(directory), dictionary, extra_words=2000, seed=SEED)
+
+
+@pytest.fixture(scope='session')
+def wordlist(fixture_files):
+    from services.wordlist_service import WordlistService
+    return WordlistService(use_snapshot=False, wordlist_file=fixture_files["wordlist"])
+
+
+@pytest.fixture(scope='session')
+def frequency(fixture_files):
+    from services.frequency_service import FrequencyService
+    return FrequencyService(use_snapshot=False, freq_file=fixture_files["frequency"])
+
+
+@pytest.fixture(scope='session')
+def jezik(fixture_files):
+    from services.form_index import FormIndex
+    return FormIndexOnly(FormIndex(fixture_files["form_index"]))
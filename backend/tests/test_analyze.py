@@ -0,0 +1,53 @@
+"""
+Smoke tests of POST /api/analyze against the application and its data.
+
+Run from the backend directory: python -m pytest tests
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+
+client = TestClient(main.app)
+
+
+def _tokens(response):
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def test_analyze_streams_one_object_per_token():
+    response = client.post('/api/analyze', content='Школа и вода.'.encode('utf-8'))
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('application/x-ndjson')
+    tokens = _tokens(response)
+    assert [token['token'] for token in tokens] == ['Школа', 'и', 'вода']
+    assert tokens[0]['start'] == 0
+    assert tokens[0]['lemma'] == 'школа'
+
+
+def test_analyze_empty_body():
+    response = client.post('/api/analyze', content=b'')
+    assert response.status_code == 200
+    assert _tokens(response) == []
+
+
+def test_analyze_rejects_long_text(monkeypatch):
+    monkeypatch.setattr(main, 'MAX_ANALYZE_BYTES', 4)
+    response = client.post('/api/analyze', content='вода вода'.encode('utf-8'))
+    assert response.status_code == 413
+
+
+def test_analyze_drops_multi_megabyte_token():
+    # One 4 MB run of letters spans many read chunks; it must neither be
+    # re-scanned per chunk nor returned as a token
+    run = 'а' * (4 << 20)
+    response = client.post('/api/analyze', content=f'вода {run} школа'.encode('utf-8'))
+    assert response.status_code == 200
+    tokens = _tokens(response)
+    assert [token['token'] for token in tokens] == ['вода', 'школа']
+    assert tokens[1]['start'] == len(f'вода {run} ')
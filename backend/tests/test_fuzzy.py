@@ -0,0 +1,55 @@
+"""
+SymSpell-style "did you mean" index (services/fuzzy_service.py).
+"""
+import pytest
+
+from services.fuzzy_service import FuzzyService, deletion_variants, edit_distance
+from services.normalize import fold_key, to_latin
+
+
+@pytest.fixture(scope='module')
+def fuzzy(wordlist, frequency, jezik):
+    return FuzzyService(wordlist, frequency, jezik, use_snapshot=False, max_distance=1)
+
+
+def test_edit_distance():
+    assert edit_distance('kuca', 'kuca', 1) == 0
+    assert edit_distance('kuca', 'kuka', 1) == 1
+    assert edit_distance('kuca', 'kuac', 1) == 1  # Adjacent transposition
+    assert edit_distance('kuca', 'kuc', 1) == 1
+    # Past the limit the result is only limit + 1
+    assert edit_distance('kuca', 'mesto', 1) == 2
+    assert edit_distance('kuca', 'kucanje', 2) == 3
+
+
+def test_deletion_variants():
+    assert deletion_variants('abc', 1) == {'abc', 'bc', 'ac', 'ab'}
+    assert deletion_variants('abc', 0) == {'abc'}
+    # Only the indexed prefix is varied
+    assert deletion_variants('abcdefghij', 0) == {'abcdefg'}
+
+
+def test_did_you_mean_finds_one_typo(fuzzy, dictionary):
+    for lemma in sorted(dictionary)[:20]:
+        # A vowel folds to one letter, so replacing it is one edit of the key
+        vowel = next(i for i, char in enumerate(lemma) if char in 'аеиоу')
+        typo = lemma[:vowel] + 'ы' + lemma[vowel + 1:]
+        suggestions = fuzzy.did_you_mean(typo, limit=10)
+        assert lemma in [s["word"] for s in suggestions]
+        distances = [s["distance"] for s in suggestions]
+        assert distances == sorted(distances)
+        for suggestion in suggestions:
+            assert suggestion["distance"] == edit_distance(
+                fold_key(typo), fold_key(suggestion["word"]), 1)
+
+
+def test_did_you_mean_folds_script_and_diacritics(fuzzy, dictionary):
+    lemma = sorted(dictionary)[0]
+    suggestions = fuzzy.did_you_mean(fold_key(to_latin(lemma)))
+    assert suggestions[0] == {"word": lemma, "distance": 0,
+                              "rank": suggestions[0]["rank"]}
+
+
+def test_did_you_mean_without_candidates(fuzzy):
+    assert fuzzy.did_you_mean('ыыыыыыыы') == []
+    assert fuzzy.did_you_mean('') == []
@@ -0,0 +1,75 @@
+"""
+Script, case and diacritic normalization (services/normalize.py).
+"""
+import pytest
+
+from services.normalize import canonical_key, fold_key, strip_accents, to_cyrillic, to_latin
+
+
+@pytest.mark.parametrize('text, key', [
+    ('ljubav', 'љубав'),
+    ('Ljubav', 'љубав'),
+    ('LJUBAV', 'љубав'),
+    ('njegoš', 'његош'),
+    ('NJEGOŠ', 'његош'),
+    ('džep', 'џеп'),
+    ('Džep', 'џеп'),
+    ('DŽEP', 'џеп'),
+    ('đak', 'ђак'),
+    ('Đak', 'ђак'),
+    ('škola', 'школа'),
+    ('школа', 'школа'),
+    ('ШКОЛА', 'школа'),
+    ('шко̑ла', 'школа'),
+    ('kuća', 'кућа'),
+    ('kuca', 'куца'),
+])
+def test_canonical_key(text, key):
+    assert canonical_key(text) == key
+
+
+@pytest.mark.parametrize('text, key', [
+    ('x-ray', 'x-ray'),
+    ('X-Ray', 'x-ray'),
+    ('wifi', 'wifi'),
+    ('QWERTY', 'qwerty'),
+    ('ÐAK', 'ðak'),
+    ('αβγ', 'αβγ'),
+    # Serbian Latin with non-letters is still transliterated
+    ('e-mail', 'е-маил'),
+    ('ba?', 'ба?'),
+])
+def test_canonical_key_leaves_foreign_words_in_their_script(text, key):
+    assert canonical_key(text) == key
+
+
+def test_canonical_key_of_decomposed_latin():
+    # č as c + combining caron, as NFD input arrives
+    assert canonical_key('čas') == 'час'
+
+
+@pytest.mark.parametrize('text, key', [
+    ('ђак', 'djak'),
+    ('đak', 'djak'),
+    ('djak', 'djak'),
+    ('Љубав', 'ljubav'),
+    ('џеп', 'dzep'),
+    ('džep', 'dzep'),
+    ('Školа', 'skola'),
+    ('кућа', 'kuca'),
+    ('kuća', 'kuca'),
+])
+def test_fold_key(text, key):
+    assert fold_key(text) == key
+
+
+def test_transliteration_round_trip():
+    for word in ('Љубав', 'ЊЕГОШ', 'Џеп', 'ђак', 'шума'):
+        assert to_cyrillic(to_latin(word)) == word
+    assert to_latin('Љубав') == 'Ljubav'
+
+
+def test_strip_accents():
+    assert strip_accents('шко̑ла̄') == 'школа'
+    assert strip_accents('č') == 'c'
+    assert strip_accents('plain') == 'plain'
@@ -0,0 +1,44 @@
+"""
+Columnar paradigm store (services/paradigm_store.py): written from generated
+jezik-style tables and read back.
+"""
+import pytest
+
+from services.normalize import strip_accents
+from services.paradigm_store import ParadigmStore, ParadigmStoreWriter
+
+
+@pytest.fixture(scope='module')
+def store(dictionary, tmp_path_factory):
+    writer = ParadigmStoreWriter()
+    for lemma in sorted(dictionary):
+        writer.add(lemma, dictionary[lemma])
+    path = str(tmp_path_factory.mktemp('paradigms') / 'paradigms.bin')
+    writer.write(path, complete=False)
+    return ParadigmStore(path)
+
+
+def test_round_trip(store, dictionary):
+    assert store.available
+    assert list(store.lemmas) == sorted(dictionary)
+    assert store.complete is False
+    for lemma, tables in dictionary.items():
+        stored = store.tables(lemma)
+        assert len(stored) == len(tables)
+        for table, (pos, rows, plain_rows) in zip(tables, stored):
+            assert pos == table.pos
+            assert rows == tuple((label, tuple(forms)) for label, forms in table)
+            assert plain_rows == tuple(
+                tuple(strip_accents(form.lower()) for form in forms) for _, forms in table
+            )
+
+
+def test_unknown_lemma(store):
+    assert store.tables('ыыы') is None
+    assert store.tables('') is None
+
+
+def test_missing_store(tmp_path):
+    store = ParadigmStore(str(tmp_path / 'none.bin'))
+    assert not store.available
+    assert store.tables('кућа') is None
@@ -0,0 +1,65 @@
+"""
+Bitset wildcard search (services/pattern_service.py), checked against a
+regular expression scan of the same lexicon.
+"""
+import re
+
+import pytest
+
+from services.normalize import to_latin
+from services.pattern_service import PatternService
+from services.suffix_service import lexicon_keys
+
+
+@pytest.fixture(scope='module')
+def pattern(wordlist, frequency, jezik):
+    return PatternService(wordlist, frequency, jezik, use_snapshot=False)
+
+
+@pytest.fixture(scope='module')
+def lexicon(wordlist, jezik):
+    return sorted(lexicon_keys(wordlist, jezik))
+
+
+def _scan(lexicon, pattern, length=None):
+    regex = re.compile(pattern.replace('?', '.').replace('*', '.*'))
+    return {key for key in lexicon
+            if regex.fullmatch(key) and (length is None or len(key) == length)}
+
+
+@pytest.mark.parametrize('query', ['ба?', '?а?а', 'б*', '*ама', 'б*а', 'б?*м*а', '*о*и*'])
+def test_search_matches_scan(pattern, lexicon, query):
+    expected = _scan(lexicon, query)
+    result = pattern.search(query, limit=PatternService.MAX_LIMIT)
+    assert result["total"] == len(expected)
+    words = [item["word"] for item in result["results"]]
+    assert len(words) == min(len(expected), PatternService.MAX_LIMIT)
+    assert set(words) <= expected
+
+
+def test_search_ranks_most_frequent_first(pattern):
+    ranks = [item["rank"] for item in pattern.search('б*', limit=50)["results"]]
+    ranked = [rank for rank in ranks if rank is not None]
+    assert ranked == sorted(ranked)
+    # Unranked words come after all ranked ones
+    assert ranks[:len(ranked)] == ranked
+
+
+def test_search_by_length(pattern, lexicon):
+    result = pattern.search('б*', length=4, limit=PatternService.MAX_LIMIT)
+    assert result["total"] == len(_scan(lexicon, 'б*', length=4))
+    assert all(len(item["word"]) == 4 for item in result["results"])
+
+
+def test_search_in_latin(pattern, lexicon):
+    expected = _scan(lexicon, 'ба?')
+    result = pattern.search('ba?', limit=PatternService.MAX_LIMIT)
+    assert result["pattern"] == 'ба?'
+    assert {item["word"] for item in result["results"]} == {to_latin(key) for key in expected}
+
+
+def test_search_rejects_other_characters(pattern):
+    with pytest.raises(ValueError):
+        pattern.search('ба1')
+    with pytest.raises(ValueError):
+        pattern.search('  ')
@@ -0,0 +1,49 @@
+"""
+Recovery from a failed startup load through a hot reload (main.reload_data).
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+from services.startup import FAILED, READY, ServiceLoader  # noqa: E402
+
+client = TestClient(main.app)
+
+
+def test_reload_recovers_a_service_that_failed_to_load(monkeypatch):
+    loaded = main.data
+    attempts = []
+
+    def load_suffix(target):
+        attempts.append(target)
+        if len(attempts) == 1:
+            raise OSError("suffix index unreadable")
+        return loaded.suffix
+
+    # The services already loaded by main stand in for the real load steps
+    loader = ServiceLoader(on_loaded=main._publish)
+    for name, _ in main.SERVICES:
+        loader.add(name, load_suffix if name == "suffix"
+                   else (lambda target, name=name: getattr(loaded, name)))
+    monkeypatch.setattr(main, "loader", loader)
+    monkeypatch.setattr(main, "data", main._new_data(loaded.builder.fresh()))
+    loader.load_all(main.data, main._loaded)
+
+    assert loader.state("suffix") == FAILED
+    assert client.get('/api/search/suffix', params={'q': 'ама'}).status_code == 503
+    ready = client.get('/ready')
+    assert ready.status_code == 503
+    assert ready.json()["services"]["suffix"]["error"] == "suffix index unreadable"
+
+    assert main.reload_data()
+
+    assert loader.state("suffix") == READY
+    assert client.get('/api/search/suffix', params={'q': 'ама'}).status_code == 200
+    ready = client.get('/ready')
+    assert ready.status_code == 200
+    assert ready.json()["services"]["suffix"]["error"] is None
+    assert ready.json()["reload"]["state"] == READY
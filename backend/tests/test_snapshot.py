@@ -0,0 +1,102 @@
+"""
+The memory-mapped snapshot container (services/snapshot.py).
+"""
+import os
+from array import array
+
+import pytest
+
+from services import snapshot as snapshot_module
+from services.snapshot import Snapshot, SnapshotWriter, SortedKeyIndex, load_snapshot
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'words.txt'
+    path.write_text('кућа\nшкола\n', encoding='utf-8')
+    return str(path)
+
+
+def _write(path, source=None):
+    writer = SnapshotWriter()
+    if source is not None:
+        writer.add_source('words', source)
+    writer.add_strings('keys', ['а', 'кућа', 'школа', ''])
+    writer.add_array('ranks', 'I', [3, 1, 2, 0])
+    writer.add_array('counts', 'q', array('q', [-1, 2 ** 40]))
+    writer.meta["example"] = {"version": 1}
+    writer.write(path)
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'snapshot.bin')
+    _write(path)
+    snapshot = Snapshot(path)
+    keys = snapshot.strings('keys')
+    assert list(keys) == ['а', 'кућа', 'школа', '']
+    assert len(keys) == 4
+    assert keys[-3] == 'кућа'
+    assert keys[1:3] == ['кућа', 'школа']
+    with pytest.raises(IndexError):
+        keys[4]
+    assert list(snapshot.array('ranks')) == [3, 1, 2, 0]
+    assert list(snapshot.array('counts')) == [-1, 2 ** 40]
+    assert snapshot.meta["example"] == {"version": 1}
+    assert snapshot.has('keys') and not snapshot.has('missing')
+
+
+def test_sorted_key_index(tmp_path):
+    path = str(tmp_path / 'snapshot.bin')
+    _write(path)
+    snapshot = Snapshot(path)
+    index = SortedKeyIndex(snapshot.strings('keys')[:3], snapshot.array('ranks'))
+    assert index.get('кућа') == 1
+    assert index.get('кућ') is None
+    assert 'школа' in index
+    assert len(index) == 3
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'snapshot.bin'
+    path.write_bytes(b'NOTASNAP' + b'\0' * 16)
+    with pytest.raises(ValueError):
+        Snapshot(str(path))
+
+
+def test_load_snapshot_reopens_a_replaced_file(tmp_path):
+    path = str(tmp_path / 'snapshot.bin')
+    assert load_snapshot(path) is None
+    _write(path)
+    first = load_snapshot(path)
+    assert load_snapshot(path) is first
+    writer = SnapshotWriter()
+    writer.add_strings('keys', ['ново'])
+    writer.write(path)
+    second = load_snapshot(path)
+    assert second is not first
+    assert list(second.strings('keys')) == ['ново']
+    # The old mapping stays readable
+    assert first.strings('keys')[1] == 'кућа'
+
+
+def test_source_matches(tmp_path, source, monkeypatch):
+    path = str(tmp_path / 'snapshot.bin')
+    _write(path, source)
+    snapshot = Snapshot(path)
+    assert snapshot.source_matches('words', source)
+    assert not snapshot.source_matches('other', source)
+    # A source that is not deployed does not invalidate the snapshot
+    assert snapshot.source_matches('words', str(tmp_path / 'missing.txt'))
+
+    # Same size, new mtime: stale unless the content hash is compared
+    stat = os.stat(source)
+    with open(source, 'w', encoding='utf-8') as f:
+        f.write('кућа\nшкола\n')
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert not snapshot.source_matches('words', source)
+    monkeypatch.setattr(snapshot_module, 'VERIFY_SOURCES', True)
+    assert snapshot.source_matches('words', source)
+
+    with open(source, 'w', encoding='utf-8') as f:
+        f.write('кућа\nшкода\n')
+    assert not snapshot.source_matches('words', source)
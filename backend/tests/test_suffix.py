@@ -0,0 +1,59 @@
+"""
+Suffix search and its pagination cursors (services/suffix_service.py).
+"""
+import pytest
+
+from services.suffix_service import SuffixService, decode_cursor, encode_cursor, lexicon_keys
+
+
+@pytest.fixture(scope='module')
+def suffix(wordlist, frequency, jezik):
+    return SuffixService(wordlist, frequency, jezik, use_snapshot=False)
+
+
+def _pages(suffix, query, order, limit):
+    pages = []
+    cursor = None
+    while True:
+        result = suffix.search(query, limit=limit, order=order, cursor=cursor)
+        pages.append(result)
+        cursor = result["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor('rhyme', 42, 'амаб')
+    assert '=' not in cursor
+    assert decode_cursor(cursor, 'rhyme') == (42, 'амаб')
+
+
+def test_cursor_of_another_order_is_rejected():
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor('rhyme', 1, 'а'), 'frequency')
+    with pytest.raises(ValueError):
+        decode_cursor('not a cursor', 'rhyme')
+
+
+@pytest.mark.parametrize('order', ['frequency', 'rhyme'])
+def test_pages_cover_every_word_once(suffix, wordlist, jezik, order):
+    expected = {key for key in lexicon_keys(wordlist, jezik) if key.endswith('ама')}
+    pages = _pages(suffix, '-ама', order, limit=7)
+    words = [item["word"] for page in pages for item in page["results"]]
+    assert pages[0]["total"] == len(expected)
+    assert len(words) == len(expected)
+    assert set(words) == expected
+    if order == 'rhyme':
+        assert words == sorted(words, key=lambda word: word[::-1])
+
+
+def test_frequency_pages_are_ranked(suffix):
+    pages = _pages(suffix, 'а', 'frequency', limit=10)[:5]
+    ranks = [item["rank"] for page in pages for item in page["results"]]
+    ranked = [rank for rank in ranks if rank is not None]
+    assert ranked == sorted(ranked)
+
+
+def test_unknown_order(suffix):
+    with pytest.raises(ValueError):
+        suffix.search('ама', order='length')
@@ -0,0 +1,20 @@
+"""
+Batch lookups (WordInfoBuilder.build_many) with services missing.
+"""
+from services.word_info import WordInfoBuilder
+
+
+def test_build_many_while_loading():
+    builder = WordInfoBuilder(None, None, None, None, None)
+    results = builder.build_many(['кућа', ' '], loading=True)
+    assert results == [
+        {"word": 'кућа', "status": 503, "error": "Still loading, try again"},
+        {"word": ' ', "status": 400, "error": "Empty word"},
+    ]
+
+
+def test_build_many_after_a_failed_load():
+    builder = WordInfoBuilder(None, None, None, None, None)
+    [result] = builder.build_many(['кућа'], loading=False)
+    assert result["status"] == 503
+    assert result["error"] == "Lookup unavailable, try again later"
@@ -0,0 +1,315 @@
+"""
+Annotate text corpora offline with lemma, POS, form labels, frequency and IPA.
+
+Usage (from the backend directory):
+
+    python tools/annotate_corpus.py corpus/*.txt --output-dir annotated/ \\
+        [--format tsv|jsonl] [--workers 8] [--shard-mb 8] [--no-ipa]
+
+The services are loaded once in this process and shared with the forked
+worker processes. Every input file is cut into shards at line boundaries;
+each shard's distinct tokens are resolved once and its annotated rows are
+written to a part file, and the parts of a file are joined into
+``<output-dir>/<name>.tsv`` (or ``.jsonl``) when all of them are done.
+
+Completed shards are recorded in ``<output-dir>/.annotate-checkpoint.json``:
+re-running the same command skips them and continues where an interrupted
+run stopped. Changing an input file or the output options starts that file
+over.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND_DIR)
+
+from services.frequency_service import FrequencyService  # noqa: E402
+from services.ipa_service import IPAService  # noqa: E402
+from services.jezik_service import JezikService  # noqa: E402
+from services.prefork import freeze_loaded_data  # noqa: E402
+from services.snapshot import file_signature  # noqa: E402
+from services.text_analyzer import TOKEN_RE, TextAnalyzer  # noqa: E402
+from services.wordlist_service import WordlistService  # noqa: E402
+
+CHECKPOINT_NAME = '.annotate-checkpoint.json'
+CHECKPOINT_VERSION = 1
+
+COLUMNS = ("line", "start", "token", "lemma", "pos", "labels", "rank", "exists", "ipa")
+
+
+def output_columns(with_ipa: bool) -> Tuple[str, ...]:
+    return COLUMNS if with_ipa else COLUMNS[:-1]
+
+
+class Shard(NamedTuple):
+    """A run of whole lines of one input file."""
+    input_path: str
+    number: int
+    offset: int       # Byte offset of the first line
+    length: int       # Bytes
+    first_line: int   # 1-based number of the first line
+
+
+# Set in the parent before the pool forks, inherited by the workers
+_annotator: Optional["Annotator"] = None
+
+
+class Annotator:
+    """Resolves the tokens of a shard, each distinct token once."""
+
+    def __init__(self, with_ipa: bool = True):
+        jezik_service = JezikService()
+        frequency_service = FrequencyService()
+        self.wordlist_service = WordlistService()
+        self.ipa_service = IPAService() if with_ipa else None
+        self.analyzer = TextAnalyzer(jezik_service, frequency_service)
+
+    def annotate_types(self, types: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Annotation (everything but the position) of each distinct token."""
+        annotations = {}
+        for token in types:
+            info = self.analyzer.resolve(token)
+            annotations[token] = {
+                "lemma": info["lemma"],
+                "pos": info["pos"],
+                "labels": info["labels"],
+                "rank": info["rank"],
+                "exists": self.wordlist_service.word_exists(token.lower()),
+                "accented_form": info["accented_form"],
+            }
+        if self.ipa_service is not None:
+            ipa = self.ipa_service.to_ipa_many(
+                annotations[token]["accented_form"] or token.lower() for token in types
+            )
+            for token, token_ipa in zip(types, ipa):
+                annotations[token]["ipa"] = token_ipa
+        return annotations
+
+
+def plan_shards(path: str, shard_bytes: int) -> List[Shard]:
+    """Cut a file into shards of about ``shard_bytes`` at line boundaries."""
+    shards = []
+    offset = 0
+    line = 1
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(shard_bytes)
+            if not data:
+                break
+            # Extend to the end of the current line
+            rest = f.readline()
+            data += rest
+            shards.append(Shard(path, len(shards), offset, len(data), line))
+            offset += len(data)
+            line += data.count(b'\n')
+    return shards
+
+
+def part_path(output_dir: str, shard: Shard, fmt: str) -> str:
+    name = os.path.splitext(os.path.basename(shard.input_path))[0]
+    return os.path.join(output_dir, f".{name}.{shard.number:06d}.{fmt}.part")
+
+
+def annotate_shard(job: Tuple[Shard, str, str]) -> Tuple[Shard, int, int, int]:
+    """Worker: annotate one shard into its part file.
+
+    Returns (shard, tokens, distinct tokens, bytes read).
+    """
+    shard, output_dir, fmt = job
+    with open(shard.input_path, 'rb') as f:
+        f.seek(shard.offset)
+        text = f.read(shard.length).decode('utf-8', errors='replace')
+
+    # Tokenize first, then resolve every distinct token once
+    tokens: List[Tuple[int, int, str]] = []
+    for line_number, line in enumerate(text.split('\n'), shard.first_line):
+        for match in TOKEN_RE.finditer(line):
+            tokens.append((line_number, match.start(), match.group()))
+    types = list(dict.fromkeys(token for _, _, token in tokens))
+    annotations = _annotator.annotate_types(types)
+
+    columns = output_columns(_annotator.ipa_service is not None)
+    out = []
+    for line_number, start, token in tokens:
+        info = annotations[token]
+        if fmt == 'jsonl':
+            record = {"line": line_number, "start": start, "token": token, **info}
+            del record["accented_form"]
+            out.append(json.dumps(record, ensure_ascii=False))
+        else:
+            row = {"line": line_number, "start": start, "token": token, **info}
+            row["labels"] = '|'.join(info["labels"]) if info["labels"] else None
+            row["exists"] = int(info["exists"])
+            out.append('\t'.join('' if row[column] is None else str(row[column])
+                                 for column in columns))
+
+    path = part_path(output_dir, shard, fmt)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        if out:
+            f.write('\n'.join(out) + '\n')
+    os.replace(path + '.tmp', path)
+    return shard, len(tokens), len(types), shard.length
+
+
+class Checkpoint:
+    """Completed shards per input file, saved after every shard."""
+
+    def __init__(self, output_dir: str, options: Dict[str, Any]):
+        self.path = os.path.join(output_dir, CHECKPOINT_NAME)
+        self.options = options
+        self.inputs: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get("version") == CHECKPOINT_VERSION and data.get("options") == options:
+                    self.inputs = data["inputs"]
+                else:
+                    print("Checkpoint was written with different options, starting over")
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Ignoring unreadable checkpoint {self.path}: {e}")
+
+    def start_input(self, path: str, signature: Dict[str, Any], shard_count: int) -> Dict[str, Any]:
+        """State of ``path``; reset unless it was checkpointed for the same contents."""
+        state = self.inputs.get(path)
+        if state is None or state["signature"] != signature or state["shards"] != shard_count:
+            state = {"signature": signature, "shards": shard_count, "done": [], "complete": False}
+            self.inputs[path] = state
+        return state
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": CHECKPOINT_VERSION, "options": self.options,
+                       "inputs": self.inputs}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def join_parts(output_dir: str, shards: List[Shard], fmt: str, output_path: str,
+               with_ipa: bool):
+    """Concatenate the part files of one input into its output file."""
+    tmp_path = output_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as out:
+        if fmt == 'tsv':
+            out.write('\t'.join(output_columns(with_ipa)) + '\n')
+        for shard in shards:
+            with open(part_path(output_dir, shard, fmt), 'r', encoding='utf-8') as part:
+                while True:
+                    block = part.read(1024 * 1024)
+                    if not block:
+                        break
+                    out.write(block)
+    os.replace(tmp_path, output_path)
+    for shard in shards:
+        os.remove(part_path(output_dir, shard, fmt))
+
+
+def main():
+    global _annotator
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('inputs', nargs='+', help='UTF-8 text files')
+    parser.add_argument('--output-dir', required=True, help='directory for the annotated files')
+    parser.add_argument('--format', choices=('tsv', 'jsonl'), default='tsv')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--shard-mb', type=float, default=8.0, help='approximate shard size')
+    parser.add_argument('--no-ipa', action='store_true', help='skip the IPA column')
+    args = parser.parse_args()
+
+    names = [os.path.splitext(os.path.basename(path))[0] for path in args.inputs]
+    if len(set(names)) != len(names):
+        sys.exit("Input files must have distinct names (outputs are named after them)")
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    fmt = args.format
+    with_ipa = not args.no_ipa
+    shard_bytes = max(1, int(args.shard_mb * 1024 * 1024))
+    checkpoint = Checkpoint(args.output_dir, {"format": fmt, "ipa": with_ipa,
+                                              "shard_bytes": shard_bytes})
+
+    # Plan the work, skipping what the checkpoint says is done
+    pending: List[Shard] = []
+    shards_by_input: Dict[str, List[Shard]] = {}
+    for path in args.inputs:
+        path = os.path.abspath(path)
+        shards = plan_shards(path, shard_bytes)
+        state = checkpoint.start_input(path, file_signature(path), len(shards))
+        shards_by_input[path] = shards
+        if state["complete"]:
+            continue
+        # A shard only counts as done if its part file survived
+        done = {number for number in state["done"]
+                if os.path.exists(part_path(args.output_dir, shards[number], fmt))}
+        state["done"] = sorted(done)
+        pending.extend(shard for shard in shards if shard.number not in done)
+    checkpoint.save()
+
+    total_bytes = sum(shard.length for shard in pending)
+    skipped = sum(len(shards) for shards in shards_by_input.values()) - len(pending)
+    if skipped:
+        print(f"Resuming: {skipped} shards already done")
+
+    start = time.time()
+    tokens = types = done_bytes = 0
+    finished = 0
+    if pending:
+        _annotator = Annotator(with_ipa=with_ipa)
+        print(f"Loaded services in {time.time() - start:.1f}s; "
+              f"annotating {len(pending)} shards ({total_bytes / 1024 / 1024:.1f} MB) "
+              f"with {args.workers} workers")
+        start = time.time()
+
+        # Workers are forked from this process and share the loaded services
+        freeze_loaded_data()
+        context = multiprocessing.get_context('fork')
+        jobs = [(shard, args.output_dir, fmt) for shard in pending]
+        with context.Pool(args.workers) as pool:
+            for shard, shard_tokens, shard_types, shard_bytes_read in \
+                    pool.imap_unordered(annotate_shard, jobs):
+                finished += 1
+                tokens += shard_tokens
+                types += shard_types
+                done_bytes += shard_bytes_read
+
+                state = checkpoint.inputs[shard.input_path]
+                state["done"].append(shard.number)
+                checkpoint.save()
+
+                elapsed = time.time() - start
+                rate = done_bytes / elapsed if elapsed else 0
+                eta = (total_bytes - done_bytes) / rate if rate else 0
+                print(f"[{finished}/{len(pending)}] {os.path.basename(shard.input_path)} "
+                      f"shard {shard.number}: {tokens} tokens, {types} resolved, "
+                      f"{tokens / elapsed if elapsed else 0:,.0f} tokens/s, "
+                      f"{rate / 1024 / 1024:.1f} MB/s, ETA {eta:.0f}s")
+                sys.stdout.flush()
+
+    # Join the files whose shards are all done
+    for path, shards in shards_by_input.items():
+        state = checkpoint.inputs[path]
+        if state["complete"]:
+            continue
+        if len(set(state["done"])) == len(shards):
+            name = os.path.splitext(os.path.basename(path))[0]
+            output_path = os.path.join(args.output_dir, f"{name}.{fmt}")
+            join_parts(args.output_dir, shards, fmt, output_path, with_ipa)
+            state["complete"] = True
+            state["done"] = []
+            checkpoint.save()
+            print(f"Wrote {output_path}")
+
+    elapsed = time.time() - start
+    print(f"Annotated {tokens} tokens in {elapsed:.1f}s "
+          f"({tokens / elapsed if elapsed else 0:,.0f} tokens/s)")
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit("Interrupted; run the same command again to resume")
@@ -0,0 +1,299 @@
+"""
+Build the etymology store from an offline sr.wiktionary dump.
+
+Usage (from the backend directory):
+
+    python tools/build_etymology_db.py srwiktionary-latest-pages-articles.xml.bz2 \\
+        [--output data/etymology.sqlite]
+
+Accepts a MediaWiki XML export (``.xml``, ``.xml.bz2`` or ``.xml.gz``) or a
+JSON Lines file with one entry per line in the wiktextract format (``word``,
+``lang_code``, ``pos``, ``etymology_text``, ``senses[].glosses``). The dump is
+parsed as a stream, so memory use does not depend on its size. The Serbian
+(Serbo-Croatian) section of every page is reduced to plain-text etymology and
+definitions, and stored under the ``canonical_key`` of the title: pages for
+the Latin and the Cyrillic spelling of a lemma are merged into one entry.
+"""
+import argparse
+import bz2
+import gzip
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+import xml.etree.ElementTree as ElementTree
+from typing import Dict, IO, Iterator, List, Optional, Tuple
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND_DIR)
+
+from services.etymology_service import SCHEMA, default_db_path  # noqa: E402
+from services.normalize import canonical_key, is_cyrillic, to_cyrillic  # noqa: E402
+
+# Language section headings and {{-xx-}} markers of Serbian entries
+SERBIAN_LANGUAGES = {
+    'српски', 'srpski', 'српскохрватски', 'srpskohrvatski', 'српски језик', 'srpski jezik',
+    'sr', 'sh', 'hbs',
+}
+SERBIAN_LANG_CODES = {'sr', 'sh', 'hbs'}
+
+ETYMOLOGY_HEADINGS = {'етимологија', 'etimologija', 'порекло', 'poreklo', 'порекло речи'}
+
+# Part of speech headings; definitions are labeled with the last one seen
+POS_HEADINGS = {
+    'именица', 'imenica', 'глагол', 'glagol', 'придев', 'pridev', 'прилог', 'prilog',
+    'заменица', 'zamenica', 'број', 'broj', 'предлог', 'predlog', 'везник', 'veznik',
+    'речца', 'rečca', 'узвик', 'uzvik', 'властита именица', 'vlastita imenica',
+    'скраћеница', 'skraćenica', 'фраза', 'fraza', 'израз', 'izraz',
+}
+
+# wiktextract part of speech names -> the labels used by the API
+POS_NAMES = {
+    'noun': 'именица', 'verb': 'глагол', 'adj': 'придев', 'adv': 'прилог',
+    'pron': 'заменица', 'num': 'број', 'prep': 'предлог', 'conj': 'везник',
+    'particle': 'речца', 'intj': 'узвик', 'name': 'властита именица',
+    'abbrev': 'скраћеница', 'phrase': 'фраза',
+}
+
+HEADING_RE = re.compile(r'^(=+)\s*(.*?)\s*\1\s*$')
+LANG_MARKER_RE = re.compile(r'^\{\{\s*-([a-z-]+)-\s*\}\}\s*$')
+REDIRECT_RE = re.compile(r'^#\s*(redirect|преусмери|preusmeri)', re.IGNORECASE)
+
+COMMENT_RE = re.compile(r'<!--.*?-->', re.DOTALL)
+REF_RE = re.compile(r'<ref[^>/]*/>|<ref[^>]*>.*?</ref>', re.DOTALL | re.IGNORECASE)
+TEMPLATE_RE = re.compile(r'\{\{[^{}]*\}\}')
+FILE_LINK_RE = re.compile(
+    r'\[\[(?:Категорија|Category|Kategorija|Датотека|File|Слика|Image)\s*:[^\[\]]*\]\]',
+    re.IGNORECASE)
+LINK_RE = re.compile(r'\[\[(?:[^\[\]|]*\|)?([^\[\]]*)\]\]')
+EXTERNAL_LINK_RE = re.compile(r'\[(?:https?:)?//[^\s\]]+\s*([^\]]*)\]')
+TAG_RE = re.compile(r'<[^>]+>')
+QUOTES_RE = re.compile(r"'{2,}")
+SPACE_RE = re.compile(r'\s+')
+
+# Entries written per transaction
+BATCH_SIZE = 2000
+
+
+def clean_wikitext(text: str) -> str:
+    """Reduce wiki markup to plain text (templates, refs and tags are dropped)."""
+    text = COMMENT_RE.sub('', text)
+    text = REF_RE.sub('', text)
+    while True:
+        stripped = TEMPLATE_RE.sub('', text)
+        if stripped == text:
+            break
+        text = stripped
+    text = FILE_LINK_RE.sub('', text)
+    text = LINK_RE.sub(r'\1', text)
+    text = EXTERNAL_LINK_RE.sub(r'\1', text)
+    text = TAG_RE.sub('', text)
+    text = QUOTES_RE.sub('', text)
+    text = text.replace('{{', '').replace('}}', '')
+    return SPACE_RE.sub(' ', text).strip(' :;,')
+
+
+def parse_wikitext(text: str) -> Tuple[Optional[str], List[Dict[str, str]]]:
+    """Etymology and definitions of the Serbian section of a page."""
+    lines = text.splitlines()
+    has_languages = any(
+        LANG_MARKER_RE.match(line) or
+        (HEADING_RE.match(line) and len(HEADING_RE.match(line).group(1)) == 2)
+        for line in lines
+    )
+    # Pages without language sections are taken to be Serbian
+    in_serbian = not has_languages
+    section = None
+    pos = ''
+    etymology: List[str] = []
+    definitions: List[Dict[str, str]] = []
+
+    for line in lines:
+        marker = LANG_MARKER_RE.match(line)
+        heading = HEADING_RE.match(line)
+        if marker:
+            in_serbian = marker.group(1) in SERBIAN_LANG_CODES
+            section = None
+            continue
+        if heading:
+            name = clean_wikitext(heading.group(2)).lower()
+            if len(heading.group(1)) == 2 and has_languages:
+                in_serbian = name in SERBIAN_LANGUAGES
+                section = None
+                continue
+            section = name
+            if name in POS_HEADINGS:
+                pos = to_cyrillic(name)
+            continue
+        if not in_serbian:
+            continue
+
+        stripped = line.strip()
+        if stripped.startswith('#') and not stripped.startswith(('#:', '#*', '##:', '##*')):
+            definition = clean_wikitext(stripped.lstrip('#'))
+            if definition:
+                definitions.append({"pos": pos, "definition": definition})
+        elif section in ETYMOLOGY_HEADINGS and stripped:
+            piece = clean_wikitext(stripped.lstrip('*:'))
+            if piece:
+                etymology.append(piece)
+
+    return (' '.join(etymology) or None), definitions
+
+
+def _open(path: str, mode: str = 'rb') -> IO:
+    if path.endswith('.bz2'):
+        return bz2.open(path, mode)
+    if path.endswith('.gz'):
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+def iter_xml_pages(path: str) -> Iterator[Tuple[str, str]]:
+    """(title, wikitext) of every article in a MediaWiki XML export."""
+    with _open(path) as f:
+        context = ElementTree.iterparse(f, events=('start', 'end'))
+        _, root = next(context)
+        for event, elem in context:
+            if event != 'end' or elem.tag.rsplit('}', 1)[-1] != 'page':
+                continue
+            fields = {}
+            redirect = False
+            for child in elem.iter():
+                tag = child.tag.rsplit('}', 1)[-1]
+                if tag in ('title', 'ns', 'text'):
+                    fields[tag] = child.text or ''
+                elif tag == 'redirect':
+                    redirect = True
+            # Drop the parsed page so memory stays flat
+            root.clear()
+            text = fields.get('text', '')
+            if fields.get('ns', '0') != '0' or redirect or REDIRECT_RE.match(text):
+                continue
+            yield fields.get('title', ''), text
+
+
+def iter_json_entries(path: str) -> Iterator[Tuple[str, Optional[str], List[Dict[str, str]]]]:
+    """(word, etymology, definitions) of every Serbian entry of a wiktextract file."""
+    with _open(path, 'rt') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get("lang_code") not in SERBIAN_LANG_CODES or not entry.get("word"):
+                continue
+            pos = POS_NAMES.get(entry.get("pos", ''), entry.get("pos", ''))
+            definitions = [
+                {"pos": pos, "definition": gloss.strip()}
+                for sense in entry.get("senses", ())
+                for gloss in sense.get("glosses", ())[-1:]  # The most specific gloss
+                if gloss and gloss.strip()
+            ]
+            yield entry["word"], entry.get("etymology_text") or None, definitions
+
+
+class EntryWriter:
+    """Inserts entries into the store, merging those that share a key."""
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+        self.pending = 0
+        self.written = 0
+        self.merged = 0
+
+    def add(self, title: str, etymology: Optional[str], definitions: List[Dict[str, str]]):
+        if not etymology and not definitions:
+            return
+        key = canonical_key(title)
+        if not key:
+            return
+        cursor = self.connection.execute(
+            "SELECT title, etymology, definitions FROM entries WHERE key = ?", (key,))
+        existing = cursor.fetchone()
+        if existing is None:
+            self.connection.execute(
+                "INSERT INTO entries (key, title, etymology, definitions) VALUES (?, ?, ?, ?)",
+                (key, title, etymology, json.dumps(definitions, ensure_ascii=False)))
+            self.written += 1
+        else:
+            old_title, old_etymology, old_definitions = existing
+            merged = json.loads(old_definitions)
+            seen = {(d["pos"], d["definition"]) for d in merged}
+            merged.extend(d for d in definitions if (d["pos"], d["definition"]) not in seen)
+            # The Cyrillic page's etymology wins over the Latin one's
+            if etymology and (not old_etymology or
+                              (is_cyrillic(title) and not is_cyrillic(old_title))):
+                old_etymology = etymology
+            if is_cyrillic(title) and not is_cyrillic(old_title):
+                old_title = title
+            self.connection.execute(
+                "UPDATE entries SET title = ?, etymology = ?, definitions = ? WHERE key = ?",
+                (old_title, old_etymology, json.dumps(merged, ensure_ascii=False), key))
+            self.merged += 1
+
+        self.pending += 1
+        if self.pending >= BATCH_SIZE:
+            self.connection.commit()
+            self.pending = 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('dump', help='sr.wiktionary XML export or wiktextract JSON Lines file')
+    parser.add_argument('--output', default=default_db_path(), help='SQLite file to write')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.dump):
+        sys.exit(f"Dump not found: {args.dump}")
+
+    start = time.time()
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    tmp_path = args.output + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    connection = sqlite3.connect(tmp_path)
+    connection.execute("PRAGMA journal_mode = OFF")
+    connection.execute("PRAGMA synchronous = OFF")
+    connection.executescript(SCHEMA)
+    writer = EntryWriter(connection)
+
+    name = re.sub(r'\.(bz2|gz)$', '', args.dump)
+    is_json = name.endswith(('.json', '.jsonl'))
+    pages = 0
+    if is_json:
+        for word, etymology, definitions in iter_json_entries(args.dump):
+            pages += 1
+            writer.add(word, etymology, definitions)
+    else:
+        for title, text in iter_xml_pages(args.dump):
+            pages += 1
+            etymology, definitions = parse_wikitext(text)
+            writer.add(title, etymology, definitions)
+            if pages % 50000 == 0:
+                print(f"{pages} pages, {writer.written} entries ({time.time() - start:.0f}s)")
+                sys.stdout.flush()
+
+    connection.executemany("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", [
+        ("source", os.path.basename(args.dump)),
+        ("built", time.strftime('%Y-%m-%dT%H:%M:%S')),
+        ("entries", str(writer.written)),
+    ])
+    connection.commit()
+    connection.execute("VACUUM")
+    connection.close()
+    # Atomic replace: running servers keep reading the old file until reloaded
+    os.replace(tmp_path, args.output)
+
+    size_mb = os.path.getsize(args.output) / 1024 / 1024
+    print(f"Wrote {writer.written} entries ({writer.merged} merged spellings) from {pages} "
+          f"pages to {args.output} ({size_mb:.1f} MB) in {time.time() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
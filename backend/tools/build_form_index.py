@@ -0,0 +1,78 @@
+"""
+Build the inverted surface form -> lemma index from the jezik database.
+
+Usage (from the backend directory):
+
+    python tools/build_form_index.py [--lemmas lemmas.txt] [--output data/form_index.tsv]
+
+Every jezik paradigm is expanded once and written to a TSV file that
+``services.form_index.FormIndex`` loads at startup.  Lemmas are taken from
+``--lemmas`` (one per line) when given, otherwise from the jezik key list.
+"""
+import argparse
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND_DIR)
+
+from services.jezik_service import JEZIK_PATH, lookup  # noqa: E402
+from services.form_index import build_entries, default_index_path, write_index  # noqa: E402
+
+
+def iter_jezik_keys():
+    """Yield every key of the jezik dictionary.
+
+    jezik does not export its key list, so look for the dictionary mapping
+    inside the package the same way ``random_key`` reaches it.
+    """
+    import lookup as jezik_lookup
+
+    for module_name in ('lookup', 'lookup.data'):
+        try:
+            module = __import__(module_name, fromlist=['*'])
+        except ImportError:
+            continue
+        for attr in ('multidict', 'dictionary'):
+            mapping = getattr(module, attr, None)
+            if hasattr(mapping, 'keys'):
+                yield from sorted(mapping.keys())
+                return
+
+    raise RuntimeError(
+        f"Could not find the jezik key list in {os.path.dirname(jezik_lookup.__file__)}; "
+        f"pass --lemmas with one lemma per line"
+    )
+
+
+def iter_lemma_file(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            lemma = line.strip()
+            if lemma:
+                yield lemma
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lemmas', help='file with one lemma per line (default: all jezik keys)')
+    parser.add_argument('--output', default=default_index_path(), help='index file to write')
+    args = parser.parse_args()
+
+    if lookup is None:
+        sys.exit(f"jezik library not found at {JEZIK_PATH}")
+
+    lemmas = iter_lemma_file(args.lemmas) if args.lemmas else iter_jezik_keys()
+
+    start = time.time()
+    forms = build_entries(lemmas, lookup)
+    write_index(forms, args.output)
+
+    entry_count = sum(len(entries) for entries in forms.values())
+    print(f"Wrote {len(forms)} forms ({entry_count} entries) to {args.output} "
+          f"in {time.time() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Export every jezik paradigm into the columnar paradigm store.
+
+Usage (from the backend directory):
+
+    python tools/build_paradigm_store.py [--lemmas lemmas.txt] [--output data/paradigms.bin]
+
+Each lemma is looked up in jezik once and its tables are written as interned
+labels, a shared table of form strings and offset arrays (see
+``services.paradigm_store``). ``JezikService`` then reads paradigms from the
+store instead of generating them. Lemmas are taken from ``--lemmas`` (one per
+line) when given, otherwise from the jezik key list; only a store built from
+the full key list also answers lookups of words that are not lemmas. Rebuild
+it whenever jezik changes; a store older than the jezik module is ignored.
+"""
+import argparse
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND_DIR)
+
+from services.jezik_service import JEZIK_PATH, lookup, library_file  # noqa: E402
+from services.paradigm_store import ParadigmStoreWriter, default_store_path  # noqa: E402
+from build_form_index import iter_jezik_keys, iter_lemma_file  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lemmas', help='file with one lemma per line (default: all jezik keys)')
+    parser.add_argument('--output', default=default_store_path(), help='store file to write')
+    args = parser.parse_args()
+
+    if lookup is None:
+        sys.exit(f"jezik library not found at {JEZIK_PATH}")
+
+    lemmas = iter_lemma_file(args.lemmas) if args.lemmas else iter_jezik_keys()
+
+    start = time.time()
+    writer = ParadigmStoreWriter()
+    failed = 0
+    for lemma in lemmas:
+        try:
+            writer.add(lemma, lookup(lemma) or ())
+        except Exception as e:
+            failed += 1
+            print(f"Warning: Could not export '{lemma}': {e}")
+    writer.write(args.output, complete=not args.lemmas and not failed,
+                 jezik_file=library_file(lookup))
+
+    print(f"Wrote {len(writer)} lemmas to {args.output} in {time.time() - start:.1f}s"
+          + (f" ({failed} failed)" if failed else ""))
+
+
+if __name__ == '__main__':
+    main()
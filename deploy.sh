@@ -24,6 +24,12 @@ scp -r frontend/* $SERVER:$WEB_DIR/
 # Scripts
 scp deploy.sh $SERVER:$DEPLOY_DIR/
 
+# Prebuilt indexes (see backend/tools/); -p keeps the mtimes the
+# snapshot checks its sources against
+if [ -d backend/data ]; then
+    scp -rp backend/data $SERVER:$DEPLOY_DIR/
+fi
+
 echo "3. Transferring data repositories..."
 # Transfer jezik
 ssh $SERVER "mkdir -p $DEPLOY_DIR/jezik"
@@ -32,11 +38,11 @@ tar czf - lookup static templates | ssh $SERVER "cd $DEPLOY_DIR/jezik && tar xzf
 
 # Transfer spisak-srpskih-reci
 ssh $SERVER "mkdir -p $DEPLOY_DIR/spisak-srpskih-reci"
-scp /Users/lazar/spisak-srpskih-reci/serbian-words.txt $SERVER:$DEPLOY_DIR/spisak-srpskih-reci/
+scp -p /Users/lazar/spisak-srpskih-reci/serbian-words.txt $SERVER:$DEPLOY_DIR/spisak-srpskih-reci/
 
 # Transfer inflection-sr frequency data
 ssh $SERVER "mkdir -p $DEPLOY_DIR/inflection-sr/data"
-scp /Users/lazar/inflection-sr/data/word_frequency_table.tsv $SERVER:$DEPLOY_DIR/inflection-sr/data/
+scp -p /Users/lazar/inflection-sr/data/word_frequency_table.tsv $SERVER:$DEPLOY_DIR/inflection-sr/data/
 
 echo "4. Setting up Python environment on server..."
 ssh $SERVER << 'ENDSSH'
@@ -7,6 +7,7 @@ const API_URL = window.location.hostname === 'localhost'
 const wordInput = document.getElementById('wordInput');
 const searchBtn = document.getElementById('searchBtn');
 const resultContainer = document.getElementById('resultContainer');
+const suggestionList = document.getElementById('suggestions');
 
 // Event listeners
 searchBtn.addEventListener('click', searchWord);
@@ -15,6 +16,42 @@ wordInput.addEventListener('keypress', (e) => {
         searchWord();
     }
 });
+wordInput.addEventListener('input', scheduleSuggestions);
+
+// Autocomplete: ask the backend for completions shortly after typing stops
+let suggestTimer = null;
+let suggestRequest = 0;
+
+function scheduleSuggestions() {
+    clearTimeout(suggestTimer);
+    suggestTimer = setTimeout(fetchSuggestions, 120);
+}
+
+async function fetchSuggestions() {
+    const query = wordInput.value.trim();
+    const requestId = ++suggestRequest;
+    
+    if (!query) {
+        suggestionList.innerHTML = '';
+        return;
+    }
+    
+    try {
+        const response = await fetch(`${API_URL}/suggest?q=${encodeURIComponent(query)}&limit=8`);
+        if (!response.ok || requestId !== suggestRequest) {
+            return;
+        }
+        const data = await response.json();
+        // Build options as nodes so suggested words are never parsed as HTML
+        suggestionList.replaceChildren(...data.suggestions.map(s => {
+            const option = document.createElement('option');
+            option.value = s.word;
+            return option;
+        }));
+    } catch (error) {
+        // Suggestions are optional, searching still works without them
+    }
+}
 
 async function searchWord() {
     const word = wordInput.value.trim();